@@ -0,0 +1,153 @@
+"""
+Layer harvest benchmark for usd-noodle.
+
+Builds a deep and a wide layer full of prims and attributes (a few of them asset valued, a few
+prims with references and payloads), then times DependencyWalker.read_layer against the old
+harvest - recursive child lists, and every attribute of every prim - on each of them.
+Both have to find the same nodes and edges.
+
+usage: python benchmarks/harvest_layer.py [--prims N] [--depth N] [--attributes N] [--runs N] [--usda]
+"""
+from __future__ import print_function
+
+import argparse
+import os.path
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pxr import Sdf
+
+from usd_noodle.walker import DependencyWalker, SCAN_FULL
+
+
+def build_layer(path, prims, depth, attributes):
+    """
+    :param prims: number of prims in total
+    :param depth: prims are made in chains this deep. 1 makes them all root prims
+    :param attributes: float attributes per prim. every tenth prim gets an asset attribute as well
+    """
+    layer = Sdf.Layer.CreateNew(path)
+    with Sdf.ChangeBlock():
+        parent = Sdf.Path.absoluteRootPath
+        for i in range(prims):
+            if i % depth == 0:
+                parent = Sdf.Path.absoluteRootPath
+            prim_path = parent.AppendChild('prim{}'.format(i))
+            prim = Sdf.CreatePrimInLayer(layer, prim_path)
+            prim.specifier = Sdf.SpecifierDef
+            prim.typeName = 'Xform'
+            for j in range(attributes):
+                Sdf.AttributeSpec(prim, 'value{}'.format(j), Sdf.ValueTypeNames.Float).default = float(j)
+            if i % 10 == 0:
+                attr = Sdf.AttributeSpec(prim, 'inputs:file', Sdf.ValueTypeNames.Asset)
+                attr.default = Sdf.AssetPath('./textures/tex{}.exr'.format(i % 100))
+            if i % 50 == 0:
+                prim.referenceList.Prepend(Sdf.Reference('./ref{}.usd'.format(i % 500)))
+            if i % 70 == 0:
+                prim.payloadList.Prepend(Sdf.Payload('./payload{}.usd'.format(i % 700)))
+            parent = prim_path
+    layer.Save()
+    return path
+
+
+def get_flat_child_list(path):
+    ret = [path]
+    for key, child in path.nameChildren.items():
+        ret.extend(get_flat_child_list(child))
+    ret = list(set(ret))
+    return ret
+
+
+def recursive_harvest(walker, layer_path):
+    """
+    The harvest the way read_layer used to do it, for comparison
+    """
+    harvest = walker.new_harvest(layer_path)
+    layer = Sdf.Layer.FindOrOpen(layer_path)
+    for child in get_flat_child_list(layer.pseudoRoot):
+        if walker.walk_attributes:
+            for attr in child.attributes:
+                if attr.typeName == 'asset':
+                    value = attr.default
+                    if not value or not value.path:
+                        continue
+                    owner = attr.owner
+                    owner_parent = owner.nameParent
+                    walker.harvest_asset_attribute(harvest, layer, value.path, attr.colorSpace,
+                                                   owner.typeName, owner.name,
+                                                   owner_parent.typeName if owner_parent else None,
+                                                   owner_parent.name if owner_parent else None)
+        clip_info = child.GetInfo("clips")
+        for clip_set_name in clip_info:
+            walker.harvest_clip_set(harvest, layer, clip_set_name, clip_info[clip_set_name])
+        for varset in child.variantSets:
+            walker.harvest_variant_set(harvest, layer, varset.name, [str(x) for x in varset.variants.keys()],
+                                       varset.owner.variantSelections.get(varset.name))
+        for payload in walker.flatten_ref_list(child.payloadList):
+            walker.harvest_arc(harvest, layer, layer_path, 'payload', payload.assetPath)
+        for reference in walker.flatten_ref_list(child.referenceList):
+            walker.harvest_arc(harvest, layer, layer_path, 'reference', reference.assetPath)
+    return walker.finish_harvest(harvest)
+
+
+def best_time(func, runs):
+    times = []
+    result = None
+    for i in range(runs):
+        start = time.time()
+        result = func()
+        times.append(time.time() - start)
+    return min(times), result
+
+
+def found(harvest):
+    return set(x[0] for x in harvest['nodes']), set(harvest['edges'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='usd-noodle layer harvest benchmark')
+    parser.add_argument('--prims', type=int, default=20000, help='prims per layer (default 20000)')
+    parser.add_argument('--depth', type=int, default=500, help='depth of the deep layer (default 500)')
+    parser.add_argument('--attributes', type=int, default=5, help='float attributes per prim (default 5)')
+    parser.add_argument('--runs', type=int, default=3, help='runs of each harvest. the best one counts (default 3)')
+    parser.add_argument('--usda', action='store_true', help='write the layers as usda rather than usdc')
+    args = parser.parse_args()
+    
+    # the old harvest recurses once per level
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), args.depth * 4))
+    
+    walker = DependencyWalker(None, workers=1)
+    walker.walk_attributes = True
+    walker.scan_mode = SCAN_FULL
+    
+    temp_dir = tempfile.mkdtemp(prefix='noodle_bench')
+    ext = '.usda' if args.usda else '.usdc'
+    failed = False
+    try:
+        for name, depth in [('wide', 1), ('deep', args.depth)]:
+            layer_path = build_layer(os.path.join(temp_dir, name + ext), args.prims, depth, args.attributes)
+            # both get the layer already open, so it's only the harvesting being timed. holding on to it
+            # keeps it open until we're done with it
+            layer = Sdf.Layer.FindOrOpen(layer_path)
+            
+            old_time, old_harvest = best_time(lambda: recursive_harvest(walker, layer_path), args.runs)
+            new_time, new_harvest = best_time(lambda: walker.read_layer(layer_path), args.runs)
+            print('{:<5} {} prims, depth {}: recursive {:8.1f}ms   single pass {:8.1f}ms   {:.1f}x'.format(
+                name, args.prims, depth, old_time * 1000.0, new_time * 1000.0, old_time / max(new_time, 1e-9)))
+            
+            if found(old_harvest) != found(new_harvest):
+                print('  the two harvests found different things!')
+                failed = True
+            del layer
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Startup time benchmark for usd-noodle.
+
+Times, each in a fresh interpreter:
+  * import usd_noodle
+  * the command line, up to the point it would start walking (--help)
+  * the headless walker modules (what --json needs)
+  * NoodleWidget() construction, if there's a Qt binding to make one with
+
+and lists the slowest modules `python -X importtime` finds under `import usd_noodle`.
+
+usage: python benchmarks/import_time.py [--runs N] [--budget SECONDS] [--top N]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import os.path
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = os.path.join(ROOT, 'usd_noodle')
+
+# code run in the child interpreter for each case. each prints the seconds it took
+CASES = [
+    ('import usd_noodle', """
+import time
+start = time.time()
+import usd_noodle
+print(time.time() - start)
+"""),
+    ('cli --help', """
+import sys, time, runpy
+sys.argv = ['usd_noodle', '--help']
+start = time.time()
+try:
+    runpy.run_path({package!r}, run_name='__main__')
+except SystemExit:
+    pass
+sys.stdout = sys.__stdout__
+print(time.time() - start)
+"""),
+    ('headless walker', """
+import time
+start = time.time()
+from usd_noodle import walker, walk_cache, report
+print(time.time() - start)
+"""),
+    ('NoodleWidget()', """
+import time
+start = time.time()
+import usd_noodle
+app = usd_noodle.QtWidgets.QApplication([])
+usd_noodle.NoodleWidget()
+print(time.time() - start)
+"""),
+]
+
+
+def run_case(code):
+    """
+    :return: seconds the case took, or None if it failed (ie, no Qt or usd here)
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([ROOT, env.get('PYTHONPATH', '')])
+    proc = subprocess.Popen([sys.executable, '-c', code.format(package=PACKAGE)], env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    out, err = proc.communicate()
+    if proc.returncode:
+        return None
+    try:
+        return float(out.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        return None
+
+
+def slowest_imports(top):
+    """
+    :return: list of (cumulative microseconds, module) for `import usd_noodle`, slowest first
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([ROOT, env.get('PYTHONPATH', '')])
+    proc = subprocess.Popen([sys.executable, '-X', 'importtime', '-c', 'import usd_noodle'], env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    out, err = proc.communicate()
+    ret = []
+    for line in err.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        try:
+            ret.append((int(parts[1]), parts[2].rstrip()))
+        except (IndexError, ValueError):
+            continue
+    return sorted(ret, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='usd-noodle startup time benchmark')
+    parser.add_argument('--runs', type=int, default=5, help='runs of each case. the best one counts (default 5)')
+    parser.add_argument('--budget', type=float, default=None,
+                        help='exit with status 1 if importing usd_noodle takes longer than this many seconds')
+    parser.add_argument('--top', type=int, default=15, help='number of slowest imports to list (default 15)')
+    args = parser.parse_args()
+    
+    results = {}
+    for name, code in CASES:
+        times = [run_case(code) for i in range(args.runs)]
+        times = [x for x in times if x is not None]
+        results[name] = min(times) if times else None
+        if results[name] is None:
+            print('{:<20} unavailable'.format(name))
+        else:
+            print('{:<20} {:8.1f}ms'.format(name, results[name] * 1000.0))
+    
+    if sys.version_info >= (3, 7):
+        print()
+        print('slowest imports under `import usd_noodle` (cumulative):')
+        for cumulative, module in slowest_imports(args.top):
+            print('{:10.1f}ms {}'.format(cumulative / 1000.0, module))
+    
+    if args.budget is not None:
+        import_time = results['import usd_noodle']
+        if import_time is None or import_time > args.budget:
+            print('over the {}s budget'.format(args.budget))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Graph layout benchmark for usd-noodle.
+
+Builds a dependency graph shaped like a big shot - a root using a handful of layers, each of those
+using more, and so on, with shared layers used from several places, and optionally a few loops -
+then times the layered layout the gui runs on a background thread, and checks nothing in a column
+ends up overlapping, and how many connections the loops leave pointing back towards the root.
+Then it times putting new nodes into the laid out graph the way an expand does, without moving
+anything, which should take about as long whatever the size of the graph.
+
+usage: python benchmarks/layout_graph.py [--nodes N] [--fanout N] [--shared F] [--loops N] [--runs N] [--added N]
+"""
+from __future__ import print_function
+
+import argparse
+import os.path
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from usd_noodle import layout
+from usd_noodle.dependency_graph import DependencyGraph
+
+
+def build_graph(nodes, fanout, shared, loops=0):
+    """
+    :param nodes: number of nodes
+    :param fanout: most layers a layer uses
+    :param shared: fraction of uses that go to a layer something else already uses
+    :param loops: number of layers that use one of the layers using them
+    :return: (DependencyGraph, list of node names)
+    """
+    rng = random.Random(0)
+    graph = DependencyGraph()
+    names = ['/shot/layer{}.usd'.format(i) for i in range(nodes)]
+    parents = [None]
+    queue = [0]
+    made = 1
+    while queue and made < nodes:
+        parent = queue.pop(0)
+        for i in range(rng.randint(1, fanout)):
+            if made >= nodes:
+                break
+            # layers made after this one are further from the root, so sharing them can't make a loop
+            if parent + 1 < made and rng.random() < shared:
+                graph.add_edge(names[parent], names[rng.randrange(parent + 1, made)], 'reference')
+                continue
+            graph.add_edge(names[parent], names[made], rng.choice(['sublayer', 'reference', 'payload']))
+            parents.append(parent)
+            queue.append(made)
+            made += 1
+    for i in range(loops):
+        node = rng.randrange(1, made)
+        user = parents[node]
+        while user and parents[user] and rng.random() < 0.5:
+            user = parents[user]
+        if user:
+            graph.add_edge(names[node], names[user], 'reference')
+    return graph, names[:made]
+
+
+def run_layout(graph, names):
+    node_ids = [graph.strings.get(x) for x in names]
+    starts, ends = graph.edge_ids()
+    starts, ends = layout.node_edges([-1 if x is None else x for x in node_ids], starts, ends)
+    return layout.layered_layout(len(names), starts, ends, roots=[0]), (starts, ends)
+
+
+def backward(xs, starts, ends):
+    """
+    :return: number of edges whose end isn't to the left of their start
+    """
+    return int((xs[ends] >= xs[starts]).sum())
+
+
+def overlaps(xs, ys):
+    count = 0
+    for column in set(xs.tolist()):
+        column_ys = sorted(ys[xs == column].tolist())
+        count += sum(1 for a, b in zip(column_ys, column_ys[1:]) if b - a < layout.NODE_HEIGHT + layout.ROW_GAP - 1e-6)
+    return count
+
+
+def place_added(names, xs, ys, added):
+    """
+    Put new nodes next to random nodes of the laid out graph
+    :return: (seconds taken, NodePlacer)
+    """
+    rng = random.Random(1)
+    placer = layout.NodePlacer()
+    for name, x, y in zip(names, xs.tolist(), ys.tolist()):
+        placer.add(name, x, y, 200, layout.NODE_HEIGHT)
+    parents = [rng.choice(names) for i in range(added)]
+    start = time.time()
+    for i, parent in enumerate(parents):
+        placer.place('/shot/added{}.usd'.format(i), [parent], 200, layout.NODE_HEIGHT)
+    return time.time() - start, placer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='usd-noodle graph layout benchmark')
+    parser.add_argument('--nodes', type=int, default=100000, help='nodes in the graph (default 100000)')
+    parser.add_argument('--fanout', type=int, default=6, help='most layers each layer uses (default 6)')
+    parser.add_argument('--shared', type=float, default=0.3,
+                        help='fraction of uses that go to an already used layer (default 0.3)')
+    parser.add_argument('--loops', type=int, default=0, help='layers using one of their own users (default 0)')
+    parser.add_argument('--runs', type=int, default=3, help='runs of the layout. the best one counts (default 3)')
+    parser.add_argument('--added', type=int, default=1000, help='new nodes to put in afterwards (default 1000)')
+    args = parser.parse_args()
+    
+    if layout.numpy is None:
+        print('the layered layout needs numpy')
+        return 1
+    
+    graph, names = build_graph(args.nodes, args.fanout, args.shared, args.loops)
+    times = []
+    for i in range(args.runs):
+        start = time.time()
+        (xs, ys), (starts, ends) = run_layout(graph, names)
+        times.append(time.time() - start)
+    columns = len(set(xs.tolist()))
+    print('{} nodes, {} edges, {} columns: {:8.1f}ms'.format(len(names), len(graph), columns, min(times) * 1000.0))
+    
+    bad = overlaps(xs, ys)
+    if bad:
+        print('  {} nodes overlap the one above them!'.format(bad))
+        return 1
+    if args.loops:
+        print('  {} connections point back towards the root, for {} loops'.format(backward(xs, starts, ends),
+                                                                              args.loops))
+    
+    elapsed, placer = place_added(names, xs, ys, args.added)
+    print('{} nodes added without moving anything: {:8.1f}ms'.format(args.added, elapsed * 1000.0))
+    rects = placer.rects.values()
+    placed_xs = layout.numpy.array([rect[0] for rect in rects])
+    placed_ys = layout.numpy.array([rect[1] for rect in rects])
+    bad = overlaps(placed_xs, placed_ys)
+    if bad:
+        print('  {} nodes overlap the one above them!'.format(bad))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,24 @@
+import os.path
+import sys
+import textwrap
+
+import pytest
+
+# test the package from this checkout, same as the benchmarks
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def scene(tmp_path):
+    """
+    Write layers for a test scene
+    :return: function taking a path relative to the scene and the layer's text (without the
+             #usda header), that writes it and returns its full path
+    """
+    def write(name, text=''):
+        path = tmp_path.joinpath(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('#usda 1.0\n' + textwrap.dedent(text))
+        return str(path)
+    return write
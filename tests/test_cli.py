@@ -0,0 +1,61 @@
+import json
+import os.path
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# runs the cli like `python -m usd_noodle` does, then checks it never needed Qt
+RUN_CLI = '''
+import runpy, sys
+sys.argv = ['usd_noodle'] + sys.argv[1:]
+try:
+    runpy.run_module('usd_noodle', run_name='__main__', alter_sys=True)
+except SystemExit as e:
+    status = e.code
+assert not [x for x in sys.modules if x == 'Qt' or x.startswith(('PySide', 'PyQt'))], 'imported Qt'
+sys.exit(status)
+'''
+
+
+def run_cli(*args):
+    return subprocess.run([sys.executable, '-c', RUN_CLI, '--no-cache'] + list(args), cwd=ROOT,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+
+def test_json(scene, tmp_path):
+    root = scene('root.usda', '''
+        (
+            subLayers = [@./a.usda@]
+        )
+        ''')
+    a = scene('a.usda')
+    out = str(tmp_path.joinpath('walk.json'))
+    result = run_cli('-i', root, '--json', out, '--strict')
+    assert result.returncode == 0, result.stderr
+    with open(out) as fp:
+        walk = json.load(fp)
+    assert walk['root'] == root
+    assert sorted(walk['nodes']) == sorted([root, a])
+    assert walk['edges'] == [[root, a, 'sublayer']]
+    assert walk['offline'] == walk['errors'] == walk['cycles'] == []
+    assert walk['stats']['layers'] == 2
+
+
+def test_strict(scene, tmp_path):
+    root = scene('root.usda', '''
+        (
+            subLayers = [@./missing.usda@]
+        )
+        ''')
+    missing = os.path.join(os.path.dirname(root), 'missing.usda')
+    # written to stdout, and only fails with --strict
+    result = run_cli('-i', root, '--json', '-')
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout)['offline'] == [missing]
+    result = run_cli('-i', root, '--json', '-', '--strict')
+    assert result.returncode == 1, result.stderr
+    # a file that isn't there at all
+    result = run_cli('-i', str(tmp_path.joinpath('nothing.usda')), '--json', '-')
+    assert result.returncode == 2
@@ -0,0 +1,69 @@
+import pytest
+
+from usd_noodle import clips
+from usd_noodle.file_status import FileStatusChecker
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def frames_with(request, monkeypatch):
+    # the same answers with and without numpy
+    if request.param == 'python':
+        monkeypatch.setattr(clips, 'numpy', None)
+    return request.param
+
+
+def test_clip_sequence():
+    paths = ['/fx/smoke.{:04d}.usd'.format(x) for x in [1001, 1002, 1003, 1005, 10000]]
+    assert clips.clip_sequence(paths) == {'directory': '/fx', 'prefix': 'smoke.', 'suffix': '.usd', 'padding': 4,
+                                          'frames': [[1001, 1003, 1], [1005, 10000, 8995]]}
+    # not all the same name, or no frame number at all
+    assert clips.clip_sequence(['/fx/smoke.1001.usd', '/fx/fire.1002.usd']) is None
+    assert clips.clip_sequence(['/fx/smoke.1001.usd', '/other/smoke.1002.usd']) is None
+    assert clips.clip_sequence(['/fx/smoke.usd']) is None
+    assert clips.clip_sequence([]) is None
+
+
+@pytest.mark.parametrize('frames, runs', [
+    ([1, 2, 3, 4], [[1, 4, 1]]),
+    ([1, 3, 5, 6, 7], [[1, 5, 2], [6, 7, 1]]),
+    # two frames on their own aren't a step
+    ([1, 10, 11, 12], [[1, 1, 1], [10, 12, 1]]),
+    ([5], [[5, 5, 1]]),
+    ([], []),
+])
+def test_collapse_frames(frames_with, frames, runs):
+    assert clips.collapse_frames(frames) == runs
+    assert clips.expand_frames(runs) == frames
+
+
+def test_missing_frames(frames_with):
+    expected = clips.expand_frames([[1001, 1100, 1]])
+    present = (x for x in expected if x % 10)
+    missing = clips.missing_frames(expected, present)
+    assert missing == list(range(1010, 1101, 10))
+    assert clips.collapse_frames(missing) == [[1010, 1100, 10]]
+    assert clips.missing_frames(expected, []) == expected
+    assert clips.format_frames([[1001, 1010, 1], [1012, 1012, 1], [1020, 1030, 2]]) == '1001-1010, 1012, 1020-1030x2'
+
+
+def test_check_clip(tmp_path):
+    directory = tmp_path.joinpath('clips')
+    directory.mkdir()
+    for frame in [1, 2, 3, 5, 8]:
+        directory.joinpath('smoke.{:03d}.usd'.format(frame)).write_text('')
+    # the wrong padding isn't one of ours
+    directory.joinpath('smoke.0004.usd').write_text('')
+    info = {'clipFiles': {'directory': str(directory), 'prefix': 'smoke.', 'suffix': '.usd', 'padding': 3,
+                          'frames': [[1, 8, 1]]}}
+    checker = FileStatusChecker()
+    checker.check_clip(info)
+    assert not info['online']
+    assert info['missingCount'] == 3
+    assert info['missingFrames'] == [[4, 4, 1], [6, 7, 1]]
+    
+    info['clipFiles']['frames'] = [[1, 3, 1], [5, 5, 1]]
+    checker.check_clip(info)
+    assert info['online']
+    assert info['missingCount'] == 0
+    assert info['missingFrames'] == []
+    assert checker.directories.list_count == 1
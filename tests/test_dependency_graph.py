@@ -0,0 +1,69 @@
+from usd_noodle.dependency_graph import DependencyGraph
+
+
+def diamond():
+    """
+    root uses a and b, which both use shared
+    """
+    graph = DependencyGraph()
+    graph.add_edge('root', 'a', 'sublayer')
+    graph.add_edge('root', 'b', 'sublayer')
+    graph.add_edge('a', 'shared', 'reference')
+    graph.add_edge('b', 'shared', 'reference')
+    return graph
+
+
+def test_dedup():
+    graph = diamond()
+    assert not graph.add_edge('a', 'shared', 'reference')
+    # the same pair with another arc type is a different edge
+    assert graph.add_edge('a', 'shared', 'payload')
+    assert len(graph) == 5
+    assert ('a', 'shared', 'payload') in graph
+    assert ('a', 'shared', 'sublayer') not in graph
+    assert ('a', 'nothing', 'reference') not in graph
+    assert graph.edges(first=3) == [('b', 'shared', 'reference'), ('a', 'shared', 'payload')]
+    # a second arc type doesn't make it a child twice
+    assert graph.children('a') == ['shared']
+
+
+def test_usage_counts():
+    graph = diamond()
+    assert graph.usage_count('root') == 0
+    assert graph.usage_count('a') == 1
+    assert graph.usage_count('shared') == 2
+    assert graph.usage_count('nothing') == 0
+    graph.add_edge('root', 'shared', 'reference')
+    assert graph.usage_count('shared') == 3
+
+
+def test_adjacency():
+    graph = diamond()
+    assert graph.children('root') == ['a', 'b']
+    assert graph.parents('shared') == ['a', 'b']
+    assert graph.siblings('b') == ['a', 'b']
+    assert graph.siblings('root') == ['root']
+    assert graph.upstream('a') == set(['a', 'shared'])
+    assert graph.downstream('shared') == set(['shared', 'a', 'b', 'root'])
+    assert graph.upstream('nothing') == set(['nothing'])
+
+
+def test_strongly_connected():
+    graph = diamond()
+    assert graph.strongly_connected() == []
+    # shared -> b -> shared, and a layer that uses itself
+    graph.add_edge('shared', 'b', 'reference')
+    graph.add_edge('loner', 'loner', 'sublayer')
+    assert sorted(sorted(x) for x in graph.strongly_connected()) == [['b', 'shared'], ['loner']]
+
+
+def test_long_chain():
+    # no recursion, so a chain longer than the recursion limit is fine
+    graph = DependencyGraph()
+    names = ['layer{}'.format(i) for i in range(5001)]
+    for start, end in zip(names, names[1:]):
+        graph.add_edge(start, end, 'sublayer')
+    graph.add_edge(names[-1], names[0], 'reference')
+    components = graph.strongly_connected()
+    assert len(components) == 1
+    assert len(components[0]) == 5001
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from usd_noodle.file_status import FileStatusChecker
+
+
+def write(path, text='x'):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.mark.parametrize('workers', [1, 16])
+def test_apply(tmp_path, workers):
+    present = write(tmp_path.joinpath('tex', 'wood.png'), 'wood')
+    missing = str(tmp_path.joinpath('tex', 'gone.png'))
+    nodes = {
+        present: {'path': present, 'type': 'tex', 'online': False},
+        missing: {'path': missing, 'type': 'tex', 'size': 10, 'mtime': 1.0},
+        # not files, or couldn't be read. left as they are
+        'layer:look': {'path': 'layer:look', 'type': 'variant', 'online': True},
+        '/bad.usda': {'path': '/bad.usda', 'type': 'sublayer', 'error': True, 'online': True},
+    }
+    checker = FileStatusChecker(workers=workers)
+    checker.apply(nodes)
+    assert nodes[present]['online'] is True
+    assert nodes[present]['size'] == 4
+    assert nodes[present]['mtime'] == os.stat(present).st_mtime
+    assert nodes[missing]['online'] is False
+    assert 'size' not in nodes[missing] and 'mtime' not in nodes[missing]
+    assert nodes['layer:look'] == {'path': 'layer:look', 'type': 'variant', 'online': True}
+    assert nodes['/bad.usda']['online'] is True
+    assert checker.stat_count == 2
+
+
+def test_check_remembers(tmp_path):
+    path = write(tmp_path.joinpath('a.usda'))
+    checker = FileStatusChecker()
+    first = checker.check([path, path])
+    assert checker.check([path]) == {path: first[path]}
+    # each path is only looked at once until clear()
+    assert checker.stat_count == 1
+    checker.clear()
+    checker.check([path])
+    assert checker.stat_count == 1
+
+
+def test_directory_listed_once(tmp_path):
+    paths = [write(tmp_path.joinpath('clips', 'smoke.{}.usd'.format(i))) for i in range(20)]
+    checker = FileStatusChecker()
+    status = checker.check(paths + [str(tmp_path.joinpath('clips', 'smoke.99.usd'))])
+    assert sum(1 for x in status.values() if x is not None) == 20
+    assert checker.directories.list_count == 1
+
+
+def test_answers_from_listing(tmp_path):
+    directory = tmp_path.joinpath('tex')
+    present = write(directory.joinpath('wood.png'))
+    checker = FileStatusChecker()
+    cache = checker.directories
+    assert cache.exists(present)
+    assert not cache.exists(str(directory.joinpath('late.png')))
+    # made after the directory was listed. the listing's the answer, negative or not, until clear()
+    late = write(directory.joinpath('late.png'))
+    assert not cache.exists(late)
+    assert cache.stat(late) is None
+    assert cache.list_count == 1
+    # directories aren't files, and missing directories don't have any
+    assert not cache.exists(str(tmp_path.joinpath('tex')))
+    assert not cache.exists(str(tmp_path.joinpath('nothing', 'wood.png')))
+    assert checker.all_present([present])
+    assert not checker.all_present([present, str(tmp_path.joinpath('nothing', 'wood.png'))])
+
+    cache.clear()
+    assert cache.exists(late)
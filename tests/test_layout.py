@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from usd_noodle import layout
+
+needs_numpy = pytest.mark.skipif(layout.numpy is None, reason='the layered layout needs numpy')
+
+
+def random_dag(count, seed=0):
+    """
+    :return: (starts, ends) lists. every node but the first is used by one or two nodes before it
+    """
+    rng = random.Random(seed)
+    starts = []
+    ends = []
+    for node in range(1, count):
+        for user in set(rng.randrange(max(0, node - 50), node) for i in range(2)):
+            starts.append(user)
+            ends.append(node)
+    return starts, ends
+
+
+def backward(layers, starts, ends):
+    layers = layout.numpy.asarray(layers)
+    return int((layers[ends] <= layers[starts]).sum())
+
+
+@needs_numpy
+def test_layers_dag():
+    starts, ends = random_dag(2000)
+    layers = layout.assign_layers(2000, layout.numpy.array(starts), layout.numpy.array(ends), [0])
+    assert backward(layers, starts, ends) == 0
+
+
+@needs_numpy
+@pytest.mark.parametrize('loop', [
+    # a layer using something upstream of it
+    [(1500, 300)],
+    # two layers using each other
+    [(1990, 1991), (1991, 1990)],
+])
+def test_layers_loop(loop):
+    # only the edge closing the loop should point back towards the root
+    starts, ends = random_dag(2000)
+    starts.extend(x[0] for x in loop)
+    ends.extend(x[1] for x in loop)
+    layers = layout.assign_layers(2000, layout.numpy.array(starts), layout.numpy.array(ends), [0])
+    assert (layers >= 0).all()
+    assert backward(layers, starts, ends) == 1
+
+
+def rebuilt(placer):
+    """
+    :return: a NodePlacer with the same nodes, added from scratch
+    """
+    fresh = layout.NodePlacer()
+    for node, rect in sorted(placer.rects.items(), key=lambda x: x[1][3]):
+        fresh.add(node, *rect)
+    return fresh
+
+
+def test_placer_moves():
+    rng = random.Random(0)
+    placer = layout.NodePlacer()
+    for node in range(40):
+        placer.add(node, rng.choice([0, -300]), node * 70.0, 200, 40)
+    for step in range(200):
+        node = rng.randrange(50)
+        if rng.random() < 0.7:
+            placer.add(node, rng.choice([0, -300, -150]), rng.randrange(3000), 200, rng.choice([40, 60, 90]))
+        else:
+            placer.remove(node)
+        # moving or removing a node only frees its own stretch, and leaves the column as if built afresh
+        assert placer.spans == rebuilt(placer).spans
+
+
+def test_placer_place():
+    placer = layout.NodePlacer()
+    placer.add('root', 0, 0, 200, 60)
+    placed = [placer.place('layer{}'.format(i), ['root'], 200, 60) for i in range(5)]
+    assert set(x for x, y in placed) == set([-layout.COLUMN_WIDTH])
+    ys = sorted(y for x, y in placed)
+    assert all(b - a >= 60 + layout.ROW_GAP for a, b in zip(ys, ys[1:]))
+    # nothing moved out of the way
+    assert placer.rects['root'] == (0, 0, 200, 60)
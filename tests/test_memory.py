@@ -0,0 +1,78 @@
+from usd_noodle import memory
+from usd_noodle.walker import DependencyWalker
+
+
+def test_peak(monkeypatch):
+    sizes = iter([100, 300, 200])
+    monkeypatch.setattr(memory, 'current_rss', lambda: next(sizes))
+    monitor = memory.MemoryMonitor(limit=250)
+    monitor.start()
+    assert monitor.peak == 100
+    assert monitor.over_limit()
+    assert not monitor.over_limit()
+    assert monitor.peak == 300
+
+
+def test_sampled_per_layer(scene, monkeypatch):
+    root = scene('root.usda', '''
+        (
+            subLayers = [@./a.usda@, @./b.usda@]
+        )
+        ''')
+    scene('a.usda')
+    scene('b.usda')
+    samples = []
+    monkeypatch.setattr(memory, 'current_rss', lambda: samples.append(1) or 1)
+    
+    walker = DependencyWalker(root, workers=1)
+    walker.start()
+    # read and merged for each of the three layers, on top of the once a frontier
+    assert len(samples) >= 3 * 2 + 2
+
+
+def test_retainer():
+    layers = memory.LayerRetainer(2)
+    for name in 'abc':
+        layers.keep(name, name.upper())
+    # a fell off the end
+    assert len(layers) == 2
+    assert layers.get('a') is None
+    # getting b makes it the most recent, so c goes next
+    assert layers.get('b') == 'B'
+    layers.keep('d', 'D')
+    assert layers.get('c') is None
+    assert layers.get('b') == 'B'
+    layers.clear()
+    assert len(layers) == 0
+    # 0 keeps nothing
+    nothing = memory.LayerRetainer()
+    nothing.keep('a', 'A')
+    assert len(nothing) == 0
+
+
+def test_over_ceiling(scene, monkeypatch):
+    root = scene('root.usda', '''
+        (
+            subLayers = [@./a.usda@, @./b.usda@]
+        )
+        ''')
+    a = scene('a.usda', '''
+        (
+            subLayers = [@./c.usda@]
+        )
+        ''')
+    scene('b.usda')
+    scene('c.usda')
+    sizes = iter([100] * 3)
+    monkeypatch.setattr(memory, 'current_rss', lambda: next(sizes, 300))
+    
+    walker = DependencyWalker(root, workers=4, keep_layers=10, memory_limit=250)
+    cleared = []
+    clear = walker.layers.clear
+    monkeypatch.setattr(walker.layers, 'clear', lambda: cleared.append(len(walker.layers)) or clear())
+    walker.start()
+    # the kept layers are let go, and the rest is read a layer at a time
+    assert walker._throttled
+    assert cleared and cleared[0] > 0
+    assert a in walker.nodes and len(walker.nodes) == 4
+    assert walker.memory.peak == 300
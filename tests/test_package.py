@@ -0,0 +1,40 @@
+import os.path
+import subprocess
+import sys
+
+import pytest
+
+import usd_noodle
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHECK_IMPORT = '''
+import os.path, sys
+import usd_noodle
+heavy = [x for x in sys.modules if x.split('.')[0] in ('pxr', 'Qt', 'nodz', 'numpy')]
+assert not heavy, heavy
+# the modules are only ever imported as part of the package
+package_dir = os.path.dirname(usd_noodle.__file__)
+assert package_dir not in sys.path
+usd_noodle.DependencyWalker
+bare = [x for x in sys.modules if x in ('walker', 'records', 'utils', 'dependency_graph', 'walk_cache')]
+assert not bare, bare
+assert 'usd_noodle.walker' in sys.modules
+'''
+
+
+def test_import_is_light():
+    result = subprocess.run([sys.executable, '-c', CHECK_IMPORT], cwd=ROOT, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_lazy_exports():
+    from usd_noodle.walker import DependencyWalker
+    from usd_noodle.records import NodeRecord
+    assert usd_noodle.DependencyWalker is DependencyWalker
+    assert usd_noodle.NodeRecord is NodeRecord
+    assert {'DependencyWalker', 'NodeGraphWindow', 'QtWidgets'} <= set(dir(usd_noodle))
+    with pytest.raises(AttributeError):
+        usd_noodle.nothing
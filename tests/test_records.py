@@ -0,0 +1,61 @@
+import sys
+
+import pytest
+
+from usd_noodle.dependency_graph import DependencyGraph
+from usd_noodle.records import NodeRecord, StringTable, NODE_TYPES
+
+
+def test_string_table():
+    strings = StringTable()
+    path = ''.join(['/shot/', 'layer.usda'])
+    assert strings.intern(path) == 0
+    assert strings.intern('reference') == 1
+    assert strings.intern('/shot/layer.usda') == 0
+    assert len(strings) == 2
+    assert strings.get('reference') == 1
+    assert strings.get('nothing') is None
+    assert strings.text(0) == path
+    # the table's copy is the interned one
+    assert strings.text(0) is sys.intern(path)
+
+
+def test_node_record():
+    info = {'path': '/shot/layer.usda', 'type': 'reference', 'online': True, 'muted': False}
+    record = NodeRecord(3, info)
+    assert dict(record) == info
+    assert record.id == 3
+    # the common keys have slots and the type is a code, so only the rest need a dict
+    assert record.type_code == NODE_TYPES.index('reference')
+    assert record.extra == {'muted': False}
+    assert record['online'] and 'online' in record
+    assert 'size' not in record and record.get('size') is None
+    with pytest.raises(KeyError):
+        record['size']
+    
+    record['size'] = 10
+    record.setdefault('size', 20)
+    assert record.pop('size') == 10
+    assert record.pop('size', 'gone') == 'gone'
+    assert record.pop('muted') is False
+    assert record.extra is None
+    del record['online']
+    assert sorted(record) == ['path', 'type']
+    # types we don't have a code for still work, they just go in the extras
+    record['type'] = 'something'
+    assert record.type_code is None
+    assert record['type'] == 'something'
+    record['type'] = 'tex'
+    assert dict(record) == {'path': '/shot/layer.usda', 'type': 'tex'}
+
+
+def test_edge_ids():
+    graph = DependencyGraph()
+    graph.add_edge('root', 'a', 'sublayer')
+    graph.add_edge('a', 'b', 'reference')
+    starts, ends = graph.edge_ids()
+    text = graph.strings.text
+    assert [(text(x), text(y)) for x, y in zip(starts, ends)] == [('root', 'a'), ('a', 'b')]
+    # copies, so changing them doesn't touch the graph
+    starts[0] = ends[0]
+    assert graph.edges() == [('root', 'a', 'sublayer'), ('a', 'b', 'reference')]
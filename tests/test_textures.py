@@ -0,0 +1,25 @@
+import pytest
+
+from usd_noodle import textures
+
+
+UDIMS = {'token': textures.TOKEN_UDIM}
+
+
+@pytest.mark.parametrize('tiles, expected', [
+    # a full rectangle
+    ([1001, 1002, 1011, 1012], [1001, 1002, 1011, 1012]),
+    # a gap in a row
+    ([1001, 1003, 1004], [1001, 1002, 1003, 1004]),
+    # rows of different lengths, and a row with nothing in it
+    ([1001, 1002, 1003, 1011, 1031, 1033], [1001, 1002, 1003, 1011, 1031, 1032, 1033]),
+    # a row that doesn't start at the first column
+    ([1015, 1017], [1015, 1016, 1017]),
+    ([], []),
+])
+def test_expected_udims(tiles, expected):
+    assert textures.expected_tiles(UDIMS, tiles) == expected
+
+
+def test_expected_frames():
+    assert textures.expected_tiles({'token': textures.TOKEN_FRAME}, [3, 7]) == [3, 4, 5, 6, 7]
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from usd_noodle import report
+from usd_noodle import walk_io
+from usd_noodle.walker import DependencyWalker
+
+
+def saved(walk):
+    return dict((path, dict(info)) for path, info in walk.nodes.items()), sorted(walk.graph.edges()), \
+        walk.errored_nodes, walk.cycles
+
+
+@pytest.mark.parametrize('depth', [None, 2])
+def test_streamed_walks(scene, tmp_path, depth):
+    # what's streamed out while walking reads back the same as the json report written at the end
+    root = scene('root.usda', '(\n    subLayers = [@./a.usda@, @./missing.usda@]\n)\n')
+    scene('a.usda', '(\n    subLayers = [@./b.usda@]\n)\ndef "prim" (\n    references = @./c.usda@\n)\n{\n}\n')
+    scene('b.usda', '(\n    subLayers = [@./a.usda@]\n)\n')
+    scene('c.usda')
+    
+    paths = dict((name, str(tmp_path.joinpath('walk' + name))) for name in ['.json', '.jsonl', walk_io.BINARY_EXTENSION])
+    walker = DependencyWalker(root, workers=1)
+    walker.max_depth = depth
+    walker.writers.append(walk_io.JsonlWalkWriter(paths['.jsonl']))
+    walker.writers.append(walk_io.BinaryWalkWriter(paths[walk_io.BINARY_EXTENSION]))
+    walker.start()
+    report.write_json(paths['.json'], walker)
+    
+    expected = saved(walk_io.read_walk(paths['.json']))
+    assert expected[0] == saved(walker)[0]
+    for path in paths.values():
+        assert saved(walk_io.read_walk(path)) == expected
+
+
+def test_binary_final_info(scene, tmp_path):
+    # once the walk's done, nodes only get the info that's changed since they were written
+    root = scene('root.usda', '(\n    subLayers = [@./a.usda@, @./missing.usda@]\n)\n')
+    scene('a.usda')
+    path = str(tmp_path.joinpath('walk.noodle'))
+    walker = DependencyWalker(root, workers=1)
+    walker.writers.append(walk_io.BinaryWalkWriter(path))
+    walker.start()
+    
+    chunks = []
+    with open(path, 'rb') as fp:
+        data = fp.read()
+    offset = len(walk_io.BINARY_MAGIC) + 4
+    while offset < len(data):
+        tag, length = walk_io.CHUNK_HEADER.unpack_from(data, offset)
+        offset += walk_io.CHUNK_HEADER.size
+        chunks.append((tag, data[offset:offset + length]))
+        offset += length
+    
+    assert chunks[-1][0] == walk_io.CHUNK_FINAL
+    assert chunks[-2][0] == walk_io.CHUNK_NODES
+    final = json.loads(chunks[-2][1].decode('utf-8'))
+    assert len(final) == len(walker.nodes)
+    for string_id, info in final:
+        assert set(info) <= set(walk_io.FINAL_KEYS)
+        assert 'count' in info
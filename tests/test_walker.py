@@ -0,0 +1,484 @@
+import os
+import time
+
+import pytest
+
+from pxr import Sdf
+
+from usd_noodle import report
+from usd_noodle.walker import DependencyWalker
+from usd_noodle.walk_cache import WalkCache
+
+
+def walk(path, **options):
+    """
+    :param options: walker attributes to set before walking, ie lexical_scan=True
+    :return: the DependencyWalker, after walking path
+    """
+    walker = DependencyWalker(path, workers=options.pop('workers', 2), engine=options.pop('engine', 'thread'),
+                              cache=options.pop('cache', None), batch_resolve=options.pop('batch_resolve', None))
+    walker.walk_attributes = False
+    for key, value in options.items():
+        setattr(walker, key, value)
+    walker.start()
+    return walker
+
+
+TEMPLATE_CLIPS = '''
+def Xform "fx" (
+    clips = {
+        dictionary default = {
+            {}
+            double templateStartTime = 1
+            double templateEndTime = 4
+            double templateStride = 1
+            asset manifestAssetPath = @./clips/manifest.usda@
+            string primPath = "/fx"
+        }
+    }
+)
+{
+}
+'''
+
+
+@pytest.mark.parametrize('lexical_scan', [False, True])
+@pytest.mark.parametrize('template', [
+    # how UsdClipsAPI authors it
+    'string templateAssetPath = "./clips/smoke.###.usd"',
+    'asset templateAssetPath = @./clips/smoke.###.usd@',
+])
+def test_template_clips(scene, lexical_scan, template):
+    root = scene('root.usda', TEMPLATE_CLIPS.replace('{}', template))
+    for frame in [1, 2, 4]:
+        scene('clips/smoke.{:03d}.usd'.format(frame))
+    scene('clips/manifest.usda')
+    
+    walker = walk(root, lexical_scan=lexical_scan)
+    info = walker.nodes['./clips/smoke.001-004.usd']
+    assert info['type'] == 'clip'
+    assert info['templateAssetPath'] == './clips/smoke.###.usd'
+    assert info['path'].endswith('/clips/smoke.001.usd')
+    assert info['clipFiles']['frames'] == [[1, 4, 1]]
+    # frame 3 has no file
+    assert info['missingFrames'] == [[3, 3, 1]]
+    assert not info['online']
+    assert (root, './clips/smoke.001-004.usd', 'clip') in walker.edges
+
+
+@pytest.mark.parametrize('lexical_scan', [False, True])
+def test_template_clips_without_times(scene, lexical_scan):
+    template = TEMPLATE_CLIPS.replace('{}', 'string templateAssetPath = "./clips/smoke.###.usd"')
+    root = scene('root.usda', template.replace('double templateEndTime = 4', ''))
+    scene('clips/smoke.001.usd')
+    scene('clips/manifest.usda')
+    
+    walker = walk(root, lexical_scan=lexical_scan)
+    # usd can't make the clip files without an end time, so neither can we. that's not a healthy clip set
+    info = walker.nodes['./clips/smoke.###.usd']
+    assert info['type'] == 'clip'
+    assert info['clipFiles'] == {'paths': []}
+    assert info['online'] is False
+    assert './clips/smoke.###.usd' in report.offline_nodes(walker)
+
+
+def resolve_elsewhere(paths):
+    """
+    Batch resolver hook that finds the clips somewhere else. module level, so the worker processes can have it
+    """
+    return [x.replace('/clips/', '/published/') for x in paths]
+
+
+@pytest.mark.parametrize('engine', ['thread', 'process'])
+def test_batch_resolve(scene, engine):
+    root = scene('root.usda', '''
+        def Xform "fx" (
+            clips = {
+                dictionary default = {
+                    asset[] assetPaths = [@./clips/smoke.001.usd@, @./clips/smoke.002.usd@]
+                    double2[] active = [(1, 0), (2, 1)]
+                    string primPath = "/fx"
+                }
+            }
+        )
+        {
+        }
+        ''')
+    for frame in [1, 2]:
+        scene('published/smoke.{:03d}.usd'.format(frame))
+    
+    walker = walk(root, engine=engine, batch_resolve=resolve_elsewhere)
+    info = walker.nodes['./clips/smoke.001-002.usd']
+    assert info['clipFiles']['directory'] == os.path.join(os.path.dirname(root), 'published')
+    assert info['online']
+
+
+def referencing(*paths, **kwargs):
+    """
+    :param paths: layers for a prim to reference
+    :param kwargs: sublayers - list of layers to sublayer
+    :return: layer text
+    """
+    text = ''
+    if kwargs.get('sublayers'):
+        text += '(\n    subLayers = [{}]\n)\n'.format(', '.join('@{}@'.format(x) for x in kwargs['sublayers']))
+    if paths:
+        text += 'def "prim" (\n    prepend references = [{}]\n)\n{{\n}}\n'.format(
+            ', '.join('@{}@'.format(x) for x in paths))
+    return text
+
+
+def layered_scene(scene):
+    """
+    root sublayers a, b and c. a and b both reference shared, c references leaf, shared sublayers base
+    :return: dict of layer name -> path
+    """
+    return {
+        'root': scene('root.usda', referencing(sublayers=['./a.usda', './b.usda', './c.usda'])),
+        'a': scene('a.usda', referencing('./shared.usda')),
+        'b': scene('b.usda', referencing('./shared.usda')),
+        'c': scene('c.usda', referencing('./leaf.usda')),
+        'shared': scene('shared.usda', referencing(sublayers=['./base.usda'])),
+        'leaf': scene('leaf.usda'),
+        'base': scene('base.usda'),
+    }
+
+
+@pytest.mark.parametrize('lexical_scan', [False, True])
+def test_diamond(scene, monkeypatch, lexical_scan):
+    layers = layered_scene(scene)
+    read = []
+    read_layer = DependencyWalker.read_layer
+    
+    def counted(walker, layer_path):
+        read.append(layer_path)
+        return read_layer(walker, layer_path)
+    
+    monkeypatch.setattr(DependencyWalker, 'read_layer', counted)
+    walker = walk(layers['root'], lexical_scan=lexical_scan)
+    
+    # a and b both use shared, but it's only read the once
+    assert sorted(read) == sorted(layers.values())
+    assert sorted(walker.nodes) == sorted(layers.values())
+    assert sorted(walker.edges) == sorted([
+        (layers['root'], layers['a'], 'sublayer'),
+        (layers['root'], layers['b'], 'sublayer'),
+        (layers['root'], layers['c'], 'sublayer'),
+        (layers['a'], layers['shared'], 'reference'),
+        (layers['b'], layers['shared'], 'reference'),
+        (layers['c'], layers['leaf'], 'reference'),
+        (layers['shared'], layers['base'], 'sublayer'),
+    ])
+    counts = dict((name, walker.nodes[path]['count']) for name, path in layers.items())
+    assert counts == {'root': 0, 'a': 1, 'b': 1, 'c': 1, 'shared': 2, 'leaf': 1, 'base': 1}
+    assert not walker.cycles
+
+
+def test_scanned_walk_matches_sdf(scene):
+    layers = layered_scene(scene)
+    walks = [walk(layers['root'], lexical_scan=x) for x in [False, True]]
+    nodes = [dict((path, dict(info.items())) for path, info in x.nodes.items()) for x in walks]
+    assert nodes[1] == nodes[0]
+    assert sorted(walks[1].edges) == sorted(walks[0].edges)
+
+
+def test_cycle(scene):
+    # a sublayer that references the layer sublayering it
+    root = scene('root.usda', referencing(sublayers=['./a.usda']))
+    a = scene('a.usda', referencing('./b.usda'))
+    b = scene('b.usda', referencing('./a.usda'))
+    
+    walker = walk(root)
+    assert sorted(walker.nodes) == sorted([root, a, b])
+    assert [sorted(x) for x in walker.cycles] == [sorted([a, b])]
+    assert walker.nodes[a]['cycle'] == walker.nodes[b]['cycle'] == 0
+    assert 'cycle' not in walker.nodes[root]
+
+
+@pytest.mark.parametrize('lexical_scan', [False, True])
+def test_udims(scene, lexical_scan):
+    root = scene('root.usda', '''
+        def "a"
+        {
+            asset texture = @./tex/wood.<UDIM>.png@
+            asset roughness = @./tex/wood.<UDIM>.png@
+        }
+        def "b"
+        {
+            asset texture = @./tex/wood.<UDIM>.png@
+        }
+        ''')
+    for tile in [1001, 1002, 1004, 1011]:
+        scene('tex/wood.{}.png'.format(tile))
+    
+    walker = walk(root, lexical_scan=lexical_scan, walk_attributes=True)
+    # the whole set is one node
+    textures = [path for path in walker.nodes if path != root]
+    assert textures == [os.path.join(os.path.dirname(root), 'tex', 'wood.<UDIM>.png')]
+    info = walker.nodes[textures[0]]
+    assert info['type'] == 'tex'
+    assert info['online']
+    assert info['tileCount'] == 4
+    assert info['missingTiles'] == [[1003, 1003, 1]]
+    assert walker.edges == [(root, textures[0], 'tex')]
+
+
+def test_parallel_walk_order(scene, monkeypatch):
+    layers = layered_scene(scene)
+    read_layer = DependencyWalker.read_layer
+    delays = iter([0.03, 0.0, 0.02, 0.01, 0.0, 0.03, 0.01] * 4)
+    
+    def shuffled(walker, layer_path):
+        # finish out of order
+        time.sleep(next(delays))
+        return read_layer(walker, layer_path)
+    
+    walks = [walk(layers['root'], workers=1)]
+    monkeypatch.setattr(DependencyWalker, 'read_layer', shuffled)
+    walks += [walk(layers['root'], workers=8) for i in range(2)]
+    # merged in the order they were found, however the threads finish
+    for walker in walks[1:]:
+        assert list(walker.nodes) == list(walks[0].nodes)
+        assert walker.edges == walks[0].edges
+    # breadth first: everything the root uses comes before what they use
+    assert list(walks[0].nodes)[:4] == [layers[x] for x in ['root', 'a', 'b', 'c']]
+
+
+@pytest.mark.parametrize('engine', ['thread', 'process'])
+def test_refresh_reuses_unchanged(scene, engine):
+    layers = layered_scene(scene)
+    walker = walk(layers['root'], engine=engine)
+    before = dict(walker.harvests)
+    assert set(before) == set(layers.values())
+    
+    # b gets a new layer, and a different size and mtime
+    new = scene('new.usda')
+    scene('b.usda', referencing('./shared.usda', './new.usda'))
+    stat = os.stat(layers['b'])
+    os.utime(layers['b'], (stat.st_atime, stat.st_mtime + 10))
+    
+    assert walker.refresh() == [layers['b']]
+    reused = [path for path, harvest in walker.harvests.items() if harvest is before.get(path)]
+    assert sorted(reused) == sorted(x for x in layers.values() if x != layers['b'])
+    assert new in walker.nodes
+    assert (layers['b'], new, 'reference') in walker.edges
+
+
+def test_cache_resolver_context(scene, tmp_path):
+    # the same layer, walked from roots with different resolver contexts, finds different files for
+    # a search path. the cached harvest from the first walk mustn't be handed to the second
+    scene('common/shared.usda', referencing('asset.usda'))
+    roots = []
+    for show in ['one', 'two']:
+        roots.append(scene('{}/root.usda'.format(show), referencing(sublayers=['../common/shared.usda'])))
+        scene('{}/asset.usda'.format(show))
+    
+    cache = WalkCache(str(tmp_path.joinpath('cache')))
+    for show, root in zip(['one', 'two'], roots):
+        walker = walk(root, cache=cache)
+        assert str(tmp_path.joinpath(show, 'asset.usda')) in walker.nodes
+
+
+SCANNED_LAYER = '''(
+    "a doc string"
+    customLayerData = {
+        string author = "me"
+        int version = 3
+        double scale = 1
+        dictionary nested = {
+            float[] weights = [1, 2.5]
+        }
+    }
+    defaultPrim = "World"
+    endTimeCode = 100
+    framesPerSecond = 24
+    startTimeCode = 1
+    timeCodesPerSecond = 24
+    upAxis = "Y"
+    subLayers = [@./sub.usda@]
+)
+
+def Xform "World" (
+    variants = {
+        string look = "clean"
+    }
+    prepend variantSets = "look"
+)
+{
+    def "asset" (
+        prepend references = @./asset.usda@</asset>
+        prepend payload = @./payload.usda@
+    )
+    {
+        asset texture = @./tex/wood.png@
+    }
+    variantSet "look" = {
+        "clean" (
+            prepend references = @./clean.usda@
+        ) {
+        }
+        "dirty" {
+        }
+    }
+}
+
+over "Other"
+{
+}
+'''
+
+
+def test_scanner_matches_sdf(scene):
+    root = scene('root.usda', SCANNED_LAYER)
+    harvests = []
+    for lexical_scan in [False, True]:
+        walker = DependencyWalker(None, workers=1)
+        walker.lexical_scan = lexical_scan
+        harvest = walker.read_layer(root)
+        # the scanner finds things in file order, Sdf in spec order
+        harvest['nodes'] = dict(harvest['nodes'])
+        harvest['edges'] = sorted(harvest['edges'])
+        harvests.append(harvest)
+    assert harvests[1] == harvests[0]
+    assert harvests[0]['layer_info']['PseudoRoot'] == '/'
+    assert harvests[0]['layer_info']['info']['comment'] == 'a doc string'
+
+
+@pytest.mark.parametrize('lexical_scan', [False, True])
+def test_scan_arcs(scene, lexical_scan):
+    root = scene('root.usda', SCANNED_LAYER)
+    layers = [root] + [scene(x, referencing('./leaf.usda')) for x in ['sub.usda', 'asset.usda', 'payload.usda',
+                                                                      'clean.usda']]
+    layers.append(scene('leaf.usda'))
+    full = walk(root, lexical_scan=lexical_scan, walk_attributes=True)
+    arcs = walk(root, lexical_scan=lexical_scan, walk_attributes=True, scan_mode='arcs')
+    # the same layers, without the textures, variants or root prim info
+    assert sorted(arcs.nodes) == sorted(layers)
+    assert set(arcs.nodes) < set(full.nodes)
+    assert 'RootPrims' not in arcs.nodes[root]
+    assert full.nodes[root]['RootPrims']
+    # the reference in the variant hangs off the layer, rather than the variant set
+    clean = layers[4]
+    assert (root, clean, 'reference') in arcs.edges
+    assert (root, clean, 'reference') not in full.edges
+    layer_edges = [x for x in full.edges if x[0] in layers and x[1] in layers]
+    assert sorted(layer_edges + [(root, clean, 'reference')]) == sorted(arcs.edges)
+
+
+def test_depth_limit(scene):
+    layers = layered_scene(scene)
+    walker = walk(layers['root'], max_depth=1)
+    # only the root's read. what it uses is there, but not walked
+    assert list(walker.harvests) == [layers['root']]
+    assert sorted(walker.nodes) == sorted(layers[x] for x in ['root', 'a', 'b', 'c'])
+    assert [x for x in walker.nodes if walker.nodes[x].get('unexpanded')] == [layers[x] for x in 'abc']
+    
+    new_nodes, new_edges = walker.expand(layers['a'])
+    assert new_nodes == [layers['shared']]
+    assert new_edges == [(layers['a'], layers['shared'], 'reference')]
+    assert 'unexpanded' not in walker.nodes[layers['a']]
+    assert walker.nodes[layers['shared']]['unexpanded']
+    assert walker.nodes[layers['shared']]['count'] == 1
+    # nothing to do for a layer that's already been walked
+    assert walker.expand(layers['a']) == ([], [])
+    
+    # b's edge to shared is new, but shared isn't
+    new_nodes, new_edges = walker.expand(layers['b'], depth=None)
+    assert new_nodes == [layers['base']]
+    assert sorted(new_edges) == [(layers['b'], layers['shared'], 'reference'),
+                                 (layers['shared'], layers['base'], 'sublayer')]
+    assert walker.nodes[layers['shared']]['count'] == 2
+    assert [x for x in walker.nodes if walker.nodes[x].get('unexpanded')] == [layers['c']]
+
+
+def test_progress_and_cancel(scene):
+    layers = layered_scene(scene)
+    found = []
+    full = walk(layers['root'], progress_callback=lambda nodes, edges: found.append((nodes, edges)))
+    # everything's handed over as it's merged. layers come again when their harvest fills in their info
+    handed = [path for nodes, edges in found for path, info in nodes]
+    assert list(dict.fromkeys(handed)) == list(full.nodes)
+    assert all(handed.count(x) <= 2 for x in handed)
+    assert [edge for nodes, edges in found for edge in edges] == full.edges
+    progress = full.progress()
+    assert progress['layers'] == len(layers)
+    assert progress['queued'] == 0
+    assert progress['elapsed'] > 0
+    
+    def cancel(nodes, edges):
+        if edges:
+            walker.cancel()
+    
+    walker = DependencyWalker(layers['root'], workers=2)
+    walker.walk_attributes = False
+    walker.progress_callback = cancel
+    walker.start()
+    # stopped after the root's harvest, and the rest is left for expand()
+    assert walker.cancelled
+    assert list(walker.harvests) == [layers['root']]
+    assert [x for x in walker.nodes if walker.nodes[x].get('unexpanded')] == [layers[x] for x in 'abc']
+
+
+def nested_layer(depth):
+    """
+    :return: layer text with prims nested depth deep. the deepest has a reference and a texture,
+             and the one in the middle a variant set with a reference in one of its variants
+    """
+    lines = []
+    for level in range(depth):
+        indent = '    ' * level
+        if level == depth // 2:
+            lines += [indent + 'def "p{}" ('.format(level),
+                      indent + '    variants = {',
+                      indent + '        string look = "clean"',
+                      indent + '    }',
+                      indent + '    prepend variantSets = "look"',
+                      indent + ')',
+                      indent + '{',
+                      indent + '    variantSet "look" = {',
+                      indent + '        "clean" {',
+                      indent + '            def "inside" (',
+                      indent + '                prepend references = @./clean.usda@',
+                      indent + '            )',
+                      indent + '            {',
+                      indent + '            }',
+                      indent + '        }',
+                      indent + '    }']
+        else:
+            lines += [indent + 'def "p{}"'.format(level), indent + '{']
+    indent = '    ' * depth
+    lines += [indent + 'def "leaf" (',
+              indent + '    prepend references = @./leaf.usda@',
+              indent + ')',
+              indent + '{',
+              indent + '    asset texture = @./tex/wood.png@',
+              indent + '    float size = 1',
+              indent + '}']
+    lines += ['    ' * level + '}' for level in reversed(range(depth))]
+    return '\n'.join(lines) + '\n'
+
+
+def test_read_nested_layer(scene):
+    root = scene('root.usda', nested_layer(60))
+    directory = os.path.dirname(root)
+    walker = DependencyWalker(None, workers=1)
+    walker.walk_attributes = True
+    walker.lexical_scan = False
+    harvest = walker.read_layer(root)
+    leaf = os.path.join(directory, 'leaf.usda')
+    clean = os.path.join(directory, 'clean.usda')
+    texture = os.path.join(directory, 'tex', 'wood.png')
+    variant_path = os.path.join(directory, 'root:look')
+    assert harvest['references'] == [leaf, clean]
+    assert sorted(harvest['edges']) == sorted([
+        (root, leaf, 'reference'),
+        (root, texture, 'tex'),
+        (root, variant_path, 'variant'),
+        # arcs in variants hang off the variant set, by the variant they're in
+        (variant_path, clean, 'clean'),
+    ])
+    # only the prims that had something to give get fetched. everything else is just a path
+    prims, variant_sets, variant_prims, attributes = walker.collect_specs(Sdf.Layer.FindOrOpen(root))
+    assert len(prims) == 61
+    assert len(variant_sets) == 1
+    assert len(attributes) == 2
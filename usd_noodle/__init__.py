@@ -1,8 +1,41 @@
 import sys
 import os.path
+import importlib
 
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "vendor"))
-from Qt import QtWidgets, QtGui, QtCore
-from app import *
 
+# everything the package hands out, and the module it lives in (relative to the package, apart from Qt).
+# nothing gets imported until it's asked for, so `import usd_noodle` doesn't pay for Qt, usd and nodz
+_exports = {
+    'main': '.app',
+    'NoodleWidget': '.app',
+    'NodeGraphWindow': '.app',
+    'DependencyWalker': '.walker',
+    'DependencyGraph': '.dependency_graph',
+    'NodeRecord': '.records',
+    'WalkCache': '.walk_cache',
+    'QtWidgets': 'Qt',
+    'QtGui': 'Qt',
+    'QtCore': 'Qt',
+}
+
+
+def __getattr__(name):
+    module_name = _exports.get(name)
+    if module_name is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # only import once
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
+
+
+if sys.version_info < (3, 7):
+    # no module level __getattr__ before 3.7, so it's the old eager import
+    from Qt import QtWidgets, QtGui, QtCore
+    from .app import *
@@ -1,25 +1,115 @@
 import argparse
 import sys
-import sys
 import os.path
 
-sys.path.append(os.path.join(os.path.dirname(__file__), "vendor"))
+if not __package__:
+    # run as a script (python usd_noodle/) rather than with -m. import ourselves as the package,
+    # so the modules in here get their relative imports
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = 'usd_noodle'
+
+from .walker import DependencyWalker, WALK_ENGINES, DEFAULT_WALK_WORKERS, ENGINE_THREAD, SCAN_FULL, SCAN_ARCS, logger
+from .walk_cache import WalkCache
+from . import report
+from . import walk_io
 
-from Qt import QtWidgets, QtGui, QtCore
-from app import *
+
+def headless(args):
+    """
+    Walk the file without any ui (or Qt) and write out what we found
+    :return: exit status
+    """
+    if not os.path.isfile(args.usdfile):
+        logger.error('Cannot find file: {}'.format(args.usdfile))
+        return 2
+    
+    cache = None
+    if not args.no_cache:
+        cache = WalkCache()
+    walker = DependencyWalker(args.usdfile, workers=args.workers or DEFAULT_WALK_WORKERS, engine=args.engine,
+                              cache=cache, keep_layers=args.keep_layers, memory_limit=memory_limit(args))
+    walker.walk_attributes = args.textures
+    walker.scan_mode = SCAN_ARCS if args.arcs_only else SCAN_FULL
+    walker.lexical_scan = args.lex_usda
+    walker.max_depth = args.depth or None
+    # these stream out as the walk goes, rather than waiting for it to finish
+    if args.jsonl:
+        walker.writers.append(walk_io.JsonlWalkWriter(args.jsonl))
+    if args.binary:
+        walker.writers.append(walk_io.BinaryWalkWriter(args.binary))
+    walker.start()
+    
+    if args.json:
+        report.write_json(args.json, walker)
+    
+    if args.strict and (walker.errored_nodes or walker.cycles or report.offline_nodes(walker)):
+        return 1
+    return 0
+
+
+def memory_limit(args):
+    if args.memory_limit:
+        return args.memory_limit * 1024 * 1024
+    return None
+
+
+def gui(args):
+    # only now do we need Qt and friends
+    sys.path.append(os.path.join(os.path.dirname(__file__), "vendor"))
+    from Qt import QtWidgets
+    from .app import main
+    
+    app = QtWidgets.QApplication(sys.argv)
+    win = main(args.usdfile, walk_attributes=args.textures, workers=args.workers, engine=args.engine,
+               use_cache=not args.no_cache, arcs_only=args.arcs_only, lexical_scan=args.lex_usda,
+               keep_layers=args.keep_layers, memory_limit=memory_limit(args), max_depth=args.depth)
+    return app.exec_()
 
 
 def cli():
     
     parser = argparse.ArgumentParser()
     
-    parser.add_argument('-i', '--usdfile', help='usd file to load')
+    parser.add_argument('-i', '--usdfile', help='usd file to load, or a walk saved with --jsonl / --binary / --json')
     parser.add_argument('-t', '--textures', action='store_true', help="Load textures (ie, walk attributes)")
+    parser.add_argument('-a', '--arcs-only', action='store_true',
+                        help="Quick scan of sublayers, references and payloads only")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Number of layers to open at the same time (default {})".format(DEFAULT_WALK_WORKERS))
+    parser.add_argument('-e', '--engine', choices=WALK_ENGINES, default=ENGINE_THREAD,
+                        help="Walk with a pool of threads, or shard the layers across a pool of processes")
+    parser.add_argument('-l', '--lex-usda', action='store_true',
+                        help="Scan .usda files as text rather than opening them with Sdf. Much quicker on big "
+                             "ascii layers - falls back to Sdf for anything the scanner doesn't understand")
+    parser.add_argument('-d', '--depth', type=int, default=None,
+                        help="Levels of layers to walk (0 for all). Deeper layers are left unexpanded")
+    parser.add_argument('--keep-layers', type=int, default=0,
+                        help="Number of walked layers to keep open for viewing (default 0 - let them all go)")
+    parser.add_argument('--memory-limit', type=int, default=None,
+                        help="Memory ceiling in mb. Over it, kept layers are let go and layers are opened one at a time")
+    parser.add_argument('--no-cache', action='store_true', help="Don't use the on-disk walk cache")
+    parser.add_argument('--cache-dir', help="Walk cache directory (default $USD_NOODLE_CACHE or ~/.cache/usd-noodle)")
+    parser.add_argument('--json', metavar='OUT',
+                        help="No gui - write the nodes, edges, offline files and errors to a json file ('-' for stdout)")
+    parser.add_argument('--jsonl', metavar='OUT',
+                        help="No gui - stream them out as json lines while walking, one record per line ('-' for stdout)")
+    parser.add_argument('--binary', metavar='OUT',
+                        help="No gui - stream them out in the compact binary format while walking ('-' for stdout)")
+    parser.add_argument('--strict', action='store_true',
+                        help="With --json / --jsonl / --binary, exit with status 1 if anything is offline, had load errors "
+                             "or is part of a dependency cycle")
     args = parser.parse_args()
-
-    app = QtWidgets.QApplication(sys.argv)
-    win = main(args.usdfile, walk_attributes=args.textures)
-    sys.exit(app.exec_())
+    
+    if args.cache_dir:
+        # picked up by WalkCache, including in any walker processes
+        os.environ['USD_NOODLE_CACHE'] = args.cache_dir
+    
+    if args.json or args.jsonl or args.binary:
+        if not args.usdfile:
+            parser.error('--json / --jsonl / --binary need a usd file (-i)')
+        sys.exit(headless(args))
+    
+    sys.exit(gui(args))
 
 
 if __name__ == "__main__":
@@ -1,5 +1,4 @@
 from __future__ import print_function
-import logging
 import os.path
 import sys
 import argparse
@@ -9,420 +8,30 @@ import fnmatch
 from functools import partial
 import subprocess
 import threading
-import sys
 import platform
 
 from Qt import QtCore, QtWidgets, QtGui
-from pxr import Usd, Sdf, Ar, UsdUtils, Tf
+from pxr import Sdf
 
-import utils
-from vendor.Nodz import nodz_main
-import text_view
-import info_panel
+from . import utils
+from .dependency_graph import DependencyGraph
+from .walker import DependencyWalker, DEFAULT_WALK_WORKERS, ENGINE_THREAD, SCAN_FULL, SCAN_ARCS, logger
+from .walk_cache import WalkCache
+from .walk_thread import WalkThread
+from .layout_thread import LayoutThread
+from . import layout
+from . import walk_io
+from .vendor.Nodz import nodz_main
+from . import info_panel
 
-import re
 from pprint import pprint
 
 
-digitSearch = re.compile(r'\b\d+\b')
-
-logger = logging.getLogger('usd-noodle')
-logger.setLevel(logging.INFO)
-if not len(logger.handlers):
-    ch = logging.StreamHandler()
-    ch.setLevel(logging.DEBUG)
-    logger.addHandler(ch)
-logger.propagate = False
-
-
 def launch_usdview(usdfile):
     print('launching usdview', usdfile)
     subprocess.call(['usdview', usdfile], shell=True)
 
 
-class DependencyWalker(object):
-    def __init__(self, usdfile):
-        self.usdfile = usdfile
-        self.walk_attributes = True
-        
-        logger.info('DependencyWalker'.center(40, '-'))
-        logger.info('Loading usd file: {}'.format(self.usdfile))
-        self.nodes = {}
-        self.edges = []
-        
-        self.resolver = Ar.GetResolver()
-        
-        self.visited_nodes = []
-        
-        self.errored_nodes = []
-    
-    
-    def start(self):
-        self.visited_nodes = []
-        self.nodes = {}
-        self.edges = []
-        self.init_edges = []
-        
-        layer = Sdf.Layer.FindOrOpen(self.usdfile)
-        if not layer:
-            return
-        
-        # scrub the initial file path
-        # to get around upper/lowercase drive letters
-        # and junk like that
-        layer_path = Sdf.ComputeAssetPathRelativeToLayer(layer, os.path.basename(self.usdfile))
-        
-        self.usdfile = layer_path
-        
-        info = {}
-        info['online'] = os.path.isfile(layer_path)
-        info['path'] = layer_path
-        info['type'] = 'sublayer'
-        self.nodes[layer_path] = info
-        
-        self.walkStageLayers(layer_path)
-        
-        for edge in self.edges:
-            start = edge[0]
-            end = edge[1]
-            
-            info = self.nodes[end]
-            info['count'] = info.get("count", 0) + 1
-            self.nodes[end] = info
-    
-    
-    def get_flat_child_list(self, path):
-        ret = [path]
-        for key, child in path.nameChildren.items():
-            ret.extend(self.get_flat_child_list(child))
-        ret = list(set(ret))
-        return ret
-    
-    
-    def flatten_ref_list(self, ref_or_payload):
-        ret = []
-        for itemlist in [ref_or_payload.appendedItems, ref_or_payload.explicitItems, ref_or_payload.addedItems,
-                         ref_or_payload.prependedItems, ref_or_payload.orderedItems]:
-            for payload in itemlist:
-                ret.append(payload)
-        return list(set(ret))
-    
-    
-    def resolve(self, layer, path):
-        resolved = self.resolver.Resolve(path)
-        if resolved:
-            return resolved.GetPathString()
-        else:
-            # resolver will return None on invalid paths
-            # we still want the path regardless
-            return path
-    
-    
-    def walkStageLayers(self, layer_path, level=1):
-        id = '-' * (level)
-        
-        sublayers = []
-        payloads = []
-        references = []
-        
-        try:
-            layer = Sdf.Layer.FindOrOpen(layer_path)
-        except Tf.ErrorException as e:
-            info = {}
-            info['online'] = True
-            info['error'] = True
-            info['path'] = layer_path
-            self.nodes[layer_path] = info
-            self.errored_nodes.append(layer_path)
-            logger.info('usd file: {} had load errors'.format(layer_path))
-            return
-        
-        if not layer:
-            return
-        # print(id, layer.realPath)
-        root = layer.pseudoRoot
-        # print(id, 'root', root)
-        
-        # print(id, 'children'.center(40, '-'))
-        
-        child_list = []
-        # info packet from the root prim
-        if layer_path in self.nodes:
-            info = self.nodes[layer_path]
-            child_list = self.get_flat_child_list(root)
-            info_dict = dict()
-            for key in root.ListInfoKeys():
-                if key in ['subLayers', 'subLayerOffsets']:
-                    continue
-                info_dict[key] = root.GetInfo(key)
-            
-            info['info'] = info_dict
-            info['specifier'] = root.specifier.displayName
-            info['muted'] = layer.IsMuted()
-            info['defaultPrim'] = layer.defaultPrim
-            info['PseudoRoot'] = layer.pseudoRoot.name
-            info['RootPrims'] = [x.path.GetPrimPath().pathString for x in layer.rootPrims]
-            self.nodes[layer_path] = info
-        
-        for child in child_list:
-            # print(id, child)
-            
-            if self.walk_attributes:
-                attributes = child.attributes
-                for attr in attributes:
-                    # we are looking for "asset" type attributes
-                    # references to external things
-                    if attr.typeName == 'asset':
-                        value = attr.default
-                        # sometimes you get empty paths
-                        if not value:
-                            continue
-                        if not value.path:
-                            continue
-                        
-                        resolved_path = self.resolve(layer, value.path)
-                        info = {}
-                        info['online'] = os.path.isfile(resolved_path)
-                        info['path'] = resolved_path
-                        filebase, ext = os.path.splitext(resolved_path)
-                        info['type'] = 'ext'
-                        if ext in ['.jpg', '.tex', '.tx', '.png', '.exr', '.hdr', '.tga', '.tif', '.tiff',
-                                   '.pic', '.gif', '.psd', '.ptex', '.cin', '.dpx', '.bmp', '.iff',
-                                   '.mov', '.m4v', '.mp4', '.webp']:
-                            info['type'] = 'tex'
-                            info['colorspace'] = attr.colorSpace
-                        
-                        self.nodes[resolved_path] = info
-                        
-                        # so, we want to find out if this attribute is inside a shader
-                        # it's conceivable that asset attrs could exist outside of shaders
-                        # i just havent seen that in the wild yet
-                        # crawl through the ancestors - ie Material -> Shader -> Attribute
-                        owner = attr.owner
-                        owner_type = owner.typeName
-                        if owner_type == 'Shader':
-                            owner_parent = owner.nameParent
-                            if owner_parent.typeName == 'Material':
-                                material_path = '{}:{}'.format(os.path.splitext(layer.realPath)[0], owner_parent.name)
-                                info = {}
-                                info['online'] = True
-                                info['path'] = material_path
-                                info['type'] = 'material'
-                                
-                                self.nodes[material_path] = info
-                                
-                                # connect the material to the layer
-                                if not [layer_path, material_path, 'materials'] in self.edges:
-                                    self.edges.append([layer_path, material_path, 'materials'])
-                                
-                                # then connect the file to the material
-                                if not [material_path, resolved_path, owner.name] in self.edges:
-                                    self.edges.append([material_path, resolved_path, owner.name])
-                                
-                                continue
-                        
-                        # finally, if it doesn't smell like a material
-                        # then just set up a regular connectio to the layer
-                        if not [layer_path, resolved_path, info['type']] in self.edges:
-                            self.edges.append([layer_path, resolved_path, info['type']])
-            
-            clip_info = child.GetInfo("clips")
-            # pprint(clip_info)
-            for clip_set_name in clip_info:
-                clip_set = clip_info[clip_set_name]
-                # print(clip_set_name, clip_set.get("assetPaths"), clip_set.get("manifestAssetPath"), clip_set.get()
-                #     "primPath")
-                
-                """
-                @todo: subframe handling
-                integer frames: path/basename.###.usd
-                subinteger frames: path/basename.##.##.usd.
-                
-                @todo: non-1 increments
-                """
-                clip_asset_paths = clip_set.get("assetPaths")
-                # don't use resolved path in case either the first or last file is missing from disk
-                firstFile = str(clip_asset_paths[0].path)
-                lastFile = str(clip_asset_paths[-1].path)
-                if digitSearch.findall(firstFile):
-                    firstFileNum = digitSearch.findall(firstFile)[-1]
-                else:
-                    firstFileNum = '???'
-                
-                if digitSearch.findall(lastFile):
-                    lastFileNum = digitSearch.findall(lastFile)[-1]
-                else:
-                    lastFileNum = '???'
-                digitRange = str(firstFileNum + '-' + lastFileNum)
-                nodeName = ''
-                
-                firstFileParts = firstFile.split(firstFileNum)
-                for i in range(len(firstFileParts) - 1):
-                    nodeName += str(firstFileParts[i])
-                
-                nodeName += digitRange
-                nodeName += firstFileParts[-1]
-                
-                allFilesFound = True
-                for path in clip_asset_paths:
-                    clip_path = self.resolve(layer, path.path)
-                    if not os.path.isfile(clip_path):
-                        allFilesFound = False
-                        break
-                
-                # TODO : make more efficient - looping over everything currently
-                # TODO: validate presence of all files in the clip seq. bg thread?
-                
-                manifestPath = clip_set.get("manifestAssetPath")
-                refpath = self.resolve(layer, clip_asset_paths[0].path)
-                clipmanifest_path = self.resolve(layer, manifestPath.path)
-                
-                info = {}
-                info['online'] = allFilesFound
-                info['path'] = refpath
-                info['type'] = 'clip'
-                info['primPath'] = clip_set.get("primPath")
-                info['clipSet'] = clip_set_name
-                
-                self.nodes[nodeName] = info
-                
-                if not [layer_path, nodeName, 'clip'] in self.edges:
-                    self.edges.append([layer_path, nodeName, 'clip'])
-                
-                if not [nodeName, clipmanifest_path, 'manifest'] in self.edges:
-                    self.edges.append([nodeName, clipmanifest_path, 'manifest'])
-            
-            if child.variantSets:
-                for varset in child.variantSets:
-                    # print(child, 'variant set', varset.name)
-                    variant_path = '{}:{}'.format(os.path.splitext(layer.realPath)[0], varset.name)
-                    varprim = varset.owner
-                    
-                    info = {}
-                    info['online'] = True
-                    info['path'] = variant_path
-                    info['type'] = 'variant'
-                    info['variant_set'] = varset.name
-                    info['variants'] = [str(x) for x in varset.variants.keys()]
-                    
-                    info['current_variant'] = varprim.variantSelections.get(varset.name)
-                    
-                    self.nodes[variant_path] = info
-                    
-                    if not [layer_path, variant_path, 'variant'] in self.edges:
-                        self.edges.append([layer_path, variant_path, 'variant'])
-                    
-                    for variant_name in varset.variants.keys():
-                        variant = varset.variants[variant_name]
-                        
-                        # so variants can host payloads and references
-                        # we get to these through the variants primspec
-                        # and then add them to our list of paths to inspect
-                        
-                        for primspec_child in self.get_flat_child_list(variant.primSpec):
-                            
-                            for payload in self.flatten_ref_list(primspec_child.payloadList):
-                                pathToResolve = payload.assetPath
-                                if pathToResolve:
-                                    refpath = self.resolve(layer, pathToResolve)
-                                    payloads.append(refpath)
-                                    
-                                    info = {}
-                                    info['online'] = os.path.isfile(refpath)
-                                    info['path'] = refpath
-                                    info['type'] = 'payload'
-                                    
-                                    self.nodes[refpath] = info
-                                    
-                                    if not [variant_path, refpath, variant_name] in self.edges:
-                                        self.edges.append([variant_path, refpath, variant_name])
-                            
-                            for reference in self.flatten_ref_list(primspec_child.referenceList):
-                                pathToResolve = reference.assetPath
-                                if pathToResolve:
-                                    refpath = self.resolve(layer, pathToResolve)
-                                    references.append(refpath)
-                                    
-                                    info = {}
-                                    info['online'] = os.path.isfile(refpath)
-                                    info['path'] = refpath
-                                    info['type'] = 'reference'
-                                    
-                                    self.nodes[refpath] = info
-                                    
-                                    if not [variant_path, refpath, variant_name] in self.edges:
-                                        self.edges.append([variant_path, refpath, variant_name])
-            
-            payloadList = self.flatten_ref_list(child.payloadList)
-            for payload in payloadList:
-                pathToResolve = payload.assetPath
-                if pathToResolve:
-                    refpath = self.resolve(layer, pathToResolve)
-                    payloads.append(refpath)
-                    
-                    info = {}
-                    info['online'] = os.path.isfile(refpath)
-                    info['path'] = refpath
-                    info['type'] = 'payload'
-                    
-                    self.nodes[refpath] = info
-                    
-                    if not [layer_path, refpath, 'payload'] in self.edges:
-                        self.edges.append([layer_path, refpath, 'payload'])
-            
-            referenceList = self.flatten_ref_list(child.referenceList)
-            for reference in referenceList:
-                pathToResolve = reference.assetPath
-                if pathToResolve:
-                    refpath = self.resolve(layer, pathToResolve)
-                    references.append(refpath)
-                    
-                    info = {}
-                    info['online'] = os.path.isfile(refpath)
-                    info['path'] = refpath
-                    info['type'] = 'reference'
-                    
-                    self.nodes[refpath] = info
-                    
-                    if not [layer_path, refpath, 'reference'] in self.edges:
-                        self.edges.append([layer_path, refpath, 'reference'])
-        
-        for rel_sublayer in layer.subLayerPaths:
-            refpath = self.resolve(layer, rel_sublayer)
-            sublayers.append(refpath)
-            
-            info = {}
-            info['online'] = os.path.isfile(refpath)
-            info['path'] = refpath
-            info['type'] = 'sublayer'
-            self.nodes[refpath] = info
-            
-            if not [layer_path, refpath, 'sublayer'] in self.edges:
-                self.edges.append([layer_path, refpath, 'sublayer'])
-        
-        sublayers = list(set(sublayers))
-        references = list(set(references))
-        payloads = list(set(payloads))
-        
-        if sublayers:
-            logger.debug((id, 'sublayerPaths'.center(40, '-')))
-            logger.debug((id, sublayers))
-        for sublayer in sublayers:
-            self.walkStageLayers(sublayer, level=level + 1)
-        
-        if references:
-            logger.debug((id, 'references'.center(40, '-')))
-            logger.debug((id, references))
-        for reference in references:
-            self.walkStageLayers(reference, level=level + 1)
-        
-        if payloads:
-            logger.debug((id, 'payloads'.center(40, '-')))
-            logger.debug((id, payloads))
-        for payload in payloads:
-            self.walkStageLayers(payload, level=level + 1)
-
-
 def find_node(node_coll, attr_name, attr_value):
     for x in node_coll:
         node = node_coll[x]
@@ -480,13 +89,17 @@ class FindNodeWindow(QtWidgets.QDialog):
 
 
 class NodeGraphWindow(QtWidgets.QDialog):
-    def __init__(self, usdfile=None, walk_attributes=False, parent=None):
+    def __init__(self, usdfile=None, walk_attributes=False, workers=None, engine=ENGINE_THREAD, use_cache=True,
+                 arcs_only=False, lexical_scan=False, keep_layers=0, memory_limit=None, max_depth=None, parent=None):
         super(NodeGraphWindow, self).__init__(parent)
         self.settings = QtCore.QSettings("chrisg", "usd-noodle")
         self.setWindowTitle("Noodle")
         self.build_ui()
         
-        self.noodle = NoodleWidget(usdfile=None, walk_attributes=walk_attributes, parent=self)
+        self.noodle = NoodleWidget(usdfile=None, walk_attributes=walk_attributes, workers=workers, engine=engine,
+                                   use_cache=use_cache, arcs_only=arcs_only, lexical_scan=lexical_scan,
+                                   keep_layers=keep_layers, memory_limit=memory_limit, max_depth=max_depth,
+                                   parent=self)
         self.noodle.file_loaded.connect(self.file_loaded)
         self.top_layout.addWidget(self.noodle)
         self.show()
@@ -526,15 +139,52 @@ class NoodleWidget(QtWidgets.QWidget):
     file_loaded = QtCore.Signal(object)  # string
     
     
-    def __init__(self, usdfile=None, walk_attributes=False, parent=None):
+    def __init__(self, usdfile=None, walk_attributes=False, workers=None, engine=ENGINE_THREAD, use_cache=True,
+                 arcs_only=False, lexical_scan=False, keep_layers=0, memory_limit=None, max_depth=None, parent=None):
         super(NoodleWidget, self).__init__(parent)
         self.settings = QtCore.QSettings("chrisg", "usd-noodle")
         
+        # number of layers the walker opens at once. remembered between sessions
+        if workers is None:
+            workers = int(self.settings.value("walkWorkers", DEFAULT_WALK_WORKERS))
+        self.workers = workers
+        # levels of layers to walk before leaving placeholders to expand. 0 walks everything
+        if max_depth is None:
+            max_depth = int(self.settings.value("walkDepth", 0))
+        self.max_depth = max_depth
+        # thread or process pool walking
+        self.engine = engine
+        # on-disk cache of layer harvests, so unchanged layers don't get re-read on reload
+        self.walk_cache = None
+        if use_cache:
+            self.walk_cache = WalkCache()
+        
         self.usdfile = usdfile
         self.root_node = None
+        # dependency graph from the last walk. used for selection queries
+        self.graph = DependencyGraph()
+        # the walker from the last load, which the reload button refreshes
+        self.walker = None
+        # the thread walking in the background while a file loads or reloads
+        self.walk_thread = None
+        # copies of the walker's nodes and edges from before a reload, to diff against when it's done
+        self._reload_nodes = None
+        self._reload_edges = None
+        # where the scene nodes are, so new ones can be put in the gaps without moving anything
+        self.placer = layout.NodePlacer()
+        # the thread working out the latest layout, and whether to frame everything when it's applied
+        self.layout_thread = None
+        self._layout_focus_all = False
         
         self.nodz = None
         self.walk_attributes = walk_attributes
+        # quick look mode - only the layer / reference / payload arcs
+        self.arcs_only = arcs_only
+        # lex .usda files rather than opening them with Sdf
+        self.lexical_scan = lexical_scan
+        # number of harvested layers the walker keeps open for viewing, and its memory ceiling (bytes)
+        self.keep_layers = keep_layers
+        self.memory_limit = memory_limit
         
         self.find_win = None
         self.build_ui()
@@ -544,15 +194,32 @@ class NoodleWidget(QtWidgets.QWidget):
     
     
     def cleanup(self):
+        self.cancel_walk(wait=True)
+        if self.layout_thread is not None:
+            self.layout_thread.wait()
         if self.find_win:
             self.find_win.close()
         self.settings.setValue("splitterSizes", self.splitter.saveState())
+        self.settings.setValue("walkWorkers", self.workers)
+        self.settings.setValue("walkDepth", self.max_depth)
     
     
     def loadTextChkChanged(self, state):
         self.walk_attributes = self.loadTextChk.isChecked()
     
     
+    def arcsOnlyChkChanged(self, state):
+        self.arcs_only = self.arcsOnlyChk.isChecked()
+    
+    
+    def workersChanged(self, value):
+        self.workers = value
+    
+    
+    def depthChanged(self, value):
+        self.max_depth = value
+    
+    
     def build_ui(self):
         
         self.top_layout = QtWidgets.QVBoxLayout()
@@ -579,7 +246,7 @@ class NoodleWidget(QtWidgets.QWidget):
         
         self.reloadBtn = QtWidgets.QPushButton("Reload")
         self.reloadBtn.setShortcut('Ctrl+r')
-        self.reloadBtn.clicked.connect(self.load_file)
+        self.reloadBtn.clicked.connect(self.reload_file)
         self.toolbar_lay.addWidget(self.reloadBtn)
         
         self.loadTextChk = QtWidgets.QCheckBox("Load Textures")
@@ -587,6 +254,29 @@ class NoodleWidget(QtWidgets.QWidget):
         self.loadTextChk.stateChanged.connect(self.loadTextChkChanged)
         self.toolbar_lay.addWidget(self.loadTextChk)
         
+        self.arcsOnlyChk = QtWidgets.QCheckBox("Arcs Only")
+        self.arcsOnlyChk.setToolTip("Quick scan of sublayers, references and payloads only")
+        self.arcsOnlyChk.setChecked(self.arcs_only)
+        self.arcsOnlyChk.stateChanged.connect(self.arcsOnlyChkChanged)
+        self.toolbar_lay.addWidget(self.arcsOnlyChk)
+        
+        self.toolbar_lay.addWidget(QtWidgets.QLabel("Workers"))
+        self.workersSpin = QtWidgets.QSpinBox()
+        self.workersSpin.setRange(1, 64)
+        self.workersSpin.setValue(self.workers)
+        self.workersSpin.setToolTip("Number of layers to open at the same time")
+        self.workersSpin.valueChanged.connect(self.workersChanged)
+        self.toolbar_lay.addWidget(self.workersSpin)
+        
+        self.toolbar_lay.addWidget(QtWidgets.QLabel("Depth"))
+        self.depthSpin = QtWidgets.QSpinBox()
+        self.depthSpin.setRange(0, 999)
+        self.depthSpin.setSpecialValueText("All")
+        self.depthSpin.setValue(self.max_depth)
+        self.depthSpin.setToolTip("Levels of layers to walk. Deeper layers are left unexpanded until double clicked")
+        self.depthSpin.valueChanged.connect(self.depthChanged)
+        self.toolbar_lay.addWidget(self.depthSpin)
+        
         self.findBtn = QtWidgets.QPushButton("Find...")
         self.findBtn.setShortcut('Ctrl+f')
         self.findBtn.clicked.connect(self.findWindow)
@@ -603,6 +293,23 @@ class NoodleWidget(QtWidgets.QWidget):
         toolbarspacer = QtWidgets.QSpacerItem(10, 10, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
         self.toolbar_lay.addItem(toolbarspacer)
         
+        # walk progress. only shown while a file is loading
+        self.progressBar = QtWidgets.QProgressBar()
+        self.progressBar.setRange(0, 0)
+        self.progressBar.setMaximumWidth(120)
+        self.progressBar.hide()
+        self.toolbar_lay.addWidget(self.progressBar)
+        
+        self.progressLabel = QtWidgets.QLabel()
+        self.progressLabel.hide()
+        self.toolbar_lay.addWidget(self.progressLabel)
+        
+        self.cancelBtn = QtWidgets.QPushButton("Cancel")
+        self.cancelBtn.setToolTip("Stop loading. Layers that haven't been walked yet are left unexpanded")
+        self.cancelBtn.clicked.connect(self.cancel_walk)
+        self.cancelBtn.hide()
+        self.toolbar_lay.addWidget(self.cancelBtn)
+        
         self.splitter = QtWidgets.QSplitter()
         
         self.top_layout.addWidget(self.splitter)
@@ -641,6 +348,7 @@ class NoodleWidget(QtWidgets.QWidget):
         self.nodz.signal_NodeSelected.connect(self.on_nodeSelected)
         self.nodz.signal_NodeContextMenuEvent.connect(self.node_context_menu)
         self.nodz.signal_KeyPressed.connect(self.pickwalk)
+        self.nodz.signal_NodeDoubleClicked.connect(self.expand_node)
         
         if self.settings.value("splitterSizes"):
             self.splitter.restoreState(self.settings.value("splitterSizes"))
@@ -652,70 +360,40 @@ class NoodleWidget(QtWidgets.QWidget):
         
         original_sel = self.nodz.scene().selectedItems()
         sel = original_sel[0]
-        clear_selection = False
         
+        # walk the dependency graph rather than the scene connections
+        # right goes to the first node using this one, left to the first node this one uses
+        # up/down step through the siblings under the first parent
+        target = None
         if key == QtCore.Qt.Key_Right:
-            plug_names = list(sel.plugs.keys())
-            if plug_names:
-                plug = plug_names[0]
-                for i, conn in enumerate(sel.plugs[plug].connections):
-                    parent_node = self.nodz.scene().nodes[conn.socketNode]
-                    parent_node.setSelected(True)
-                    clear_selection = True
-                    break
+            parents = self.graph.parents(sel.name)
+            if parents:
+                target = parents[0]
         
         elif key == QtCore.Qt.Key_Left:
-            socket_names = list(sel.sockets.keys())
-            if socket_names:
-                socket = socket_names[0]
-                for i, conn in enumerate(sel.sockets[socket].connections):
-                    child_node = self.nodz.scene().nodes[conn.plugNode]
-                    child_node.setSelected(True)
-                    clear_selection = True
-                    break
-        
-        
-        elif key == QtCore.Qt.Key_Up:
-            plug_names = list(sel.plugs.keys())
-            if plug_names:
-                plug = plug_names[0]
-                for i, conn in enumerate(sel.plugs[plug].connections):
-                    siblings = []
-                    for par_conn in conn.socketItem.connections:
-                        siblings.append(par_conn.plugNode)
-                    cur_index = siblings.index(sel.name)
-                    if cur_index == 0:
-                        return
-                    sibling = siblings[cur_index - 1]
-                    child_node = self.nodz.scene().nodes[sibling]
-                    child_node.setSelected(True)
-                    clear_selection = True
-        
-        
-        elif key == QtCore.Qt.Key_Down:
-            plug_names = list(sel.plugs.keys())
-            if plug_names:
-                plug = plug_names[0]
-                for i, conn in enumerate(sel.plugs[plug].connections):
-                    siblings = []
-                    for par_conn in conn.socketItem.connections:
-                        siblings.append(par_conn.plugNode)
-                    cur_index = siblings.index(sel.name)
-                    if cur_index == len(siblings) - 1:
-                        return
-                    sibling = siblings[cur_index + 1]
-                    child_node = self.nodz.scene().nodes[sibling]
-                    child_node.setSelected(True)
-                    clear_selection = True
-        
-        if clear_selection:
-            for node in original_sel:
-                node.setSelected(False)
+            children = self.graph.children(sel.name)
+            if children:
+                target = children[0]
+        
+        elif key in [QtCore.Qt.Key_Up, QtCore.Qt.Key_Down]:
+            siblings = self.graph.siblings(sel.name)
+            cur_index = siblings.index(sel.name)
+            if key == QtCore.Qt.Key_Up and cur_index > 0:
+                target = siblings[cur_index - 1]
+            elif key == QtCore.Qt.Key_Down and cur_index < len(siblings) - 1:
+                target = siblings[cur_index + 1]
+        
+        if target is None or target not in self.nodz.scene().nodes:
+            return
+        
+        self.nodz.scene().nodes[target].setSelected(True)
+        for node in original_sel:
+            node.setSelected(False)
     
     
     def on_nodeMoved(self, nodeName, nodePos):
         # print('node {0} moved to {1}'.format(nodeName, nodePos))
-        pass
+        self.track_nodes([nodeName])
     
     
     def on_nodeSelected(self, selected_nodes):
@@ -725,7 +403,8 @@ class NoodleWidget(QtWidgets.QWidget):
         userdata = node.userData
         path = userdata.get('path')
         if path:
-            self.info_panel.loadData(path, userdata)
+            # the panel gets a plain dict to itself, the node keeps its compact record
+            self.info_panel.loadData(path, dict(userdata))
     
     
     def findWindow(self):
@@ -770,23 +449,38 @@ class NoodleWidget(QtWidgets.QWidget):
     
     
     def node_upstream(self, node_name):
-        start_node = self.get_node_from_name(node_name)
-        connected_nodes = start_node.upstream_nodes()
+        connected_nodes = self.graph.upstream(node_name)
         
         for node_name in self.nodz.scene().nodes:
             node = self.nodz.scene().nodes[node_name]
-            if node in connected_nodes:
+            if node_name in connected_nodes:
                 node.setSelected(True)
             else:
                 node.setSelected(False)
     
     
+    def node_cycle(self, node_name):
+        """
+        Select the dependency loop the node is in
+        """
+        cycle = self.walker.nodes[node_name]['cycle']
+        cycle_nodes = set(self.walker.cycles[cycle])
+        scene_nodes = self.nodz.scene().nodes
+        for node_name in scene_nodes:
+            scene_nodes[node_name].setSelected(node_name in cycle_nodes)
+    
+    
     def view_usdfile(self, node_name):
         node = self.get_node_from_name(node_name)
         userdata = node.userData
         path = userdata.get('path')
-        layer = Sdf.Layer.FindOrOpen(path)
+        layer = None
+        if isinstance(self.walker, DependencyWalker):
+            layer = self.walker.layers.get(path)
+        if not layer:
+            layer = Sdf.Layer.FindOrOpen(path)
         if layer:
+            from . import text_view
             win = text_view.TextViewer(input_text=layer.ExportToString(), title=path, parent=self)
             win.show()
     
@@ -804,8 +498,14 @@ class NoodleWidget(QtWidgets.QWidget):
     
     def node_context_menu(self, event, node):
         menu = QtWidgets.QMenu()
+        if isinstance(self.walker, DependencyWalker) and self.walker.nodes.get(node, {}).get('unexpanded'):
+            menu.addAction("Expand", partial(self.expand_node, node))
+            menu.addAction("Expand All Levels", partial(self.expand_node, node, depth=None))
+            menu.addSeparator()
         menu.addAction("Copy Node Path", partial(self.node_path, node))
         menu.addAction("Select upstream", partial(self.node_upstream, node))
+        if self.walker and self.walker.nodes.get(node, {}).get('cycle') is not None:
+            menu.addAction("Select cycle", partial(self.node_cycle, node))
         menu.addAction("Reveal in filesystem", partial(self.reveal_file, node))
         
         usd_submenu = menu.addMenu("USD")
@@ -817,126 +517,525 @@ class NoodleWidget(QtWidgets.QWidget):
         menu.exec_(event.globalPos())
     
     
+    def create_node(self, node, info, pos=None):
+        """
+        Make a scene node for a walker node record
+        :param node: node name (ie, the walker's node key)
+        :param info: node info dict
+        :param pos: QPointF, defaults to the origin
+        :return: the nodz node
+        """
+        if pos is None:
+            pos = QtCore.QPointF(0, 0)
+        node_label = os.path.basename(node)
+        
+        # node colouring / etc based on the node type
+        node_preset = 'node_default'
+        node_icon = "sublayer.png"
+        if info.get("type") == 'clip':
+            node_preset = 'node_clip'
+            node_icon = "clip.png"
+        elif info.get("type") == 'payload':
+            node_preset = 'node_payload'
+            node_icon = "payload.png"
+        elif info.get("type") == 'variant':
+            node_preset = 'node_variant'
+            node_icon = "variant.png"
+        elif info.get("type") == 'specialize':
+            node_preset = 'node_specialize'
+            node_icon = "specialize.png"
+        elif info.get("type") == 'reference':
+            node_preset = 'node_reference'
+            node_icon = "reference.png"
+        elif info.get("type") == 'tex':
+            node_preset = 'node_texture'
+            node_icon = "texture.png"
+        elif info.get("type") == 'material':
+            node_preset = 'node_material'
+            node_icon = "material.png"
+        
+        nodeA = self.nodz.createNode(name=node, label=node_label, preset=node_preset, position=pos)
+        if self.usdfile == node:
+            self.root_node = nodeA
+            node_icon = "noodle.png"
+        
+        icon = QtGui.QIcon(os.path.join(os.path.dirname(os.path.abspath(__file__)), "icons", node_icon))
+        nodeA.icon = icon
+        nodeA.setToolTip(node_label)
+        
+        if nodeA:
+            self.nodz.createAttribute(node=nodeA, name='out', index=0, preset='attr_preset_1',
+                                      plug=True, socket=False, dataType=int, socketMaxConnections=-1)
+            
+            nodeA.userData = info
+            
+            if info.get('error', False) is True:
+                self.nodz.createAttribute(node=nodeA, name='ERROR', index=0, preset='attr_preset_2',
+                                          plug=False, socket=False)
+            if info.get('online') is False:
+                self.nodz.createAttribute(node=nodeA, name='OFFLINE', index=0, preset='attr_preset_2',
+                                          plug=False, socket=False)
+                # override the node's draw pen with a
+                # lovely red outline
+                nodeA._pen = QtGui.QPen()
+                nodeA._pen.setStyle(QtCore.Qt.SolidLine)
+                nodeA._pen.setWidth(5)
+                nodeA._pen.setColor(QtGui.QColor(255, 0, 0))
+            elif info.get('unexpanded'):
+                # placeholder for a layer the depth limit stopped at. dashed outline
+                self.nodz.createAttribute(node=nodeA, name='+', index=0, preset='attr_preset_3',
+                                          plug=False, socket=False)
+                nodeA._pen = QtGui.QPen()
+                nodeA._pen.setStyle(QtCore.Qt.DashLine)
+                nodeA._pen.setWidth(3)
+                nodeA._pen.setColor(QtGui.QColor(255, 255, 255))
+            elif info.get('cycle') is not None:
+                # part of a dependency loop. orange outline
+                self.nodz.createAttribute(node=nodeA, name='CYCLE', index=0, preset='attr_preset_2',
+                                          plug=False, socket=False)
+                nodeA._pen = QtGui.QPen()
+                nodeA._pen.setStyle(QtCore.Qt.SolidLine)
+                nodeA._pen.setWidth(5)
+                nodeA._pen.setColor(QtGui.QColor(255, 140, 0))
+        
+        return nodeA
+    
+    
+    def create_connection(self, start, end, port_type):
+        """
+        Wire up a walker edge. start uses end, so end's "out" plug goes into a socket on start
+        """
+        try:
+            start_node = self.nodz.scene().nodes[start]
+            if port_type not in start_node.attrs:
+                self.nodz.createAttribute(node=start_node, name=port_type, index=-1, preset='attr_preset_1',
+                                          plug=False, socket=True, dataType=int, socketMaxConnections=-1)
+            # # sort the ports alphabetically
+            # start_node.attrs = sorted(start_node.attrs)
+            
+            self.nodz.createConnection(end, 'out', start, port_type)
+        except:
+            print('cannot find start node', start)
+    
+    
+    def remove_connection(self, start, end, port_type):
+        if end not in self.nodz.scene().nodes:
+            return
+        end_node = self.nodz.scene().nodes[end]
+        for conn in list(end_node.plugs['out'].connections):
+            if conn.socketNode == start and conn.socketAttr == port_type:
+                conn._remove()
+    
+    
+    def show_load_errors(self, errored_nodes):
+        if errored_nodes:
+            message = 'Some layers had load errors:\n'
+            for errpath in errored_nodes:
+                message += '{}\n'.format(errpath)
+            QtWidgets.QMessageBox.warning(self, 'File Parsing errors', message, QtWidgets.QMessageBox.Ok)
+    
+    
+    def show_cycles(self, cycles):
+        if cycles:
+            message = 'Some layers end up using themselves:\n'
+            for cycle in cycles:
+                message += '{}\n'.format(' -> '.join(os.path.basename(x) for x in cycle + cycle[:1]))
+            QtWidgets.QMessageBox.warning(self, 'Dependency cycles', message, QtWidgets.QMessageBox.Ok)
+    
+    
     def load_file(self):
+        """
+        Walk the file on a background thread. Nodes appear as they're found, and get laid out
+        once the walk is done
+        """
         if not self.usdfile:
             return
         
         if not os.path.isfile(self.usdfile):
             raise RuntimeError("Cannot find file: %s" % self.usdfile)
         
+        if walk_io.is_saved_walk(self.usdfile):
+            self.load_saved_walk(self.usdfile)
+            return
+        
+        self.cancel_walk(wait=True)
+        
         self.nodz.clearGraph()
         self.root_node = None
+        self.placer.clear()
+        self.layout_thread = None
         self.setWindowTitle('Noodle - {}'.format(self.usdfile))
         
-        x = DependencyWalker(self.usdfile)
+        x = DependencyWalker(self.usdfile, workers=self.workers, engine=self.engine, cache=self.walk_cache,
+                             keep_layers=self.keep_layers, memory_limit=self.memory_limit)
         x.walk_attributes = self.walk_attributes
-        x.start()
+        x.scan_mode = self.scan_mode()
+        x.lexical_scan = self.lexical_scan
+        x.max_depth = self.max_depth or None
+        self.walker = x
+        self.graph = x.graph
+        
+        self.walk_thread = WalkThread(x, parent=self)
+        self.walk_thread.batch_ready.connect(self.on_walk_batch)
+        self.walk_thread.finished.connect(self.on_walk_finished)
+        self.start_walk_thread()
+    
+    
+    def start_walk_thread(self):
+        """
+        Start self.walk_thread, showing its progress and a cancel button in the toolbar until it's done
+        """
+        self.walk_thread.progress.connect(self.on_walk_progress)
+        self.walk_thread.walk_failed.connect(self.on_walk_failed)
+        
+        self.progressLabel.setText('')
+        for widget in [self.progressBar, self.progressLabel, self.cancelBtn]:
+            widget.show()
+        self.reloadBtn.setEnabled(False)
+        
+        self.walk_thread.start()
+    
+    
+    def walk_thread_done(self):
+        for widget in [self.progressBar, self.progressLabel, self.cancelBtn]:
+            widget.hide()
+        self.reloadBtn.setEnabled(True)
+    
+    
+    def load_saved_walk(self, path):
+        """
+        Show a walk saved with --jsonl / --binary / --json, without walking anything.
+        Reloading it walks its root layer for real
+        """
+        self.cancel_walk(wait=True)
+        
+        x = walk_io.read_walk(path)
+        logger.info('loaded saved walk {}: {} nodes, {} edges'.format(path, len(x.nodes), len(x.graph)))
+        
+        self.nodz.clearGraph()
+        self.root_node = None
+        self.placer.clear()
+        self.layout_thread = None
+        self.walker = x
+        self.graph = x.graph
+        self.usdfile = x.usdfile
+        self.setWindowTitle('Noodle - {}'.format(path))
+        
+        for node, info in x.nodes.items():
+            self.create_node(node, info)
+        for start, end, port_type in self.graph.edges():
+            self.create_connection(start, end, port_type)
+        
+        # layout nodes!
+        self.layout_graph()
+        
+        self.show_load_errors(x.errored_nodes)
+        self.show_cycles(x.cycles)
+        
+        self.file_loaded.emit(path)
+    
+    
+    def walking(self):
+        return self.walk_thread is not None and self.walk_thread.isRunning()
+    
+    
+    def cancel_walk(self, wait=False):
+        if not self.walking():
+            return
+        self.walk_thread.cancel()
+        if wait:
+            self.walk_thread.wait()
+    
+    
+    def on_walk_batch(self, nodes, edges):
+        """
+        A batch of newly found nodes and edges from the walk thread
+        """
+        x = self.walker
+        if x is None or self.sender() is not self.walk_thread:
+            # left over from a walk that's been replaced
+            return
         
         # get back the scrubbed initial file path
         # which will let us find the start node properly
         self.usdfile = x.usdfile
+        self.graph = x.graph
+        
+        scene_nodes = self.nodz.scene().nodes
+        first_batch = not scene_nodes
+        added = []
+        for node, info in nodes:
+            if node in scene_nodes:
+                continue
+            self.create_node(node, info)
+            added.append(node)
+        # the whole graph gets laid out properly once the walk is done
+        self.place_nodes(added)
+        
+        for start, end, port_type in edges:
+            self.create_connection(start, end, port_type)
+        # sockets for the new edges make their nodes taller
+        self.track_nodes(set(start for start, end, port_type in edges))
+        
+        if first_batch:
+            # show the root straight away
+            self.nodz._focus()
+    
+    
+    def place_nodes(self, nodes):
+        """
+        Find room for new scene nodes in a column to the left of whatever's using them. Nothing that's
+        already in the scene gets moved, and only the neighbourhood of each new node is looked at.
+        Do it before they're connected up - moving a node doesn't redraw its connections
+        :param nodes: names of the new nodes. ones whose users are new too go after them
+        """
+        scene_nodes = self.nodz.scene().nodes
+        waiting = [node for node in nodes if node in scene_nodes]
+        for last_pass in [False, True]:
+            later = []
+            for node in waiting:
+                parents = self.graph.parents(node)
+                if not last_pass and parents and not any(parent in self.placer for parent in parents):
+                    # whatever's using it hasn't got a spot yet
+                    later.append(node)
+                    continue
+                item = scene_nodes[node]
+                rect = item.boundingRect()
+                x, y = self.placer.place(node, parents, rect.width(), rect.height())
+                item.setPos(x, y)
+            waiting = later
+    
+    
+    def track_nodes(self, nodes):
+        """
+        Note where scene nodes are now (and how big), for placing new nodes around them.
+        Nodes that have gone from the scene are forgotten
+        """
+        scene_nodes = self.nodz.scene().nodes
+        for node in nodes:
+            item = scene_nodes.get(node)
+            if item is None:
+                self.placer.remove(node)
+                continue
+            pos = item.pos()
+            rect = item.boundingRect()
+            self.placer.add(node, pos.x(), pos.y(), rect.width(), rect.height())
+    
+    
+    def on_walk_progress(self, progress):
+        if self.sender() is not self.walk_thread:
+            return
+        self.progressLabel.setText('{} layers, {} queued, {:.1f}s'.format(
+            progress['layers'], progress['queued'], progress['elapsed']))
+    
+    
+    def on_walk_failed(self, message):
+        if self.sender() is not self.walk_thread:
+            return
+        QtWidgets.QMessageBox.warning(self, 'Walk failed', message, QtWidgets.QMessageBox.Ok)
+    
+    
+    def on_walk_finished(self):
+        """
+        The walk is done (or cancelled). Bring the nodes up to date with the file status checks
+        that happen at the end of the walk, then lay everything out
+        """
+        if self.sender() is not self.walk_thread:
+            return
+        self.walk_thread_done()
         
-        nodz_scene = self.nodz.scene()
+        x = self.walker
+        self.usdfile = x.usdfile
+        self.graph = x.graph
         
-        # pprint(x.nodes)
-        nds = []
-        for i, node in enumerate(x.nodes):
-            
-            info = x.nodes[node]
-            
-            pos = QtCore.QPointF(0, 0)
-            node_label = os.path.basename(node)
-            
-            # node colouring / etc based on the node type
-            node_preset = 'node_default'
-            node_icon = "sublayer.png"
-            if info.get("type") == 'clip':
-                node_preset = 'node_clip'
-                node_icon = "clip.png"
-            elif info.get("type") == 'payload':
-                node_preset = 'node_payload'
-                node_icon = "payload.png"
-            elif info.get("type") == 'variant':
-                node_preset = 'node_variant'
-                node_icon = "variant.png"
-            elif info.get("type") == 'specialize':
-                node_preset = 'node_specialize'
-                node_icon = "specialize.png"
-            elif info.get("type") == 'reference':
-                node_preset = 'node_reference'
-                node_icon = "reference.png"
-            elif info.get("type") == 'tex':
-                node_preset = 'node_texture'
-                node_icon = "texture.png"
-            elif info.get("type") == 'material':
-                node_preset = 'node_material'
-                node_icon = "material.png"
-            
-            if not node in nds:
-                nodeA = self.nodz.createNode(name=node, label=node_label, preset=node_preset, position=pos)
-                if self.usdfile == node:
-                    self.root_node = nodeA
-                    node_icon = "noodle.png"
-                
-                icon = QtGui.QIcon(os.path.join(os.path.dirname(os.path.abspath(__file__)), "icons", node_icon))
-                nodeA.icon = icon
-                nodeA.setToolTip(node_label)
-                
-                if nodeA:
-                    self.nodz.createAttribute(node=nodeA, name='out', index=0, preset='attr_preset_1',
-                                              plug=True, socket=False, dataType=int, socketMaxConnections=-1)
-                    
-                    nodeA.userData = info
-                    
-                    if info.get('error', False) is True:
-                        self.nodz.createAttribute(node=nodeA, name='ERROR', index=0, preset='attr_preset_2',
-                                                  plug=False, socket=False)
-                    if info['online'] is False:
-                        self.nodz.createAttribute(node=nodeA, name='OFFLINE', index=0, preset='attr_preset_2',
-                                                  plug=False, socket=False)
-                        # override the node's draw pen with a
-                        # lovely red outline
-                        nodeA._pen = QtGui.QPen()
-                        nodeA._pen.setStyle(QtCore.Qt.SolidLine)
-                        nodeA._pen.setWidth(5)
-                        nodeA._pen.setColor(QtGui.QColor(255, 0, 0))
-                
-                nds.append(node)
-        
-        # pprint(x.edges)
-        
-        # 'wiring nodes'.center(40, '-')
-        # create all the node connections
-        for edge in x.edges:
-            
-            start = edge[0]
-            end = edge[1]
-            port_type = edge[2]
-            try:
-                start_node = self.nodz.scene().nodes[start]
-                self.nodz.createAttribute(node=start_node, name=port_type, index=-1, preset='attr_preset_1',
-                                          plug=False, socket=True, dataType=int, socketMaxConnections=-1)
-                # # sort the ports alphabetically
-                # start_node.attrs = sorted(start_node.attrs)
-                
-                self.nodz.createConnection(end, 'out', start, port_type)
-            except:
-                print('cannot find start node', start)
+        scene_nodes = self.nodz.scene().nodes
+        stale = []
+        for node, info in x.nodes.items():
+            if node not in scene_nodes:
+                continue
+            if (scene_nodes[node].userData is not info or info.get('online') is False or info.get('error')
+                    or info.get('unexpanded') or info.get('cycle') is not None):
+                stale.append(node)
+        self.rebuild_nodes(stale)
+        
+        if x.cancelled:
+            logger.info('walk cancelled: {} layers walked'.format(len(x.harvests)))
         
         # layout nodes!
-        self.nodz.arrangeGraph(self.root_node)
-        # self.nodz.autoLayoutGraph()
-        self.nodz._focus()
+        self.layout_graph()
         
-        if x.errored_nodes:
-            message = 'Some layers had load errors:\n'
-            for errpath in x.errored_nodes:
-                message += '{}\n'.format(errpath)
-            QtWidgets.QMessageBox.warning(self, 'File Parsing errors', message, QtWidgets.QMessageBox.Ok)
+        self.show_load_errors(x.errored_nodes)
+        self.show_cycles(x.cycles)
+        
+        self.file_loaded.emit(self.usdfile)
+    
+    
+    def rebuild_nodes(self, nodes):
+        """
+        Rebuild scene nodes in place from the walker's node records, keeping their position,
+        selection and connections
+        """
+        scene_nodes = self.nodz.scene().nodes
+        nodes = set(x for x in nodes if x in scene_nodes)
+        if not nodes:
+            return
+        for node in nodes:
+            old_node = scene_nodes[node]
+            pos = old_node.pos()
+            selected = old_node.isSelected()
+            self.nodz.deleteNode(old_node)
+            new_node = self.create_node(node, self.walker.nodes[node], pos=pos)
+            new_node.setSelected(selected)
+        
+        for start, end, port_type in self.graph.edges():
+            if start in nodes or end in nodes:
+                self.create_connection(start, end, port_type)
+        self.track_nodes(nodes)
+        self.nodz.scene().update()
+    
+    
+    def scan_mode(self):
+        if self.arcs_only:
+            return SCAN_ARCS
+        return SCAN_FULL
+    
+    
+    def reload_file(self):
+        """
+        Reload button. Only re-walks the layers that have changed on disk, on a background thread, and
+        patches the scene with the difference when it's done (see on_reload_finished) - node positions
+        and the selection are left alone.
+        Falls back to a full load if there's nothing to patch, or the walk settings have changed.
+        """
+        if self.walking():
+            return
+        
+        x = self.walker
+        # a saved walk has nothing to refresh, so gets walked from scratch
+        if (not isinstance(x, DependencyWalker) or not self.nodz.scene().nodes or x.usdfile != self.usdfile
+                or x.walk_attributes != self.walk_attributes or x.scan_mode != self.scan_mode()
+                or x.lexical_scan != self.lexical_scan or x.max_depth != (self.max_depth or None)):
+            self.load_file()
+            return
+        
+        # the walker reuses the info dicts of untouched layers, so take copies to diff against
+        self._reload_nodes = dict((node, dict(info)) for node, info in x.nodes.items())
+        self._reload_edges = set(x.graph.edges())
         
+        x.workers = self.workers
+        self.walk_thread = WalkThread(x, refresh=True, parent=self)
+        self.walk_thread.finished.connect(self.on_reload_finished)
+        self.start_walk_thread()
+    
+    
+    def on_reload_finished(self):
+        """
+        The reload's walk is done (or cancelled). Patch the scene with what's changed
+        """
+        if self.sender() is not self.walk_thread:
+            return
+        self.walk_thread_done()
+        
+        x = self.walker
+        old_nodes, old_edges = self._reload_nodes, self._reload_edges
+        self._reload_nodes = None
+        self._reload_edges = None
+        changed = self.walk_thread.changed
+        if changed is None:
+            # it failed, and said so
+            return
+        if not changed:
+            logger.info('reload: nothing has changed on disk')
+            return
+        logger.info('reload: {} changed layers'.format(len(changed)))
+        
+        self.graph = x.graph
+        new_edges = set(self.graph.edges())
+        scene_nodes = self.nodz.scene().nodes
+        
+        # nodes with a different online / error state get rebuilt in place
+        rebuild = set()
+        for node, info in x.nodes.items():
+            if node in old_nodes and node in scene_nodes:
+                old_info = old_nodes[node]
+                if (old_info.get('online') != info.get('online') or old_info.get('error') != info.get('error')
+                        or old_info.get('type') != info.get('type')
+                        or old_info.get('unexpanded') != info.get('unexpanded')
+                        or old_info.get('cycle') != info.get('cycle')):
+                    rebuild.add(node)
+                else:
+                    scene_nodes[node].userData = info
+        
+        for edge in old_edges - new_edges:
+            if edge[0] not in rebuild and edge[1] not in rebuild:
+                self.remove_connection(*edge)
+        
+        selected = set(x.name for x in self.nodz.scene().selectedItems() if hasattr(x, 'userData'))
+        positions = {}
+        for node in old_nodes:
+            if node in scene_nodes and (node not in x.nodes or node in rebuild):
+                positions[node] = scene_nodes[node].pos()
+                self.nodz.deleteNode(scene_nodes[node])
+        
+        added = [node for node in x.nodes if node not in old_nodes or node in rebuild]
+        for node in added:
+            new_node = self.create_node(node, x.nodes[node], pos=positions.get(node))
+            if node in selected:
+                new_node.setSelected(True)
+        # rebuilt nodes are back where they were, and the new ones go next to whatever's using them
+        self.track_nodes(positions)
+        self.place_nodes([node for node in added if node not in positions])
+        
+        added_set = set(added)
+        grown = set()
+        for start, end, port_type in self.graph.edges():
+            if (start, end, port_type) not in old_edges or start in added_set or end in added_set:
+                self.create_connection(start, end, port_type)
+                grown.add(start)
+        self.track_nodes(grown)
+        
+        self.nodz.scene().update()
+        self.show_load_errors(x.errored_nodes)
+        self.show_cycles(x.cycles)
         self.file_loaded.emit(self.usdfile)
     
     
+    def expand_node(self, node_name, depth=1):
+        """
+        Walk an unexpanded layer and splice what it uses into the graph, to the left of it
+        :param node_name: node name
+        :param depth: levels to walk, starting with the layer itself. None walks to the leaves
+        """
+        x = self.walker
+        scene_nodes = self.nodz.scene().nodes
+        if self.walking() or not isinstance(x, DependencyWalker) or node_name not in scene_nodes:
+            return
+        if not x.nodes.get(node_name, {}).get('unexpanded'):
+            return
+        
+        old_cycles = dict((node, info.get('cycle')) for node, info in x.nodes.items())
+        new_nodes, new_edges = x.expand(node_name, depth=depth)
+        logger.info('expanded {}: {} new nodes'.format(node_name, len(new_nodes)))
+        
+        for node in new_nodes:
+            self.create_node(node, x.nodes[node])
+        self.place_nodes(new_nodes)
+        
+        # it's not a placeholder any more, so the node gets rebuilt in place. that wires up its edges.
+        # so do any nodes the new edges have put in (or taken out of) a dependency loop
+        rebuild = set([node_name])
+        rebuild.update(node for node, cycle in old_cycles.items() if x.nodes[node].get('cycle') != cycle)
+        self.rebuild_nodes(rebuild)
+        for start, end, port_type in new_edges:
+            if start not in rebuild and end not in rebuild:
+                self.create_connection(start, end, port_type)
+        self.track_nodes(set(start for start, end, port_type in new_edges))
+        
+        self.nodz.scene().update()
+        new_set = set(new_nodes)
+        self.show_load_errors([path for path in x.errored_nodes if path == node_name or path in new_set])
+    
+    
     def save_image(self):
         
         multipleFilters = "Image Files (*.jpg *.png) (*.jpg *.png);;All Files (*.*) (*.*)"
@@ -957,10 +1056,54 @@ class NoodleWidget(QtWidgets.QWidget):
     
     def layout_nodes(self):
         # layout nodes!
-        self.nodz.arrangeGraph(self.root_node)
-        # self.nodz.autoLayoutGraph()
+        self.layout_graph(focus_all=True)
+    
+    
+    def layout_graph(self, focus_all=False):
+        """
+        Lay the whole graph out on a background thread, and move the nodes to their new positions
+        in one go when it's done. Without numpy, it's nodz's arrangeGraph on the gui thread
+        :param focus_all: frame everything once it's laid out, rather than the root
+        """
+        if layout.numpy is None:
+            self.nodz.arrangeGraph(self.root_node)
+            self.placer.clear()
+            self.track_nodes(self.nodz.scene().nodes)
+            self.nodz._focus(all=focus_all)
+            return
         
-        self.nodz._focus(all=True)
+        scene_nodes = self.nodz.scene().nodes
+        heights = dict((node, item.boundingRect().height()) for node, item in scene_nodes.items())
+        self._layout_focus_all = focus_all
+        # an older layout that's still going gets ignored when it's done
+        self.layout_thread = LayoutThread(self.graph, list(scene_nodes), roots=[self.usdfile], heights=heights,
+                                          parent=self)
+        self.layout_thread.layout_ready.connect(self.on_layout_ready)
+        self.layout_thread.start()
+    
+    
+    def on_layout_ready(self, nodes, positions):
+        """
+        Positions from the layout thread. Nodes that have gone since it started are skipped, and
+        ones that have turned up since (ie, from an expand) get put next to whatever's using them
+        """
+        if self.sender() is not self.layout_thread:
+            return
+        scene_nodes = self.nodz.scene().nodes
+        # one redraw for the lot, rather than one per node
+        self.nodz.setUpdatesEnabled(False)
+        try:
+            for node, (x, y) in zip(nodes, positions):
+                if node in scene_nodes:
+                    scene_nodes[node].setPos(x, y)
+            self.placer.clear()
+            self.track_nodes(nodes)
+            laid_out = set(nodes)
+            self.place_nodes([node for node in scene_nodes if node not in laid_out])
+            self.nodz.scene().updateScene()
+        finally:
+            self.nodz.setUpdatesEnabled(True)
+        self.nodz._focus(all=self._layout_focus_all)
     
     
     def manualOpen(self):
@@ -971,7 +1114,8 @@ class NoodleWidget(QtWidgets.QWidget):
         if self.usdfile:
             startPath = os.path.dirname(self.usdfile)
         
-        multipleFilters = "USD Files (*.usd *.usda *.usdc) (*.usd *.usda *.usdc);;All Files (*.*) (*.*)"
+        multipleFilters = ("USD Files (*.usd *.usda *.usdc) (*.usd *.usda *.usdc);;"
+                           "Saved Walks (*.noodle *.jsonl *.json) (*.noodle *.jsonl *.json);;All Files (*.*) (*.*)")
         options = QtWidgets.QFileDialog.DontUseNativeDialog
         try:
             # qt 5.2 and up
@@ -988,7 +1132,10 @@ class NoodleWidget(QtWidgets.QWidget):
             self.load_file()
 
 
-def main(usdfile=None, walk_attributes=False):
+def main(usdfile=None, walk_attributes=False, workers=None, engine=ENGINE_THREAD, use_cache=True, arcs_only=False,
+         lexical_scan=False, keep_layers=0, memory_limit=None, max_depth=None):
     par = QtWidgets.QApplication.activeWindow()
-    win = NodeGraphWindow(usdfile=usdfile, parent=par, walk_attributes=walk_attributes)
+    win = NodeGraphWindow(usdfile=usdfile, parent=par, walk_attributes=walk_attributes, workers=workers,
+                          engine=engine, use_cache=use_cache, arcs_only=arcs_only, lexical_scan=lexical_scan,
+                          keep_layers=keep_layers, memory_limit=memory_limit, max_depth=max_depth)
     return win
@@ -0,0 +1,213 @@
+from __future__ import print_function
+
+import os.path
+import re
+
+try:
+    import numpy
+except ImportError:
+    # plain python sets do the job, just slower on big sequences
+    numpy = None
+
+
+# prefix, frame number and suffix of a file name. the frame is the last run of digits
+sequenceName = re.compile(r'^(.*?)(\d+)(\D*)$')
+# template clip file names: basename.###.usd, or basename.###.##.usd for sub-integer frames
+templateName = re.compile(r'^(.*?)(#+)(?:\.(#+))?([^#]*)$')
+templateHashes = re.compile(r'#+(?:\.#+)?')
+
+
+def clip_sequence(paths):
+    """
+    Work out the numbered file sequence a clip set's resolved asset paths make up.
+    Sub-integer frames (name.1001.50.usd) don't make a single sequence, so come back as None
+    :param paths: list of resolved clip file paths
+    :return: dict of directory, prefix, suffix, padding and frames (collapsed, see collapse_frames),
+             or None if they aren't all the same name with a different frame number
+    """
+    sequence = None
+    frames = set()
+    for path in paths:
+        directory, name = os.path.split(path)
+        match = sequenceName.match(name)
+        if not match:
+            return None
+        prefix, digits, suffix = match.groups()
+        if sequence is None:
+            sequence = {'directory': directory, 'prefix': prefix, 'suffix': suffix, 'padding': len(digits)}
+        elif (directory, prefix, suffix) != (sequence['directory'], sequence['prefix'], sequence['suffix']):
+            return None
+        # frames past the padding get longer, so the shortest one is the padding
+        sequence['padding'] = min(sequence['padding'], len(digits))
+        frames.add(int(digits))
+    
+    if sequence is None:
+        return None
+    sequence['frames'] = collapse_frames(sorted(frames))
+    return sequence
+
+
+def template_times(start, end, stride):
+    """
+    :return: (start, end, stride) of a template clip set's times, with end pulled back onto the last
+             time the stride actually lands on, or None if there aren't any
+    """
+    if stride is None:
+        stride = 1
+    if start is None or end is None or stride <= 0 or end < start:
+        return None
+    count = int((end - start) / float(stride) + 1e-6)
+    return start, start + count * stride, stride
+
+
+def template_sequence(path, start, end, stride=1):
+    """
+    Work out the file sequence a template clip set uses straight from the template and its times,
+    without making a path for every frame
+    :param path: the resolved templateAssetPath, ie /shot/fx/smoke.####.usd
+    :return: dict like clip_sequence's, or None for sub-integer times and templates - see template_paths
+    """
+    directory, name = os.path.split(path)
+    match = templateName.match(name)
+    times = template_times(start, end, stride)
+    if not match or match.group(3) or times is None:
+        return None
+    if any(x != int(x) for x in times):
+        return None
+    start, end, stride = [int(x) for x in times]
+    return {'directory': directory, 'prefix': match.group(1), 'suffix': match.group(4),
+            'padding': len(match.group(2)), 'frames': [[start, end, stride]]}
+
+
+def template_file(template, time):
+    """
+    :return: the template with its #s filled in for the time, the way usd does it
+    """
+    def fill(match):
+        hashes = match.group(0).split('.')
+        whole = int(time)
+        text = '{:0{}d}'.format(whole, len(hashes[0]))
+        if len(hashes) > 1:
+            fraction = int(round((time - whole) * 10 ** len(hashes[1])))
+            text += '.{:0{}d}'.format(fraction, len(hashes[1]))
+        return text
+    return templateHashes.sub(fill, template, count=1)
+
+
+def template_paths(path, start, end, stride=1):
+    """
+    The file for every time of a template clip set. Only for the ones template_sequence can't do
+    :param path: the resolved templateAssetPath
+    :return: list of file paths
+    """
+    times = template_times(start, end, stride)
+    if times is None:
+        return []
+    start, end, stride = times
+    count = int(round((end - start) / float(stride))) + 1
+    return [template_file(path, start + i * stride) for i in range(count)]
+
+
+def template_label(template, start, end):
+    """
+    :return: the template with its #s swapped for the frame range, ie smoke.1001-1100.usd
+    """
+    match = templateHashes.search(template)
+    if not match:
+        return template
+    times = [template_file(match.group(0), x) for x in [start, end]]
+    return template[:match.start()] + '-'.join(times) + template[match.end():]
+
+
+def collapse_frames(frames):
+    """
+    Collapse frame numbers into runs, so a 5000 frame sequence is a handful of numbers
+    :param frames: sorted, unique frame numbers
+    :return: list of [first, last, step] runs
+    """
+    runs = []
+    count = len(frames)
+    i = 0
+    while i < count:
+        first = frames[i]
+        if i + 1 == count:
+            runs.append([first, first, 1])
+            break
+        step = frames[i + 1] - first
+        j = i + 1
+        while j + 1 < count and frames[j + 1] - frames[j] == step:
+            j += 1
+        if j == i + 1 and j + 1 < count and frames[j + 1] - frames[j] != step:
+            # two frames on their own aren't worth a step. keep the first as a single
+            runs.append([first, first, 1])
+            i += 1
+            continue
+        runs.append([first, frames[j], step])
+        i = j + 1
+    return runs
+
+
+def expand_frames(runs):
+    """
+    :param runs: list of [first, last, step], from collapse_frames
+    :return: sorted list of the frame numbers
+    """
+    if numpy is not None and runs:
+        return numpy.unique(numpy.concatenate([numpy.arange(first, last + 1, step)
+                                               for first, last, step in runs])).tolist()
+    frames = set()
+    for first, last, step in runs:
+        frames.update(range(first, last + 1, step))
+    return sorted(frames)
+
+
+def missing_frames(expected, present):
+    """
+    :param expected: sorted list of the frames the clip set uses
+    :param present: iterable of the frames there are files for
+    :return: sorted list of the expected frames that don't have a file
+    """
+    if numpy is not None:
+        expected = numpy.asarray(expected, dtype=numpy.int64)
+        present = numpy.fromiter(present, dtype=numpy.int64)
+        return expected[~numpy.isin(expected, present)].tolist()
+    present = set(present)
+    return [x for x in expected if x not in present]
+
+
+def frame_name(sequence, frame):
+    return '{}{:0{}d}{}'.format(sequence['prefix'], frame, sequence['padding'], sequence['suffix'])
+
+
+def frame_number(sequence, name, prefix, suffix):
+    """
+    :param prefix: the sequence prefix, as the directory listing keys it
+    :param suffix: the sequence suffix, as the directory listing keys it
+    :return: the frame number if the file name is one of the sequence's, or None
+    """
+    if not name.startswith(prefix) or not name.endswith(suffix) or len(name) <= len(prefix) + len(suffix):
+        return None
+    digits = name[len(prefix):len(name) - len(suffix)]
+    if not digits.isdigit():
+        return None
+    padding = sequence['padding']
+    # name.01001.usd isn't frame 1001 of name.####.usd
+    if len(digits) < padding or (len(digits) > padding and digits[0] == '0'):
+        return None
+    return int(digits)
+
+
+def format_frames(runs):
+    """
+    :param runs: list of [first, last, step]
+    :return: readable frame ranges, ie "1001-1010, 1012, 1020-1030x2"
+    """
+    parts = []
+    for first, last, step in runs:
+        if first == last:
+            parts.append(str(first))
+        elif step == 1:
+            parts.append('{}-{}'.format(first, last))
+        else:
+            parts.append('{}-{}x{}'.format(first, last, step))
+    return ', '.join(parts)
@@ -0,0 +1,249 @@
+from __future__ import print_function
+
+from array import array
+
+from .records import StringTable
+
+
+class DependencyGraph(object):
+    """
+    Edge store for the dependency walker.
+    Edges are (start, end, type) tuples - start being the layer that uses end.
+    Node paths and edge types are interned in StringTables, and everything is stored by their ids:
+    the edges as three typed arrays, the edge types of every connected (start, end) pair for de-duping,
+    forward and reverse adjacency lists and the usage count (in-degree) of every node, all maintained
+    as edges go in. The methods all take and give back the strings.
+    """
+    
+    
+    def __init__(self):
+        self.clear()
+    
+    
+    def clear(self):
+        self.strings = StringTable()
+        # there's only a handful of these, so they get small ids of their own
+        self.types = StringTable()
+        # insertion ordered, so connections come out in the order they were found
+        self._starts = array('i')
+        self._ends = array('i')
+        self._types = array('i')
+        # packed (start, end) id -> the type id of the edge between them, or a tuple of them if there's
+        # more than one - a node can be connected to the same child by more than one arc type
+        self._pairs = {}
+        self._children = {}
+        self._parents = {}
+        # usage counts, indexed by string id
+        self._count = array('i')
+    
+    
+    def __len__(self):
+        return len(self._starts)
+    
+    
+    def __contains__(self, edge):
+        start, end, edge_type = edge
+        return self.has_edge(start, end, edge_type)
+    
+    
+    @staticmethod
+    def _pack(start_id, end_id):
+        return (start_id << 32) | end_id
+    
+    
+    def _edge_types(self, start, end):
+        """
+        :return: tuple of the type ids of the edges from start to end
+        """
+        start_id = self.strings.get(start)
+        end_id = self.strings.get(end)
+        if start_id is None or end_id is None:
+            return ()
+        type_ids = self._pairs.get(self._pack(start_id, end_id), ())
+        return type_ids if isinstance(type_ids, tuple) else (type_ids, )
+    
+    
+    def add_edge(self, start, end, edge_type):
+        """
+        Add a connection, ignoring ones we already have
+        :param start: the node doing the using
+        :param end: the node being used
+        :param edge_type: port name / arc type
+        :return: True if the edge was new
+        """
+        start_id = self.strings.intern(start)
+        end_id = self.strings.intern(end)
+        type_id = self.types.intern(edge_type)
+        pair = self._pack(start_id, end_id)
+        type_ids = self._pairs.get(pair)
+        if type_ids is None:
+            self._pairs[pair] = type_id
+            self._children.setdefault(start_id, []).append(end_id)
+            self._parents.setdefault(end_id, []).append(start_id)
+        elif type_ids == type_id or (isinstance(type_ids, tuple) and type_id in type_ids):
+            return False
+        else:
+            self._pairs[pair] = (type_ids if isinstance(type_ids, tuple) else (type_ids, )) + (type_id, )
+        
+        self._starts.append(start_id)
+        self._ends.append(end_id)
+        self._types.append(type_id)
+        
+        if len(self._count) < len(self.strings):
+            self._count.extend([0] * (len(self.strings) - len(self._count)))
+        self._count[end_id] += 1
+        return True
+    
+    
+    def has_edge(self, start, end, edge_type):
+        return self.types.get(edge_type) in self._edge_types(start, end)
+    
+    
+    def edges(self, first=0):
+        """
+        :param first: index of the first edge to give back, ie len(graph) from before some were added
+        :return: list of (start, end, type) tuples in the order they were added
+        """
+        text = self.strings.text
+        type_text = self.types.text
+        return [(text(start), text(end), type_text(edge_type)) for start, end, edge_type in
+                zip(self._starts[first:], self._ends[first:], self._types[first:])]
+    
+    
+    def edge_ids(self):
+        """
+        :return: (starts, ends) copies of the edge arrays, as ids in strings. for working on the
+                 graph somewhere it might change under you, ie another thread
+        """
+        return array('i', self._starts), array('i', self._ends)
+    
+    
+    def _texts(self, ids):
+        text = self.strings.text
+        return [text(x) for x in ids]
+    
+    
+    def children(self, node):
+        """
+        :return: the nodes this node uses, in the order they were found
+        """
+        return self._texts(self._children.get(self.strings.get(node), []))
+    
+    
+    def parents(self, node):
+        """
+        :return: the nodes that use this node, in the order they were found
+        """
+        return self._texts(self._parents.get(self.strings.get(node), []))
+    
+    
+    def siblings(self, node, parent=None):
+        """
+        :param parent: the parent to take the siblings from. defaults to the first parent found
+        :return: all the children of the parent, including the node itself
+        """
+        if parent is None:
+            parents = self._parents.get(self.strings.get(node))
+            if not parents:
+                return [node]
+            return self._texts(self._children.get(parents[0], []))
+        return self.children(parent)
+    
+    
+    def usage_count(self, node):
+        """
+        :return: the number of edges pointing at this node
+        """
+        node_id = self.strings.get(node)
+        if node_id is None or node_id >= len(self._count):
+            return 0
+        return self._count[node_id]
+    
+    
+    def upstream(self, node):
+        """
+        Everything the node depends on, all the way to the leaves.
+        :return: set of node names, including the start node
+        """
+        return self._closure(node, self._children)
+    
+    
+    def downstream(self, node):
+        """
+        Everything that depends on the node, all the way back to the root.
+        :return: set of node names, including the start node
+        """
+        return self._closure(node, self._parents)
+    
+    
+    def _closure(self, node, adjacency):
+        node_id = self.strings.get(node)
+        if node_id is None:
+            return set([node])
+        found = set([node_id])
+        stack = [node_id]
+        while stack:
+            current = stack.pop()
+            for other in adjacency.get(current, []):
+                if other not in found:
+                    found.add(other)
+                    stack.append(other)
+        return set(self._texts(found))
+    
+    
+    def strongly_connected(self):
+        """
+        Find the dependency loops: groups of nodes that can all reach each other.
+        Tarjan's algorithm, run with an explicit stack rather than recursion, so long chains of
+        layers don't run into the recursion limit.
+        :return: list of components (lists of nodes, in the order they were found) with a loop in them -
+                 more than one node, or a node that uses itself
+        """
+        index = {}
+        low = {}
+        on_stack = set()
+        stack = []
+        components = []
+        
+        nodes = []
+        for start, end in zip(self._starts, self._ends):
+            nodes.append(start)
+            nodes.append(end)
+        
+        for root in nodes:
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self._children.get(root, [])))]
+            
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if child not in index:
+                        index[child] = low[child] = len(index)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self._children.get(child, []))))
+                        break
+                    elif child in on_stack:
+                        low[node] = min(low[node], index[child])
+                else:
+                    # done with all of this node's children
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            other = stack.pop()
+                            on_stack.discard(other)
+                            component.append(other)
+                            if other == node:
+                                break
+                        if len(component) > 1 or self._pack(node, node) in self._pairs:
+                            components.append(self._texts(sorted(component, key=index.get)))
+        
+        return components
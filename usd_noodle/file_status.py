@@ -0,0 +1,296 @@
+from __future__ import print_function
+
+import os
+import os.path
+import stat
+import threading
+
+try:
+    from os import scandir
+except ImportError:
+    # python 2. fall back to listdir
+    scandir = None
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    # python 2 without the futures backport. stat single threaded
+    ThreadPoolExecutor = None
+
+from . import clips
+from . import textures
+
+
+# stats are all waiting on the filer, so it's worth having plenty on the go at once
+DEFAULT_STAT_WORKERS = 16
+
+# node types that don't live on disk, so there's nothing to check
+NON_FILE_NODES = ['clip', 'variant', 'material']
+
+
+def stat_file(path):
+    """
+    :return: (mtime, size) of a regular file, or None if there isn't one there
+    """
+    try:
+        file_stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    if not stat.S_ISREG(file_stat.st_mode):
+        # directories and the like aren't online files
+        return None
+    return file_stat.st_mtime, file_stat.st_size
+
+
+def name_key(name):
+    # windows filesystems don't care about case, so neither should we
+    if os.name == 'nt':
+        return name.lower()
+    return name
+
+
+def list_directory(directory):
+    """
+    :return: dict of name -> DirEntry for the files in the directory (name -> None on python 2),
+             or None if the directory isn't there
+    """
+    try:
+        if scandir is not None:
+            return dict((name_key(x.name), x) for x in list(scandir(directory)) if x.is_file())
+        return dict((name_key(x), None) for x in os.listdir(directory))
+    except (OSError, TypeError, ValueError):
+        return None
+
+
+class DirectoryCache(object):
+    """
+    Lists each directory once, and answers existence / size / mtime questions about the files in it
+    from memory - including "no, that's not there". Texture and clip heavy assets keep thousands of
+    files in a handful of directories, so this turns a stat per file into a listing per directory.
+    Sizes and mtimes come from the directory entries: free on windows, one stat per file that's
+    actually asked about elsewhere.
+    """
+    
+    
+    def __init__(self):
+        self.list_count = 0
+        self._listings = {}
+        self._lock = threading.Lock()
+    
+    
+    def clear(self):
+        with self._lock:
+            self._listings = {}
+            self.list_count = 0
+    
+    
+    def listing(self, directory):
+        """
+        :return: the directory's listing, reading it if we haven't already
+        """
+        with self._lock:
+            if directory in self._listings:
+                return self._listings[directory]
+        
+        entries = list_directory(directory)
+        
+        with self._lock:
+            # another thread may have beaten us to it. keep whichever got there first
+            if directory not in self._listings:
+                self._listings[directory] = entries
+                self.list_count += 1
+            return self._listings[directory]
+    
+    
+    def exists(self, path):
+        """
+        :return: True if the path is a file on disk
+        """
+        directory, name = os.path.split(path)
+        entries = self.listing(directory)
+        if not entries or name_key(name) not in entries:
+            return False
+        if entries[name_key(name)] is None:
+            # listdir can't tell us if it's a file, so we have to ask
+            return stat_file(path) is not None
+        return True
+    
+    
+    def stat(self, path):
+        """
+        :return: (mtime, size) of the file, or None if it isn't there
+        """
+        directory, name = os.path.split(path)
+        entries = self.listing(directory)
+        if not entries or name_key(name) not in entries:
+            return None
+        entry = entries[name_key(name)]
+        if entry is None:
+            return stat_file(path)
+        try:
+            file_stat = entry.stat()
+        except OSError:
+            return None
+        return file_stat.st_mtime, file_stat.st_size
+
+
+class FileStatusChecker(object):
+    """
+    Answers "is this file there, how big is it, when did it change" for lots of paths at once.
+    Directories are listed once each through a DirectoryCache, the work is spread over a thread
+    pool, and every answer is remembered until clear(), so each file only gets looked at once per
+    walk no matter how many times it comes up.
+    """
+    
+    
+    def __init__(self, workers=DEFAULT_STAT_WORKERS):
+        self.workers = workers
+        self.stat_count = 0
+        self.directories = DirectoryCache()
+        self._status = {}
+        self._lock = threading.Lock()
+    
+    
+    def clear(self):
+        with self._lock:
+            self._status = {}
+            self.stat_count = 0
+        self.directories.clear()
+    
+    
+    def _map(self, func, items):
+        if self.workers > 1 and len(items) > 1 and ThreadPoolExecutor is not None:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(items))) as pool:
+                return list(pool.map(func, items))
+        return [func(x) for x in items]
+    
+    
+    def _list_parents(self, paths):
+        directories = list(set(os.path.dirname(x) for x in paths))
+        self._map(self.directories.listing, directories)
+    
+    
+    def check(self, paths):
+        """
+        :param paths: list of file paths
+        :return: dict of path -> (mtime, size), or None for missing files
+        """
+        with self._lock:
+            todo = [x for x in set(paths) if x not in self._status]
+        
+        if todo:
+            self._list_parents(todo)
+            results = self._map(self.directories.stat, todo)
+            
+            with self._lock:
+                self.stat_count += len(todo)
+                for path, status in zip(todo, results):
+                    self._status[path] = status
+        
+        with self._lock:
+            return dict((x, self._status.get(x)) for x in paths)
+    
+    
+    def exists(self, paths):
+        """
+        Existence only, straight from the directory listings - no per-file stats
+        :param paths: list of file paths
+        :return: dict of path -> bool
+        """
+        self._list_parents(paths)
+        return dict((x, self.directories.exists(x)) for x in paths)
+    
+    
+    def all_present(self, paths):
+        """
+        :return: True if every one of the paths is a file on disk
+        """
+        return all(self.exists(paths).values())
+    
+    
+    def check_clip(self, info):
+        """
+        Check a clip node's files against a single listing of their directory, and store what's
+        missing on the node: online, missingCount and missingFrames (collapsed [first, last, step] runs).
+        A clip set with no files at all (a template without its times) is offline
+        :param info: clip node info, with the clipFiles the walker harvested
+        """
+        clip_files = info['clipFiles']
+        if 'paths' in clip_files:
+            # not a numbered sequence, so there are no frames to speak of
+            self._list_parents(clip_files['paths'])
+            missing = [x for x in clip_files['paths'] if not self.directories.exists(x)]
+            info['online'] = bool(clip_files['paths']) and not missing
+            info['missingCount'] = len(missing)
+            info['missingFrames'] = []
+            return
+        
+        entries = self.directories.listing(clip_files['directory']) or {}
+        prefix = name_key(clip_files['prefix'])
+        suffix = name_key(clip_files['suffix'])
+        present = (clips.frame_number(clip_files, name, prefix, suffix) for name in entries)
+        missing = clips.missing_frames(clips.expand_frames(clip_files['frames']),
+                                       (x for x in present if x is not None))
+        info['online'] = not missing
+        info['missingCount'] = len(missing)
+        info['missingFrames'] = clips.collapse_frames(missing)
+    
+    
+    def check_tiles(self, info):
+        """
+        Check a tokenised texture node (udims, frames...) against a single listing of its directory,
+        and store what we find on the node: online (any tiles at all), tileCount, missingTiles
+        (collapsed [first, last, step] runs), and the total size and newest mtime of the tiles
+        :param info: texture node info, with the tileFiles the walker harvested
+        """
+        tile_files = info['tileFiles']
+        entries = self.directories.listing(tile_files['directory']) or {}
+        pattern = textures.compile_pattern(tile_files)
+        tiles = set()
+        size = 0
+        mtime = None
+        for name in entries:
+            match = pattern.match(name)
+            if not match:
+                continue
+            tiles.add(textures.tile_number(tile_files, match))
+            file_status = self.directories.stat(os.path.join(tile_files['directory'], name))
+            if file_status is not None:
+                size += file_status[1]
+                mtime = max(mtime or file_status[0], file_status[0])
+        
+        tiles = sorted(tiles)
+        missing = clips.missing_frames(textures.expected_tiles(tile_files, tiles), tiles)
+        info['online'] = bool(tiles)
+        info['tileCount'] = len(tiles)
+        info['missingTiles'] = clips.collapse_frames(missing)
+        info['size'] = size
+        if mtime is not None:
+            info['mtime'] = mtime
+        else:
+            info.pop('mtime', None)
+    
+    
+    def apply(self, nodes):
+        """
+        Check every file-backed node in one batch, and store what we find on the node records:
+        online, size (bytes) and mtime. Nodes with load errors and nodes that aren't files are left alone,
+        apart from clips - their whole sequence gets checked, see check_clip. Tokenised textures get
+        all their tiles checked, see check_tiles.
+        :param nodes: dict of node path -> info dict, as the walker makes them
+        """
+        self._map(self.check_clip, [info for info in nodes.values() if info.get('clipFiles')])
+        self._map(self.check_tiles, [info for info in nodes.values() if info.get('tileFiles')])
+        
+        paths = [path for path, info in nodes.items()
+                 if info.get('type') not in NON_FILE_NODES and not info.get('error') and not info.get('tileFiles')]
+        status = self.check(paths)
+        for path in paths:
+            info = nodes[path]
+            file_status = status[path]
+            info['online'] = file_status is not None
+            if file_status is not None:
+                info['mtime'], info['size'] = file_status
+            else:
+                info.pop('mtime', None)
+                info.pop('size', None)
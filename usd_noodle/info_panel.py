@@ -1,11 +1,13 @@
 from __future__ import print_function
 
 import shutil
+import time
 import os, os.path
 from functools import partial
 
 from Qt import QtWidgets, QtCore, QtWidgets, QtGui
-from pxr import Usd, Sdf, Ar, UsdUtils
+
+from . import clips
 
 
 left_pad = 80
@@ -359,12 +361,23 @@ class InfoPanel(QtWidgets.QWidget):
         # some node types don't represent files
         non_file_nodes = ['clip', 'variant', 'material']
         if not info.get("type") in non_file_nodes:
-            file_online = os.path.isfile(self.usdfile)
+            # the walker has already stat'ed everything, so no need to go back to the filesystem
+            file_online = info.get("online", False)
             self.attrLayout.addWidget(BoolAttrEdit('Online', file_online, readOnly=True))
+            if info.get("unexpanded"):
+                self.attrLayout.addWidget(BoolAttrEdit('Unexpanded', True, readOnly=True))
+            if info.get("cycle") is not None:
+                self.attrLayout.addWidget(StringAttrEdit('Cycle', info.get("cycle"), readOnly=True,
+                                                         tooltip='Part of a dependency loop'))
             
-            if file_online:
+            if file_online and info.get("size") is not None:
                 self.attrLayout.addWidget(
-                    StringAttrEdit('Size', '{:.2f}mb'.format(os.path.getsize(self.usdfile) / 1024.0 / 1024.0),
+                    StringAttrEdit('Size', '{:.2f}mb'.format(info.get("size") / 1024.0 / 1024.0),
+                                   readOnly=True)
+                )
+            if file_online and info.get("mtime") is not None:
+                self.attrLayout.addWidget(
+                    StringAttrEdit('Modified', time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(info.get("mtime"))),
                                    readOnly=True)
                 )
             
@@ -406,9 +419,28 @@ class InfoPanel(QtWidgets.QWidget):
         if info.get("type") == 'tex':
             self.attrLayout.addWidget(StringAttrEdit('colorspace', info.get("colorspace"), readOnly=True))
         
+        if 'tileCount' in info:
+            self.attrLayout.addWidget(StringAttrEdit('Tiles', info.get("tileCount"), readOnly=True))
+            if info.get("missingTiles"):
+                self.attrLayout.addWidget(TextAttrEdit('Missing Tiles', clips.format_frames(info.get("missingTiles")),
+                                                       readOnly=True))
+        
         if info.get("type") == 'clip':
             self.attrLayout.addWidget(StringAttrEdit('clipSet', info.get("clipSet"), readOnly=True))
             self.attrLayout.addWidget(StringAttrEdit('primPath', info.get("primPath"), readOnly=True))
+            if info.get("templateAssetPath"):
+                self.attrLayout.addWidget(StringAttrEdit('template', info.get("templateAssetPath"), readOnly=True))
+            clip_files = info.get("clipFiles", {})
+            if 'frames' in clip_files:
+                self.attrLayout.addWidget(StringAttrEdit('Frames', clips.format_frames(clip_files['frames']),
+                                                         readOnly=True))
+            if 'online' in info:
+                self.attrLayout.addWidget(BoolAttrEdit('Online', info.get("online"), readOnly=True))
+            if info.get("missingCount"):
+                self.attrLayout.addWidget(StringAttrEdit('Missing', info.get("missingCount"), readOnly=True))
+                if info.get("missingFrames"):
+                    self.attrLayout.addWidget(TextAttrEdit('Gaps', clips.format_frames(info.get("missingFrames")),
+                                                           readOnly=True))
         
         elif info.get("type") == 'sublayer':
             self.attrLayout.addWidget(StringAttrEdit('specifier', info.get("specifier"), readOnly=True))
@@ -0,0 +1,490 @@
+from __future__ import print_function
+
+import bisect
+import math
+
+try:
+    import numpy
+except ImportError:
+    # no layered layout without it. the gui falls back to nodz's arrangeGraph
+    numpy = None
+
+
+# a column per layer, going left from the root. same spacing as new nodes get put at
+COLUMN_WIDTH = 300
+# space between nodes in a column
+ROW_GAP = 20
+# node height when we aren't told
+NODE_HEIGHT = 60
+# down and up passes of crossing reduction
+SWEEPS = 2
+
+
+def node_edges(node_ids, starts, ends):
+    """
+    Turn graph edges into edges between layout nodes
+    :param node_ids: the graph string id of each node being laid out, -1 for ones the graph doesn't have
+    :param starts: edge start string ids, from DependencyGraph.edge_ids
+    :param ends: edge end string ids
+    :return: (starts, ends) numpy arrays of node indices. edges to nodes that aren't being laid out,
+             self loops and the extra edges between nodes connected by more than one arc type are dropped
+    """
+    node_ids = numpy.asarray(node_ids, dtype=numpy.int64)
+    if not node_ids.size:
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64)
+    starts = numpy.asarray(starts, dtype=numpy.int64)
+    ends = numpy.asarray(ends, dtype=numpy.int64)
+    size = max(node_ids.max() if node_ids.size else 0, starts.max() if starts.size else 0,
+               ends.max() if ends.size else 0) + 1
+    lookup = numpy.full(size, -1, dtype=numpy.int64)
+    valid = node_ids >= 0
+    lookup[node_ids[valid]] = numpy.flatnonzero(valid)
+    
+    starts = lookup[starts]
+    ends = lookup[ends]
+    keep = (starts >= 0) & (ends >= 0) & (starts != ends)
+    pairs = numpy.unique(starts[keep] * len(node_ids) + ends[keep])
+    return pairs // len(node_ids), pairs % len(node_ids)
+
+
+def layered_layout(count, starts, ends, roots=(), heights=None, column_width=COLUMN_WIDTH, row_gap=ROW_GAP,
+                   sweeps=SWEEPS):
+    """
+    Sugiyama style layout: nodes are put in columns (layers) so everything a node uses is to the left of
+    it, the order down each column is shuffled to cut down crossing connections, then nodes are spaced
+    out down their column near the things using them.
+    Works on arrays of node indices, so doesn't touch the scene - it's safe to run off the gui thread.
+    :param count: number of nodes
+    :param starts: edge start node indices. start uses end, so is put to the right of it
+    :param ends: edge end node indices
+    :param roots: indices of nodes to go in the first column, whatever uses them
+    :param heights: height of each node
+    :return: (xs, ys) numpy arrays of node positions
+    """
+    starts = numpy.asarray(starts, dtype=numpy.int64)
+    ends = numpy.asarray(ends, dtype=numpy.int64)
+    if heights is None:
+        heights = numpy.full(count, NODE_HEIGHT, dtype=numpy.float64)
+    heights = numpy.asarray(heights, dtype=numpy.float64)
+    
+    layers = assign_layers(count, starts, ends, roots)
+    members, slots = layer_members(layers)
+    positions = order_layers(layers, members, slots, starts, ends, sweeps)
+    # the order down each column is settled, so the members can go in that order
+    members = [layer[numpy.argsort(positions[layer], kind='stable')] for layer in members]
+    ys = place_layers(layers, members, starts, ends, heights, row_gap)
+    xs = layers * -float(column_width)
+    return xs, ys
+
+
+def assign_layers(count, starts, ends, roots=()):
+    """
+    Longest path layering: a node goes one column further than the furthest of the nodes using it.
+    Walked a column at a time, each one in a handful of array operations.
+    Loops get broken where the walk runs into them - see break_cycle
+    :return: numpy array of each node's layer
+    """
+    layers = numpy.full(count, -1, dtype=numpy.int64)
+    if not count:
+        return layers
+    roots = numpy.asarray(roots, dtype=numpy.int64)
+    # nothing pushes the roots out of the first column
+    if roots.size:
+        keep = ~numpy.isin(ends, roots)
+        starts = starts[keep]
+        ends = ends[keep]
+    
+    order = numpy.argsort(starts, kind='stable')
+    children = ends[order]
+    offsets = numpy.concatenate([[0], numpy.cumsum(numpy.bincount(starts, minlength=count))])
+    users = numpy.bincount(ends, minlength=count)
+    waiting = users.copy()
+    
+    frontier = numpy.flatnonzero(waiting == 0)
+    layer = 0
+    placed = 0
+    while placed < count:
+        if not frontier.size:
+            frontier = break_cycle(layers, users, waiting)
+        layers[frontier] = layer
+        placed += frontier.size
+        
+        found = gather(children, offsets, frontier)
+        numpy.subtract.at(waiting, found, 1)
+        found = found[(waiting[found] == 0) & (layers[found] < 0)]
+        frontier = numpy.unique(found)
+        layer += 1
+    return layers
+
+
+def break_cycle(layers, users, waiting):
+    """
+    The layering has stalled on a loop: nothing's left that all its users have been placed for.
+    Carry on from a single node - of the ones something placed uses, the one waiting on the fewest users
+    (or failing that, a loop nothing else uses, the first of the ones waiting on the fewest). Only the
+    edges from the users it was still waiting on end up pointing back towards the root
+    :param users: number of users each node has
+    :param waiting: number of each node's users that haven't been placed yet
+    :return: numpy array of the node to place next
+    """
+    left = layers < 0
+    entries = numpy.flatnonzero(left & (waiting < users))
+    if not entries.size:
+        entries = numpy.flatnonzero(left)
+    return entries[[numpy.argmin(waiting[entries])]]
+
+
+def gather(targets, offsets, nodes):
+    """
+    :param targets: adjacency targets, grouped by node
+    :param offsets: where each node's targets start. one longer than the node count
+    :return: numpy array of the targets of all the nodes
+    """
+    firsts = offsets[nodes]
+    counts = offsets[nodes + 1] - firsts
+    total = counts.sum()
+    if not total:
+        return numpy.zeros(0, dtype=numpy.int64)
+    # index of each target: the node's first, plus how far into the node's targets it is
+    steps = numpy.repeat(firsts - numpy.cumsum(counts) + counts, counts)
+    return targets[steps + numpy.arange(total)]
+
+
+def layer_members(layers):
+    """
+    :return: (list of numpy arrays of the nodes in each layer, in node order,
+              numpy array of each node's index in its layer's array)
+    """
+    order = numpy.argsort(layers, kind='stable')
+    bounds = numpy.searchsorted(layers[order], numpy.arange(layers.max() + 2 if layers.size else 1))
+    members = [order[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+    slots = numpy.zeros(len(layers), dtype=numpy.int64)
+    for layer in members:
+        slots[layer] = numpy.arange(len(layer))
+    return members, slots
+
+
+def centred_ranks(values, ties=None):
+    """
+    :param ties: values to settle ties by
+    :return: the rank of each value, as a fraction of the count centred on 0, so columns of different
+             sizes line up
+    """
+    ranks = numpy.empty(len(values), dtype=numpy.float64)
+    if ties is None:
+        ranks[numpy.argsort(values, kind='stable')] = numpy.arange(len(values))
+    else:
+        ranks[numpy.lexsort((ties, values))] = numpy.arange(len(values))
+    return (ranks - (len(values) - 1) / 2.0) / max(len(values), 1)
+
+
+def edges_by_layer(layers, members, nodes, others, upstream):
+    """
+    Group edges by the layer of one end, keeping only the ones whose other end is nearer the root
+    (upstream) or further from it
+    :param nodes: the end being grouped by
+    :param others: the other end
+    :return: list per layer of (nodes, others) numpy arrays
+    """
+    if upstream:
+        keep = layers[others] < layers[nodes]
+    else:
+        keep = layers[others] > layers[nodes]
+    nodes = nodes[keep]
+    others = others[keep]
+    order = numpy.argsort(layers[nodes], kind='stable')
+    nodes = nodes[order]
+    others = others[order]
+    bounds = numpy.searchsorted(layers[nodes], numpy.arange(len(members) + 1))
+    return [(nodes[bounds[i]:bounds[i + 1]], others[bounds[i]:bounds[i + 1]]) for i in range(len(members))]
+
+
+def barycentres(layer, slots, nodes, others, values):
+    """
+    :param layer: the layer's nodes
+    :param nodes: edge ends in the layer
+    :param others: the edges' other ends
+    :param values: position of every node
+    :return: the mean position of what each of the layer's nodes is connected to, NaN where it's connected
+             to nothing
+    """
+    local = slots[nodes]
+    totals = numpy.bincount(local, weights=values[others], minlength=len(layer))
+    counts = numpy.bincount(local, minlength=len(layer))
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        return totals / counts
+
+
+def order_layers(layers, members, slots, starts, ends, sweeps=SWEEPS):
+    """
+    Crossing reduction, by the barycentre heuristic: sweeping away from the root and back, each node
+    is moved to the average position of its neighbours in the columns already done.
+    Edges that span several columns count as if they were between neighbouring ones
+    :return: numpy array of each node's position down its column (centred ranks)
+    """
+    positions = numpy.zeros(len(layers), dtype=numpy.float64)
+    for layer in members:
+        positions[layer] = centred_ranks(numpy.arange(len(layer)))
+    
+    down = edges_by_layer(layers, members, ends, starts, upstream=True)
+    up = edges_by_layer(layers, members, starts, ends, upstream=False)
+    down_sweep = (down, range(1, len(members)))
+    up_sweep = (up, range(len(members) - 2, -1, -1))
+    # finishing on the way down leaves each column ordered by the one nearer the root
+    for edges, indices in [down_sweep, up_sweep] * sweeps + [down_sweep]:
+        for index in indices:
+            layer = members[index]
+            nodes, others = edges[index]
+            if not nodes.size:
+                continue
+            wanted = barycentres(layer, slots, nodes, others, positions)
+            # nodes with nothing to go by stay where they are
+            wanted = numpy.where(numpy.isnan(wanted), positions[layer], wanted)
+            positions[layer] = centred_ranks(wanted, positions[layer])
+    return positions
+
+
+def fill_gaps(wanted, step):
+    """
+    Fill in the NaNs, spacing them down from the last value before them (or up from the first value)
+    """
+    missing = numpy.isnan(wanted)
+    if not missing.any():
+        return wanted
+    if missing.all():
+        return numpy.arange(len(wanted)) * step
+    indices = numpy.arange(len(wanted))
+    last = numpy.maximum.accumulate(numpy.where(missing, 0, indices))
+    filled = wanted[last] + (indices - last) * step
+    first = numpy.flatnonzero(~missing)[0]
+    filled[:first] = wanted[first] - (first - indices[:first]) * step
+    return numpy.where(missing, filled, wanted)
+
+
+def pack(centres, heights, row_gap):
+    """
+    Space out a column in its order, as near to where each node wants its centre as there's room for.
+    Packed from the top and from the bottom, and the two averaged - both keep the nodes apart, so the
+    average does too
+    :param centres: where each node wants its centre, in column order
+    :return: numpy array of the top of each node
+    """
+    tops = centres - heights / 2.0
+    offsets = numpy.concatenate([[0.0], numpy.cumsum(heights[:-1] + row_gap)])
+    from_top = numpy.maximum.accumulate(tops - offsets) + offsets
+    from_bottom = numpy.minimum.accumulate((tops - offsets)[::-1])[::-1] + offsets
+    return (from_top + from_bottom) / 2.0
+
+
+def place_layers(layers, members, starts, ends, heights, row_gap):
+    """
+    Coordinate assignment. Each column is packed in order near the middle of the nodes using its nodes,
+    then a pass back towards the root pulls the users towards the middle of what they use
+    :param members: the nodes in each layer, in the order they go down the column
+    :return: numpy array of each node's y position
+    """
+    ys = numpy.zeros(len(layers), dtype=numpy.float64)
+    if not members:
+        return ys
+    slots = numpy.zeros(len(layers), dtype=numpy.int64)
+    for layer in members:
+        slots[layer] = numpy.arange(len(layer))
+    step = float(numpy.mean(heights)) + row_gap if len(heights) else NODE_HEIGHT + row_gap
+    centres = ys.copy()
+    
+    down = edges_by_layer(layers, members, ends, starts, upstream=True)
+    up = edges_by_layer(layers, members, starts, ends, upstream=False)
+    for edges, indices in [(down, range(len(members))), (up, range(len(members) - 2, -1, -1))]:
+        for index in indices:
+            layer = members[index]
+            nodes, others = edges[index]
+            wanted = barycentres(layer, slots, nodes, others, centres)
+            if edges is up:
+                # meet the nodes being used halfway
+                wanted = numpy.where(numpy.isnan(wanted), centres[layer], (wanted + centres[layer]) / 2.0)
+            elif index == 0:
+                wanted = numpy.zeros(len(layer))
+            ys[layer] = pack(fill_gaps(wanted, step), heights[layer], row_gap)
+            centres[layer] = ys[layer] + heights[layer] / 2.0
+    return ys
+
+
+class NodePlacer(object):
+    """
+    Finds room for nodes added to a graph that's already laid out, without moving any of the nodes
+    that are already there. Each column keeps a sorted list of the stretches of it that are taken, so
+    finding room for a node is a few bisects rather than a look at every node - adding nodes costs
+    time in proportion to how many there are, not the size of the graph. Each column also keeps its
+    nodes sorted by their tops, so a node that moves or goes only frees its own stretch, working out
+    what's left from the handful of nodes next to it. Doesn't need numpy.
+    """
+    
+    
+    def __init__(self, column_width=COLUMN_WIDTH, row_gap=ROW_GAP):
+        self.column_width = column_width
+        self.row_gap = row_gap
+        self.clear()
+    
+    
+    def clear(self):
+        # node -> (x, y, width, height)
+        self.rects = {}
+        # column -> (tops, nodes): the nodes in it, sorted by their tops. wide or out of line nodes can
+        # be in more than one
+        self.columns = {}
+        # column -> (starts, ends): sorted, separate stretches of y that are taken, padded by row_gap
+        self.spans = {}
+        # the shortest node so far. gaps between stretches that nothing could fit in are filled in,
+        # so scanning down a crowded column doesn't have to step over every one of them
+        self.min_height = None
+        # the tallest node so far. bounds how far above a stretch the nodes overlapping it can start
+        self.max_height = 0
+    
+    
+    def __contains__(self, node):
+        return node in self.rects
+    
+    
+    def __len__(self):
+        return len(self.rects)
+    
+    
+    def _columns(self, x, width):
+        first = int(math.floor(float(x) / self.column_width))
+        return range(first, max(int(math.ceil(float(x + width) / self.column_width)), first + 1))
+    
+    
+    def _take(self, column, top, bottom):
+        starts, ends = self.spans.setdefault(column, ([], []))
+        # merge with any stretches it touches, or is too close to for a node to fit between
+        fill = self.min_height or 0
+        first = bisect.bisect_right(ends, top - fill)
+        last = bisect.bisect_left(starts, bottom + fill)
+        if first < last:
+            top = min(top, starts[first])
+            bottom = max(bottom, ends[last - 1])
+        starts[first:last] = [top]
+        ends[first:last] = [bottom]
+    
+    
+    def _free(self, column, top, bottom):
+        """
+        Give back a stretch a node that's gone had taken. Only the stretch it was part of changes: the
+        node's part of it (and any gap either side of it that got filled in) is cut out, and whatever
+        of that the nodes still there cover is taken again
+        """
+        fill = self.min_height or 0
+        starts, ends = self.spans[column]
+        index = bisect.bisect_right(starts, top) - 1
+        first, last = starts[index], ends[index]
+        del starts[index]
+        del ends[index]
+        top -= fill
+        bottom += fill
+        if first < top:
+            self._take(column, first, top)
+        if bottom < last:
+            self._take(column, bottom, last)
+        tops, nodes = self.columns.get(column, ((), ()))
+        lowest = bisect.bisect_left(tops, top - self.max_height - 2 * self.row_gap)
+        highest = bisect.bisect_right(tops, bottom + self.row_gap)
+        for other in nodes[lowest:highest]:
+            other_x, other_y, other_width, other_height = self.rects[other]
+            other_top = other_y - self.row_gap
+            other_bottom = other_y + other_height + self.row_gap
+            if other_top <= bottom and other_bottom >= top:
+                self._take(column, other_top, other_bottom)
+        if not starts:
+            del self.spans[column]
+    
+    
+    def add(self, node, x, y, width, height):
+        """
+        Note where a node is. Adding a node again moves it
+        """
+        rect = (x, y, width, height)
+        if self.rects.get(node) == rect:
+            return
+        self.remove(node)
+        self.rects[node] = rect
+        if self.min_height is None or height < self.min_height:
+            self.min_height = height
+        self.max_height = max(self.max_height, height)
+        for column in self._columns(x, width):
+            tops, nodes = self.columns.setdefault(column, ([], []))
+            index = bisect.bisect_right(tops, y)
+            tops.insert(index, y)
+            nodes.insert(index, node)
+            self._take(column, y - self.row_gap, y + height + self.row_gap)
+    
+    
+    def remove(self, node):
+        rect = self.rects.pop(node, None)
+        if rect is None:
+            return
+        x, y, width, height = rect
+        for column in self._columns(x, width):
+            tops, nodes = self.columns[column]
+            index = bisect.bisect_left(tops, y)
+            while nodes[index] != node:
+                index += 1
+            del tops[index]
+            del nodes[index]
+            if not nodes:
+                del self.columns[column]
+            self._free(column, y - self.row_gap, y + height + self.row_gap)
+    
+    
+    def _scan(self, columns, y, height, step):
+        """
+        Move y down (step 1) or up (step -1) until the rect's clear of everything in the columns
+        """
+        moved = True
+        while moved:
+            moved = False
+            for column in columns:
+                starts, ends = self.spans.get(column, ((), ()))
+                while True:
+                    if step > 0:
+                        # the first stretch that ends below y
+                        index = bisect.bisect_right(ends, y)
+                        if index == len(starts) or starts[index] >= y + height:
+                            break
+                        y = ends[index]
+                    else:
+                        # the last stretch that starts above the bottom of the rect
+                        index = bisect.bisect_left(starts, y + height) - 1
+                        if index < 0 or ends[index] <= y:
+                            break
+                        y = starts[index] - height
+                    moved = True
+        return y
+    
+    
+    def free_y(self, x, y, width, height):
+        """
+        :return: the nearest y to the one given where the rect doesn't overlap anything, looking
+                 both up and down the column
+        """
+        columns = self._columns(x, width)
+        down = self._scan(columns, y, height, 1)
+        up = self._scan(columns, y, height, -1)
+        return down if down - y <= y - up else up
+    
+    
+    def place(self, node, parents, width, height):
+        """
+        Find a spot for a new node: a column to the left of the leftmost of the placed nodes using it,
+        as near level with the middle of them as there's room for
+        :param parents: the nodes using this one. ones that haven't been placed are ignored
+        :return: (x, y). the node is added there
+        """
+        rects = [self.rects[x] for x in parents if x in self.rects]
+        x = 0.0
+        centre = 0.0
+        if rects:
+            x = min(rect[0] for rect in rects) - self.column_width
+            centre = sum(rect[1] + rect[3] / 2.0 for rect in rects) / len(rects)
+        y = self.free_y(x, centre - height / 2.0, width, height)
+        self.add(node, x, y, width, height)
+        return x, y
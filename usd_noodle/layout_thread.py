@@ -0,0 +1,47 @@
+from __future__ import print_function
+
+import traceback
+
+from Qt import QtCore
+
+from . import layout
+from .walker import logger
+
+
+class LayoutThread(QtCore.QThread):
+    """
+    Works out a layered layout of the graph on a worker thread, from a copy of its nodes and
+    edges, so the gui carries on while it's busy. Nothing in the scene is touched until the
+    positions come back.
+    """
+    # list of node names, list of (x, y)
+    layout_ready = QtCore.Signal(object, object)
+    
+    
+    def __init__(self, graph, nodes, roots=(), heights=None, parent=None):
+        """
+        :param graph: DependencyGraph. only read here, on the gui thread
+        :param nodes: names of the nodes to lay out
+        :param roots: names of the nodes to go in the first column
+        :param heights: dict of node name -> height
+        """
+        super(LayoutThread, self).__init__(parent)
+        self.nodes = list(nodes)
+        node_ids = [graph.strings.get(x) for x in self.nodes]
+        self.node_ids = [-1 if x is None else x for x in node_ids]
+        self.starts, self.ends = graph.edge_ids()
+        index = dict((node, i) for i, node in enumerate(self.nodes))
+        self.roots = [index[x] for x in roots if x in index]
+        self.heights = None
+        if heights is not None:
+            self.heights = [heights.get(x, layout.NODE_HEIGHT) for x in self.nodes]
+    
+    
+    def run(self):
+        try:
+            starts, ends = layout.node_edges(self.node_ids, self.starts, self.ends)
+            xs, ys = layout.layered_layout(len(self.nodes), starts, ends, roots=self.roots, heights=self.heights)
+        except Exception:
+            logger.error(traceback.format_exc())
+            return
+        self.layout_ready.emit(self.nodes, list(zip(xs.tolist(), ys.tolist())))
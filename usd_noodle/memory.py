@@ -0,0 +1,143 @@
+from __future__ import print_function
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:
+    # windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def current_rss():
+    """
+    :return: resident size of this process in bytes, or None if we can't tell
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as fp:
+            return int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def peak_rss():
+    """
+    :return: the most this process has ever had resident, in bytes, or None if we can't tell
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on mac, kilobytes everywhere else
+        if sys.platform == 'darwin':
+            return peak
+        return peak * 1024
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss)
+    return None
+
+
+def format_size(size):
+    if size is None:
+        return 'unknown'
+    return '{:.1f}mb'.format(size / 1024.0 / 1024.0)
+
+
+class MemoryMonitor(object):
+    """
+    Keeps an eye on the resident size of the process over a walk: the peak it reached,
+    and whether it's gone over the ceiling.
+    The walker samples it as each layer is harvested (while the layer is still open) and merged,
+    so the peak is the biggest of those - not the spikes in between. With the process engine the
+    layers are harvested in the worker processes, which don't count towards it.
+    Safe to sample from several threads.
+    """
+    
+    
+    def __init__(self, limit=None):
+        """
+        :param limit: memory ceiling in bytes, or None for no ceiling
+        """
+        self.limit = limit
+        self.start_rss = None
+        self.peak = None
+        self._lock = threading.Lock()
+    
+    
+    def start(self):
+        self.start_rss = current_rss()
+        self.peak = self.start_rss
+    
+    
+    def sample(self):
+        """
+        :return: the current resident size, in bytes
+        """
+        rss = current_rss()
+        if rss is not None:
+            with self._lock:
+                if self.peak is None or rss > self.peak:
+                    self.peak = rss
+        return rss
+    
+    
+    def over_limit(self):
+        """
+        :return: True if there's a ceiling and we're over it
+        """
+        rss = self.sample()
+        return self.limit is not None and rss is not None and rss > self.limit
+
+
+class LayerRetainer(object):
+    """
+    Holds on to the most recently harvested Sdf layers, so they stay in the Sdf registry for
+    inspection (ie, viewing the layer text) without holding every layer of the walk in memory.
+    Layers that fall off the end are let go, and Sdf frees them once nothing else has them open.
+    Safe to share between threads.
+    """
+    
+    
+    def __init__(self, max_layers=0):
+        """
+        :param max_layers: how many layers to hang on to. 0 keeps nothing
+        """
+        self.max_layers = max_layers
+        self._layers = OrderedDict()
+        self._lock = threading.Lock()
+    
+    
+    def __len__(self):
+        return len(self._layers)
+    
+    
+    def keep(self, layer_path, layer):
+        if not self.max_layers or not layer:
+            return
+        with self._lock:
+            self._layers.pop(layer_path, None)
+            self._layers[layer_path] = layer
+            while len(self._layers) > self.max_layers:
+                self._layers.popitem(last=False)
+    
+    
+    def get(self, layer_path):
+        with self._lock:
+            layer = self._layers.pop(layer_path, None)
+            if layer is not None:
+                self._layers[layer_path] = layer
+            return layer
+    
+    
+    def clear(self):
+        with self._lock:
+            self._layers.clear()
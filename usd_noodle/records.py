@@ -0,0 +1,183 @@
+from __future__ import print_function
+
+import sys
+
+try:
+    intern_string = sys.intern
+except AttributeError:
+    # python 2
+    intern_string = intern
+
+
+# node types, by the code NodeRecords keep them as
+NODE_TYPES = ['sublayer', 'reference', 'payload', 'specialize', 'clip', 'variant', 'material', 'tex', 'ext']
+TYPE_CODES = dict((name, code) for code, name in enumerate(NODE_TYPES))
+
+# info keys nearly every node has, so they get a slot of their own. anything else goes in the node's extras
+SLOT_KEYS = ('path', 'online', 'size', 'mtime', 'count', 'colorspace')
+
+
+class StringTable(object):
+    """
+    Every distinct string once, numbered in the order they turned up. Node paths and edge types
+    are stored as these numbers, so each one is only held in memory the once.
+    """
+    
+    
+    def __init__(self):
+        self._ids = {}
+        self._strings = []
+    
+    
+    def __len__(self):
+        return len(self._strings)
+    
+    
+    def intern(self, text):
+        """
+        :return: the string's id, adding it if it's new
+        """
+        string_id = self._ids.get(text)
+        if string_id is None:
+            if isinstance(text, str):
+                text = intern_string(text)
+            string_id = len(self._strings)
+            self._ids[text] = string_id
+            self._strings.append(text)
+        return string_id
+    
+    
+    def get(self, text):
+        """
+        :return: the string's id, or None if we've never seen it
+        """
+        return self._ids.get(text)
+    
+    
+    def text(self, string_id):
+        return self._strings[string_id]
+
+
+class NodeRecord(object):
+    """
+    A walker node, kept small: the info keys every node has live in slots, the node type is a
+    code rather than a string, and paths are interned. Anything less common goes in a dict of extras
+    that only gets made when it's needed.
+    Reads and writes like the info dict it stands in for (get, [], in, update, pop, items...),
+    and dict(record) makes a plain dict of it, ie for the info panel or a json report.
+    """
+    __slots__ = ('id', 'type_code', 'extra') + SLOT_KEYS
+    
+    
+    def __init__(self, node_id=None, info=None):
+        """
+        :param node_id: the node path's id in the graph's StringTable
+        :param info: info dict to start from
+        """
+        self.id = node_id
+        self.type_code = None
+        self.extra = None
+        if info:
+            self.update(info)
+    
+    
+    def __repr__(self):
+        return 'NodeRecord({!r}, {!r})'.format(self.id, dict(self))
+    
+    
+    def get(self, key, default=None):
+        if key in SLOT_KEYS:
+            return getattr(self, key, default)
+        if key == 'type' and self.type_code is not None:
+            return NODE_TYPES[self.type_code]
+        if self.extra is None:
+            return default
+        return self.extra.get(key, default)
+    
+    
+    def __getitem__(self, key):
+        value = self.get(key, KeyError)
+        if value is KeyError:
+            raise KeyError(key)
+        return value
+    
+    
+    def __setitem__(self, key, value):
+        if key in SLOT_KEYS:
+            if key == 'path' and isinstance(value, str):
+                value = intern_string(value)
+            setattr(self, key, value)
+            return
+        if key == 'type' and value in TYPE_CODES:
+            self.type_code = TYPE_CODES[value]
+            if self.extra:
+                self.extra.pop('type', None)
+            return
+        if key == 'type':
+            self.type_code = None
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+    
+    
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.pop(key)
+    
+    
+    def __contains__(self, key):
+        return self.get(key, KeyError) is not KeyError
+    
+    
+    def pop(self, key, default=None):
+        value = self.get(key, KeyError)
+        if value is KeyError:
+            return default
+        if key in SLOT_KEYS:
+            delattr(self, key)
+        elif key == 'type' and self.type_code is not None:
+            self.type_code = None
+        else:
+            del self.extra[key]
+            if not self.extra:
+                self.extra = None
+        return value
+    
+    
+    def setdefault(self, key, default=None):
+        value = self.get(key, KeyError)
+        if value is KeyError:
+            self[key] = default
+            return default
+        return value
+    
+    
+    def update(self, other):
+        for key, value in other.items():
+            self[key] = value
+    
+    
+    def keys(self):
+        ret = [x for x in SLOT_KEYS if hasattr(self, x)]
+        if self.type_code is not None:
+            ret.append('type')
+        if self.extra:
+            ret.extend(self.extra)
+        return ret
+    
+    
+    def __iter__(self):
+        return iter(self.keys())
+    
+    
+    def __len__(self):
+        return len(self.keys())
+    
+    
+    def items(self):
+        return [(x, self[x]) for x in self.keys()]
+    
+    
+    def values(self):
+        return [self[x] for x in self.keys()]
@@ -0,0 +1,71 @@
+from __future__ import print_function
+
+import json
+
+
+# bump this whenever the layout of the report changes
+REPORT_VERSION = 1
+
+
+def offline_nodes(walker):
+    """
+    :return: sorted paths of the file nodes that aren't on disk
+    """
+    return sorted(path for path, info in walker.nodes.items() if info.get('online') is False)
+
+
+def node_info(walker):
+    """
+    :return: dict of node path -> plain info dict, for writing out
+    """
+    return dict((path, dict(info)) for path, info in walker.nodes.items())
+
+
+def walk_stats(walker):
+    progress = walker.progress()
+    return {
+        'layers': progress['layers'],
+        'nodes': len(walker.nodes),
+        'edges': len(walker.graph),
+        'elapsed': progress['elapsed'],
+        'peak_rss': walker.memory.peak,
+        'cancelled': walker.cancelled,
+    }
+
+
+def walk_report(walker):
+    """
+    Everything a walk found, as plain json-able data
+    :param walker: a DependencyWalker that's been start()ed
+    :return: dict
+    """
+    return {
+        'version': REPORT_VERSION,
+        'root': walker.usdfile,
+        'options': walker.cache_options(),
+        'nodes': node_info(walker),
+        'edges': [list(x) for x in walker.graph.edges()],
+        'offline': offline_nodes(walker),
+        'errors': list(walker.errored_nodes),
+        'cycles': walker.cycles,
+        'stats': walk_stats(walker),
+    }
+
+
+def write_json(path, walker):
+    """
+    Write the walk out as a single json document
+    :param path: file path, or '-' for stdout
+    """
+    # walk_io imports this module, so it can't be imported up top
+    from .walk_io import open_output
+    fp, close = open_output(path)
+    try:
+        # anything that isn't plain data has already been through utils.plain_value,
+        # but don't fall over if something's slipped through
+        json.dump(walk_report(walker), fp, indent=1, sort_keys=True, default=str)
+        fp.write('\n')
+    finally:
+        if close:
+            fp.close()
+
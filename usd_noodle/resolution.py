@@ -0,0 +1,186 @@
+from __future__ import print_function
+
+import os.path
+import threading
+from collections import OrderedDict
+
+from pxr import Sdf, Ar
+
+
+# how many resolved paths to remember
+DEFAULT_RESOLVE_CACHE_SIZE = 200000
+
+
+def anchor_key(layer, path):
+    """
+    The part of the layer that matters when anchoring a path to it.
+    Only relative paths care about the layer, and then only about its directory,
+    so every layer in the same directory shares cache entries.
+    """
+    if layer is None or os.path.isabs(path) or '://' in path or ':' in path.split('/')[0]:
+        return None
+    identifier = layer.realPath or layer.identifier
+    return os.path.dirname(identifier)
+
+
+def context_key(context):
+    """
+    A string that's the same for contexts that resolve things the same way, and survives between sessions.
+    The default resolver's search path comes from the environment rather than the context, so it goes in too
+    :param context: Ar.ResolverContext, or None
+    """
+    if context is None or context.IsEmpty():
+        text = ''
+    elif hasattr(context, 'GetDebugString'):
+        text = context.GetDebugString()
+    else:
+        text = repr(context)
+    return '{}\n{}'.format(text, os.environ.get('PXR_AR_DEFAULT_SEARCH_PATH', ''))
+
+
+class AssetResolver(object):
+    """
+    Asset resolution for the dependency walker.
+    Anchors relative paths against the layer they came from, resolves them with the root layer's
+    resolver context bound, and remembers the answers in a bounded LRU. Safe to share between threads.
+
+    Resolvers that can do a whole batch of paths in one go (eg, one database round trip) can be hooked
+    in with batch_resolve - a callable that takes a list of anchored asset paths and returns a list of
+    resolved path strings (empty for anything that didn't resolve).
+    """
+    
+    
+    def __init__(self, max_size=DEFAULT_RESOLVE_CACHE_SIZE, batch_resolve=None):
+        self.resolver = Ar.GetResolver()
+        self.context = None
+        self.context_asset = None
+        # stands for the bound context (and whatever else changes how paths resolve) in walk cache keys
+        self.context_key = context_key(None)
+        self.max_size = max_size
+        self.batch_resolve = batch_resolve
+        
+        self.hits = 0
+        self.misses = 0
+        
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+    
+    
+    def bind_root(self, root_path):
+        """
+        Use the default resolver context for the root layer, like a stage opened on it would.
+        Clears the cache if the context changes
+        :param root_path: root layer path
+        """
+        if root_path == self.context_asset:
+            return
+        self.context_asset = root_path
+        try:
+            self.context = self.resolver.CreateDefaultContextForAsset(root_path)
+        except Exception:
+            # older or custom resolvers without context support
+            self.context = None
+        self.context_key = context_key(self.context)
+        self.clear()
+    
+    
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    
+    def anchor(self, layer, path):
+        """
+        Make a layer relative path absolute (or whatever the resolver considers absolute)
+        """
+        if layer is None:
+            return path
+        if hasattr(layer, 'ComputeAbsolutePath'):
+            return layer.ComputeAbsolutePath(path)
+        return Sdf.ComputeAssetPathRelativeToLayer(layer, path)
+    
+    
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._cache:
+                value = self._cache.pop(key)
+                self._cache[key] = value
+                self.hits += 1
+                return value
+            self.misses += 1
+            return None
+    
+    
+    def _store(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+    
+    
+    def _resolve_anchored(self, anchored):
+        if self.context is not None:
+            with Ar.ResolverContextBinder(self.context):
+                resolved = self.resolver.Resolve(anchored)
+        else:
+            resolved = self.resolver.Resolve(anchored)
+        
+        if resolved:
+            if hasattr(resolved, 'GetPathString'):
+                return resolved.GetPathString()
+            return str(resolved)
+        # resolver will return None on invalid paths
+        # we still want the path regardless
+        return anchored
+    
+    
+    def resolve(self, layer, path):
+        """
+        :param layer: the Sdf.Layer the path was authored in
+        :param path: asset path as authored
+        :return: the resolved path, or the anchored path if it doesn't resolve
+        """
+        key = (anchor_key(layer, path), path)
+        resolved = self._lookup(key)
+        if resolved is not None:
+            return resolved
+        
+        resolved = self._resolve_anchored(self.anchor(layer, path))
+        self._store(key, resolved)
+        return resolved
+    
+    
+    def resolve_many(self, layer, paths):
+        """
+        Resolve a list of paths from the same layer, sending all the cache misses to the
+        batch hook in one go if there is one
+        :return: list of resolved paths, in the same order as paths
+        """
+        if self.batch_resolve is None:
+            return [self.resolve(layer, x) for x in paths]
+        
+        ret = [None] * len(paths)
+        missing = []
+        for i, path in enumerate(paths):
+            key = (anchor_key(layer, path), path)
+            resolved = self._lookup(key)
+            if resolved is None:
+                missing.append((i, key, self.anchor(layer, path)))
+            else:
+                ret[i] = resolved
+        
+        if missing:
+            if self.context is not None:
+                with Ar.ResolverContextBinder(self.context):
+                    results = self.batch_resolve([x[2] for x in missing])
+            else:
+                results = self.batch_resolve([x[2] for x in missing])
+            
+            for (i, key, anchored), resolved in zip(missing, results):
+                resolved = resolved or anchored
+                self._store(key, resolved)
+                ret[i] = resolved
+        
+        return ret
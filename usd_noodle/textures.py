@@ -0,0 +1,110 @@
+from __future__ import print_function
+
+import os
+import os.path
+import re
+
+
+# what a texture set's files are numbered by
+TOKEN_UDIM = 'udim'
+TOKEN_UVTILE = 'uvtile'
+TOKEN_FRAME = 'frame'
+
+# tokens that stand for a tile or frame number in a texture path, and what they match in a file name.
+# <UVTILE> is the mari style u1_v1
+TILE_TOKENS = [
+    (re.compile(r'<udim>', re.I), TOKEN_UDIM, r'(?P<udim{}>\d{{4}})'),
+    (re.compile(r'<uvtile>', re.I), TOKEN_UVTILE, r'u(?P<u{0}>\d+)_v(?P<v{0}>\d+)'),
+    (re.compile(r'<f\d*>', re.I), TOKEN_FRAME, r'(?P<frame{}>-?\d+)'),
+    (re.compile(r'\$F\d*'), TOKEN_FRAME, r'(?P<frame{}>-?\d+)'),
+    (re.compile(r'%0?\d*d'), TOKEN_FRAME, r'(?P<frame{}>-?\d+)'),
+    (re.compile(r'#+'), TOKEN_FRAME, r'(?P<frame{}>-?\d+)'),
+]
+
+# udim tiles are numbered 1001 up, ten to a row
+UDIM_START = 1001
+UDIM_COLUMNS = 10
+
+
+def texture_set(path):
+    """
+    Work out the files a tokenised texture path (a udim set, a frame sequence...) stands for
+    :param path: resolved texture path
+    :return: dict of directory, token (what the tiles are numbered by) and pattern (a regex matching
+             the set's file names), or None if the file name has no tokens in it
+    """
+    directory, name = os.path.split(path)
+    pattern = ''
+    token = None
+    pos = 0
+    count = 0
+    while True:
+        # the first of the tokens to turn up next
+        found = None
+        for token_re, kind, group in TILE_TOKENS:
+            match = token_re.search(name, pos)
+            if match and (found is None or match.start() < found[0].start()):
+                found = (match, kind, group)
+        if found is None:
+            break
+        match, kind, group = found
+        pattern += re.escape(name[pos:match.start()]) + group.format(count)
+        # udims win over frames when working out the tile numbers of animated udims
+        if token is None or (token == TOKEN_FRAME and kind != TOKEN_FRAME):
+            token = kind
+        pos = match.end()
+        count += 1
+    if not count:
+        return None
+    pattern += re.escape(name[pos:]) + '$'
+    
+    return {'directory': directory, 'token': token, 'pattern': pattern}
+
+
+def compile_pattern(tile_files):
+    # windows filesystems don't care about case, and the directory listings are lowercased there
+    return re.compile(tile_files['pattern'], re.I if os.name == 'nt' else 0)
+
+
+def tile_number(tile_files, match):
+    """
+    :param match: a match of the set's pattern against a file name
+    :return: the udim (uvtiles converted to udims) or frame number the file is for
+    """
+    groups = match.groupdict()
+    if tile_files['token'] == TOKEN_UDIM:
+        return int(first_group(groups, 'udim'))
+    if tile_files['token'] == TOKEN_UVTILE:
+        u = int(first_group(groups, 'u'))
+        v = int(first_group(groups, 'v'))
+        return UDIM_START - 1 + u + (v - 1) * UDIM_COLUMNS
+    return int(first_group(groups, 'frame'))
+
+
+def first_group(groups, prefix):
+    for i in range(len(groups)):
+        key = '{}{}'.format(prefix, i)
+        if key in groups:
+            return groups[key]
+    raise KeyError(prefix)
+
+
+def expected_tiles(tile_files, tiles):
+    """
+    What the set ought to have, going by what's there: every udim from the first to the last tile
+    of each row, or every frame from the first to the last. Sets don't have to fill a rectangle -
+    rows of different lengths are normal - so udims past the end of a row, and rows with nothing
+    in them, don't count as missing
+    :param tiles: the tile numbers there are files for
+    :return: sorted list of tile numbers
+    """
+    if not tiles:
+        return []
+    if tile_files['token'] in [TOKEN_UDIM, TOKEN_UVTILE]:
+        rows = {}
+        for tile in tiles:
+            row = (tile - UDIM_START) // UDIM_COLUMNS
+            first, last = rows.get(row, (tile, tile))
+            rows[row] = (min(first, tile), max(last, tile))
+        return [x for row in sorted(rows) for x in range(rows[row][0], rows[row][1] + 1)]
+    return list(range(min(tiles), max(tiles) + 1))
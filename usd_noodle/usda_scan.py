@@ -0,0 +1,661 @@
+from __future__ import print_function
+
+import mmap
+import os
+import os.path
+import re
+
+from pxr import Sdf, Ar
+
+
+# files at least this big get memory mapped, so the os pages them in as the scanner gets to them
+# rather than us reading the whole thing into memory up front
+MMAP_THRESHOLD = 1 << 20
+
+EOF = 'eof'
+
+TOKEN_RE = re.compile(br'''
+    (?P<space>[ \t\r\n]+)
+  | (?P<comment>\#[^\n]*)
+  | (?P<asset>@@@.*?@@@|@[^@\n]*@)
+  | (?P<string>"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<path><[^<>\n]*>)
+  | (?P<number>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|-inf)
+  | (?P<ident>[A-Za-z_][\w:.]*(?:\[\])?)
+  | (?P<punct>[\[\](){}=,;])
+''', re.VERBOSE)
+
+# the characters that matter when skipping over a value we don't care about. brackets for the
+# nesting, and the starts of tokens that can have brackets inside them
+SKIP_RE = re.compile(br'''[\[\](){}"'@#<]''')
+
+STRING_ESCAPE_RE = re.compile(r'\\(.)')
+STRING_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r'}
+
+SPECIFIERS = [b'def', b'over', b'class']
+LIST_OPS = [b'add', b'append', b'prepend', b'delete', b'reorder']
+VARIABILITY = [b'uniform', b'varying', b'config']
+OPENERS = [b'[', b'(', b'{']
+CLOSERS = [b']', b')', b'}']
+SEPARATORS = [b';', b',']
+
+# layer metadata written under a different name in usda than the field Sdf keeps it in
+LAYER_FIELDS = {b'doc': 'documentation'}
+
+
+class ScanError(Exception):
+    """
+    The scanner came across something it isn't sure about. The layer should be opened with Sdf instead
+    """
+    pass
+
+
+def is_usda(path):
+    """
+    :return: True if the file is usd ascii - .usda, or a .usd with an ascii header
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.usda':
+        return True
+    if ext != '.usd':
+        return False
+    try:
+        with open(path, 'rb') as fp:
+            return fp.read(5) == b'#usda'
+    except (OSError, IOError):
+        return False
+
+
+def unquote(token):
+    if token[:3] in [b'"""', b"'''"]:
+        text = token[3:-3].decode('utf-8')
+    else:
+        text = token[1:-1].decode('utf-8')
+    if '\\' in text:
+        text = STRING_ESCAPE_RE.sub(lambda m: STRING_ESCAPES.get(m.group(1), m.group(1)), text)
+    return text
+
+
+def asset_text(token):
+    if token[:3] == b'@@@':
+        return token[3:-3].decode('utf-8')
+    return token[1:-1].decode('utf-8')
+
+
+def typed_value(type_name, value):
+    """
+    A scanned value as Sdf would read it, given the type it's declared as - eg, double x = 1 is 1.0
+    """
+    value_type = Sdf.ValueTypeNames.Find(type_name)
+    if not value_type:
+        return value
+    cast = value_type.type.pythonClass or type(value_type.defaultValue)
+    try:
+        return cast(value)
+    except Exception:
+        return value
+
+
+_layer_fallbacks = {}
+
+
+def layer_metadata_value(key, value):
+    """
+    A scanned layer metadata value as Sdf would read it. Layer metadata isn't declared with a type,
+    so numbers go by the field's fallback - eg, startTimeCode = 1 is 1.0
+    """
+    if not _layer_fallbacks:
+        layer = Sdf.Layer.CreateAnonymous()
+        root = layer.pseudoRoot
+        _layer_fallbacks.update((x, root.GetFallbackForInfo(x)) for x in root.GetMetaDataInfoKeys())
+    if isinstance(_layer_fallbacks.get(key), float) and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+class ScannedLayer(object):
+    """
+    Stands in for the Sdf.Layer when anchoring the asset paths of a scanned file
+    """
+    
+    
+    def __init__(self, layer_path):
+        self.realPath = layer_path
+        self.identifier = layer_path
+    
+    
+    def ComputeAbsolutePath(self, path):
+        if not path:
+            return path
+        resolver = Ar.GetResolver()
+        if hasattr(resolver, 'CreateIdentifier'):
+            return resolver.CreateIdentifier(path, Ar.ResolvedPath(self.realPath))
+        if resolver.IsRelativePath(path):
+            return resolver.AnchorRelativePath(self.realPath, path)
+        return path
+    
+    
+    def IsMuted(self):
+        try:
+            return Sdf.Layer.IsMuted(self.identifier)
+        except Exception:
+            return False
+
+
+class UsdaScan(object):
+    """
+    What the scanner found in a file. Asset paths are as authored, not anchored or resolved
+    """
+    
+    
+    def __init__(self):
+        # layer metadata, minus the sublayers
+        self.layer_metadata = {}
+        self.default_prim = None
+        self.root_prims = []
+        self.sublayers = []
+        # (arc type, asset path, (variant set, variant) or None)
+        self.arcs = []
+        # (asset path, colorspace, owner type, owner name, owner parent type, owner parent name)
+        self.asset_attributes = []
+        # (clip set name, clip set dict)
+        self.clips = []
+        # (variant set name, [variant names], selection)
+        self.variant_sets = []
+
+
+class UsdaScanner(object):
+    """
+    Lexes a usda file for the things the dependency walker cares about: sublayers, references,
+    payloads, asset valued attributes, value clips and variant sets. No layer gets built.
+    Values nobody is interested in (ie, the big geometry arrays that make up most of a file) are
+    stepped over by jumping from bracket to bracket, without being tokenized.
+    Anything that doesn't look like it should raises a ScanError.
+    """
+    
+    
+    def __init__(self, data, walk_attributes=True, arcs_only=False):
+        """
+        :param data: bytes, or an mmap of the file
+        :param walk_attributes: look for asset valued attributes
+        :param arcs_only: only look for sublayers / references / payloads
+        """
+        self.data = data
+        self.end = len(data)
+        self.pos = 0
+        self.walk_attributes = walk_attributes
+        self.arcs_only = arcs_only
+        self.result = UsdaScan()
+        # cast dictionary values to their declared types, like Sdf does. only wanted for the layer
+        # metadata - the walker reads clip set arrays as plain lists
+        self.typed_dicts = False
+        self._peeked = None
+    
+    
+    def _read(self):
+        while self.pos < self.end:
+            m = TOKEN_RE.match(self.data, self.pos)
+            if m is None:
+                raise ScanError('Unexpected character at byte {}'.format(self.pos))
+            self.pos = m.end()
+            kind = m.lastgroup
+            if kind in ['space', 'comment']:
+                continue
+            return kind, m.group(kind)
+        return EOF, b''
+    
+    
+    def next(self):
+        if self._peeked is not None:
+            token = self._peeked
+            self._peeked = None
+            return token
+        return self._read()
+    
+    
+    def peek(self):
+        if self._peeked is None:
+            self._peeked = self._read()
+        return self._peeked
+    
+    
+    def expect(self, punct):
+        kind, token = self.next()
+        if kind != 'punct' or token != punct:
+            raise ScanError('Expected {} at byte {}, got {}'.format(punct, self.pos, token))
+    
+    
+    def ident(self):
+        kind, token = self.next()
+        if kind != 'ident':
+            raise ScanError('Expected a name at byte {}, got {}'.format(self.pos, token))
+        return token
+    
+    
+    def skip_group(self):
+        """
+        Step over everything up to the bracket matching the one just read
+        """
+        depth = 1
+        while depth:
+            m = SKIP_RE.search(self.data, self.pos)
+            if m is None:
+                raise ScanError('Unterminated brackets')
+            char = m.group()
+            if char in OPENERS:
+                depth += 1
+                self.pos = m.end()
+            elif char in CLOSERS:
+                depth -= 1
+                self.pos = m.end()
+            else:
+                # strings, assets, comments and paths can have brackets inside them.
+                # let the tokenizer step over those
+                self.pos = m.start()
+                self._read()
+    
+    
+    def skip_value(self):
+        kind, token = self.next()
+        if kind == 'punct':
+            if token not in OPENERS:
+                raise ScanError('Unexpected {} at byte {}'.format(token, self.pos))
+            self.skip_group()
+        elif kind == 'asset' and self.peek()[0] == 'path':
+            # reference style asset + prim path
+            self.next()
+        elif kind == EOF:
+            raise ScanError('Unexpected end of file')
+    
+    
+    def scalar(self, kind, token):
+        if kind == 'string':
+            return unquote(token)
+        if kind == 'asset':
+            return Sdf.AssetPath(asset_text(token))
+        if kind == 'path':
+            return token[1:-1].decode('utf-8')
+        if kind == 'number':
+            if token == b'-inf':
+                return float('-inf')
+            if b'.' in token or b'e' in token or b'E' in token:
+                return float(token)
+            return int(token)
+        if kind == 'ident':
+            if token == b'None':
+                return None
+            return token.decode('utf-8')
+        raise ScanError('Unexpected {} at byte {}'.format(token, self.pos))
+    
+    
+    def parse_value(self):
+        kind, token = self.next()
+        if kind == 'punct':
+            if token == b'[':
+                return self.parse_list(b']')
+            if token == b'(':
+                return self.parse_list(b')')
+            if token == b'{':
+                return self.parse_dict()
+            raise ScanError('Unexpected {} at byte {}'.format(token, self.pos))
+        return self.scalar(kind, token)
+    
+    
+    def parse_list(self, close):
+        ret = []
+        while True:
+            kind, token = self.peek()
+            if kind == 'punct' and token == close:
+                self.next()
+                return ret
+            if kind == 'punct' and token in SEPARATORS:
+                self.next()
+                continue
+            ret.append(self.parse_value())
+    
+    
+    def parse_dict(self):
+        """
+        { type key = value ... }
+        """
+        ret = {}
+        while True:
+            kind, token = self.next()
+            if kind == 'punct' and token == b'}':
+                return ret
+            if kind == 'punct' and token in SEPARATORS:
+                continue
+            if kind != 'ident':
+                raise ScanError('Expected a type name at byte {}, got {}'.format(self.pos, token))
+            type_name = token.decode('utf-8')
+            kind, key = self.next()
+            if kind == 'string':
+                key = unquote(key)
+            elif kind == 'ident':
+                key = key.decode('utf-8')
+            else:
+                raise ScanError('Expected a key at byte {}, got {}'.format(self.pos, key))
+            self.expect(b'=')
+            ret[key] = self.parse_value()
+            if self.typed_dicts:
+                ret[key] = typed_value(type_name, ret[key])
+    
+    
+    def parse_arc_list(self):
+        """
+        The value of a subLayers / references / payload field. None, a single item, or a list of them
+        :return: list of asset paths. internal references don't have one, so they're left out
+        """
+        kind, token = self.next()
+        if kind == 'ident' and token == b'None':
+            return []
+        paths = []
+        if kind == 'punct' and token == b'[':
+            while True:
+                kind, token = self.next()
+                if kind == 'punct' and token == b']':
+                    return paths
+                if kind == 'punct' and token == b',':
+                    continue
+                self.parse_arc_item(kind, token, paths)
+        self.parse_arc_item(kind, token, paths)
+        return paths
+    
+    
+    def parse_arc_item(self, kind, token, paths):
+        if kind == 'asset':
+            paths.append(asset_text(token))
+        elif kind != 'path':
+            raise ScanError('Expected an asset path at byte {}, got {}'.format(self.pos, token))
+        
+        # then maybe a prim path and / or a layer offset
+        kind, token = self.peek()
+        if kind == 'path':
+            self.next()
+            kind, token = self.peek()
+        if kind == 'punct' and token == b'(':
+            self.next()
+            self.skip_group()
+    
+    
+    def scan(self):
+        if self.data[:5] != b'#usda':
+            raise ScanError('Not a usda file')
+        
+        kind, token = self.next()
+        if kind == 'punct' and token == b'(':
+            self.parse_layer_metadata()
+            kind, token = self.next()
+        
+        while kind != EOF:
+            if kind != 'ident':
+                raise ScanError('Unexpected {} at byte {}'.format(token, self.pos))
+            if token in SPECIFIERS:
+                self.parse_prim([], None)
+            elif token == b'reorder':
+                # reorder rootPrims = [...]
+                self.ident()
+                self.expect(b'=')
+                self.skip_value()
+            else:
+                raise ScanError('Unexpected {} at byte {}'.format(token, self.pos))
+            kind, token = self.next()
+        
+        return self.result
+    
+    
+    def parse_layer_metadata(self):
+        metadata = self.result.layer_metadata
+        self.typed_dicts = True
+        while True:
+            kind, token = self.next()
+            if kind == 'punct' and token == b')':
+                self.typed_dicts = False
+                return
+            if kind == 'punct' and token in SEPARATORS:
+                continue
+            if kind == 'string':
+                # a bare string is the layer's comment, same as Sdf
+                metadata['comment'] = unquote(token)
+                continue
+            if kind != 'ident':
+                raise ScanError('Unexpected {} at byte {}'.format(token, self.pos))
+            self.expect(b'=')
+            if token == b'subLayers':
+                self.result.sublayers = self.parse_arc_list()
+                continue
+            key = LAYER_FIELDS.get(token) or token.decode('utf-8')
+            metadata[key] = layer_metadata_value(key, self.parse_value())
+            if key == 'defaultPrim':
+                self.result.default_prim = metadata[key]
+    
+    
+    def parse_prim(self, parents, variant):
+        """
+        specifier [type] "name" [(metadata)] { body }
+        :param parents: list of (type, name) of the prims above this one
+        :param variant: (variant set, variant) if we're inside a variant
+        """
+        kind, token = self.next()
+        type_name = ''
+        if kind == 'ident':
+            type_name = token.decode('utf-8')
+            kind, token = self.next()
+        if kind != 'string':
+            raise ScanError('Expected a prim name at byte {}, got {}'.format(self.pos, token))
+        name = unquote(token)
+        if not parents:
+            self.result.root_prims.append('/' + name)
+        
+        selections = {}
+        kind, token = self.next()
+        if kind == 'punct' and token == b'(':
+            selections = self.parse_prim_metadata(variant)
+            kind, token = self.next()
+        if kind != 'punct' or token != b'{':
+            raise ScanError('Expected {{ at byte {}, got {}'.format(self.pos, token))
+        self.parse_prim_body(parents + [(type_name, name)], variant, selections)
+    
+    
+    def parse_prim_metadata(self, variant):
+        """
+        :return: the prim's variant selections
+        """
+        selections = {}
+        while True:
+            kind, token = self.next()
+            if kind == 'punct' and token == b')':
+                return selections
+            if kind == 'punct' and token in SEPARATORS:
+                continue
+            if kind == 'string':
+                # doc string
+                continue
+            if kind != 'ident':
+                raise ScanError('Unexpected {} at byte {}'.format(token, self.pos))
+            
+            list_op = None
+            if token in LIST_OPS:
+                list_op = token
+                token = self.ident()
+            self.expect(b'=')
+            
+            if token in [b'references', b'payload']:
+                paths = self.parse_arc_list()
+                if list_op == b'delete':
+                    continue
+                arc_type = 'reference' if token == b'references' else 'payload'
+                for path in paths:
+                    self.result.arcs.append((arc_type, path, variant))
+            elif token == b'clips' and variant is None and not self.arcs_only:
+                clips = self.parse_value()
+                if not isinstance(clips, dict):
+                    raise ScanError('Unexpected clips value')
+                for clip_set_name, clip_set in clips.items():
+                    if not isinstance(clip_set, dict) or not (clip_set.get('assetPaths')
+                                                              or clip_set.get('templateAssetPath')):
+                        # leave anything else to Sdf
+                        raise ScanError('Unsupported clip set {}'.format(clip_set_name))
+                    self.result.clips.append((clip_set_name, clip_set))
+            elif token == b'variants' and variant is None:
+                selections = self.parse_value()
+                if not isinstance(selections, dict):
+                    raise ScanError('Unexpected variants value')
+            else:
+                self.skip_value()
+    
+    
+    def parse_prim_body(self, parents, variant, selections):
+        while True:
+            kind, token = self.next()
+            if kind == 'punct' and token == b'}':
+                return
+            if kind == 'punct' and token in SEPARATORS:
+                continue
+            if kind != 'ident':
+                raise ScanError('Unexpected {} at byte {}'.format(token, self.pos))
+            
+            if token in SPECIFIERS:
+                self.parse_prim(parents, variant)
+            elif token == b'variantSet':
+                self.parse_variant_set(parents, variant, selections)
+            elif token == b'reorder' and self.peek()[1] in [b'nameChildren', b'properties']:
+                self.next()
+                self.expect(b'=')
+                self.skip_value()
+            else:
+                self.parse_property(token, parents, variant)
+    
+    
+    def parse_variant_set(self, parents, variant, selections):
+        """
+        variantSet "name" = { "variant" [(metadata)] { body } ... }
+        """
+        kind, token = self.next()
+        if kind != 'string':
+            raise ScanError('Expected a variant set name at byte {}, got {}'.format(self.pos, token))
+        set_name = unquote(token)
+        self.expect(b'=')
+        self.expect(b'{')
+        
+        if variant is not None:
+            # variant sets inside variants aren't something the walker looks at
+            self.skip_group()
+            return
+        
+        variant_names = []
+        self.result.variant_sets.append((set_name, variant_names, selections.get(set_name)))
+        
+        while True:
+            kind, token = self.next()
+            if kind == 'punct' and token == b'}':
+                return
+            if kind != 'string':
+                raise ScanError('Expected a variant name at byte {}, got {}'.format(self.pos, token))
+            variant_name = unquote(token)
+            variant_names.append(variant_name)
+            
+            kind, token = self.next()
+            if kind == 'punct' and token == b'(':
+                self.parse_prim_metadata((set_name, variant_name))
+                kind, token = self.next()
+            if kind != 'punct' or token != b'{':
+                raise ScanError('Expected {{ at byte {}, got {}'.format(self.pos, token))
+            self.parse_prim_body(parents, (set_name, variant_name), {})
+    
+    
+    def parse_property(self, token, parents, variant):
+        """
+        [list op] [custom] [variability] (rel | type) name [= value] [(metadata)]
+        """
+        if token in LIST_OPS:
+            token = self.ident()
+        if token == b'custom':
+            token = self.ident()
+        if token in VARIABILITY:
+            token = self.ident()
+        type_name = token
+        name = self.ident()
+        
+        is_asset = (type_name == b'asset' and b'.' not in name and self.walk_attributes
+                    and not self.arcs_only and variant is None)
+        
+        asset_path = None
+        kind, token = self.peek()
+        if kind == 'punct' and token == b'=':
+            self.next()
+            if is_asset:
+                kind, token = self.next()
+                if kind == 'asset':
+                    asset_path = asset_text(token)
+                elif kind != 'ident' or token != b'None':
+                    raise ScanError('Unexpected asset value {} at byte {}'.format(token, self.pos))
+            else:
+                self.skip_value()
+            kind, token = self.peek()
+        
+        colorspace = ''
+        if kind == 'punct' and token == b'(':
+            self.next()
+            if is_asset:
+                colorspace = self.parse_attribute_metadata()
+            else:
+                self.skip_group()
+        
+        if asset_path:
+            owner_type, owner_name = parents[-1]
+            parent_type, parent_name = parents[-2] if len(parents) > 1 else (None, None)
+            self.result.asset_attributes.append((asset_path, colorspace, owner_type, owner_name,
+                                                 parent_type, parent_name))
+    
+    
+    def parse_attribute_metadata(self):
+        """
+        :return: the attribute's colorSpace
+        """
+        colorspace = ''
+        while True:
+            kind, token = self.next()
+            if kind == 'punct' and token == b')':
+                return colorspace
+            if kind == 'punct' and token in SEPARATORS:
+                continue
+            if kind == 'string':
+                continue
+            if kind != 'ident':
+                raise ScanError('Unexpected {} at byte {}'.format(token, self.pos))
+            self.expect(b'=')
+            if token == b'colorSpace':
+                colorspace = self.parse_value()
+            else:
+                self.skip_value()
+
+
+def scan_layer(layer_path, walk_attributes=True, arcs_only=False):
+    """
+    Lex a usda file for its dependencies
+    :param layer_path: path of a .usda file on disk
+    :param walk_attributes: look for asset valued attributes
+    :param arcs_only: only look for sublayers / references / payloads
+    :return: UsdaScan
+    :raises ScanError: if the file can't be read, or the scanner isn't sure it understood it
+    """
+    try:
+        with open(layer_path, 'rb') as fp:
+            size = os.fstat(fp.fileno()).st_size
+            if not size:
+                raise ScanError('Empty file')
+            if size < MMAP_THRESHOLD:
+                data = fp.read()
+            else:
+                data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, IOError, ValueError) as e:
+        raise ScanError(str(e))
+    
+    try:
+        return UsdaScanner(data, walk_attributes=walk_attributes, arcs_only=arcs_only).scan()
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ScanError(str(e))
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
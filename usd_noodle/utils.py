@@ -48,3 +48,41 @@ def sanitize_path(in_path):
     #in_path = os.path.normpath(in_path)
     in_path = in_path.replace('\\', '/')
     return in_path
+
+
+def unique_list(items):
+    """
+    De-dupe a list, keeping the order things were first seen in
+    :param items:
+    :return:
+    """
+    seen = set()
+    ret = []
+    for item in items:
+        if item in seen:
+            continue
+        seen.add(item)
+        ret.append(item)
+    return ret
+
+
+def plain_value(value):
+    """
+    Turn a metadata value into plain python types, so it can be pickled or written out.
+    Anything we don't recognise (Vt arrays, Sdf types, etc) becomes its string representation
+    :param value:
+    :return:
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [plain_value(x) for x in value]
+    if isinstance(value, dict):
+        return dict((str(k), plain_value(v)) for k, v in value.items())
+    try:
+        # py2 unicode / long
+        if isinstance(value, (unicode, long)):
+            return value
+    except NameError:
+        pass
+    return str(value)
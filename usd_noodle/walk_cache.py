@@ -0,0 +1,144 @@
+from __future__ import print_function
+
+import os
+import os.path
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+
+
+# bump this whenever the shape of a harvest changes, so old cache entries get ignored
+CACHE_VERSION = 3
+
+
+def default_cache_dir():
+    """
+    $USD_NOODLE_CACHE if it's set, otherwise somewhere sensible in the user's home dir
+    """
+    env_dir = os.environ.get('USD_NOODLE_CACHE')
+    if env_dir:
+        return env_dir
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+    else:
+        base = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'usd-noodle', 'walk')
+
+
+class WalkCache(object):
+    """
+    On-disk cache of per-layer harvests.
+    There's one entry per layer path + walker options. Each entry remembers the mtime and size
+    of the layer it was harvested from, and is only handed back while those still match, so an
+    edited layer just gets harvested again and its entry overwritten.
+    """
+    
+    
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    
+    def entry_path(self, layer_path, options):
+        key = json.dumps([CACHE_VERSION, layer_path, options], sort_keys=True)
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + '.json')
+    
+    
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    
+    
+    def get(self, layer_path, options):
+        """
+        :param layer_path: resolved layer path
+        :param options: dict of walker options that change what gets harvested
+        :return: the cached harvest dict, or None if there isn't an up to date one
+        """
+        try:
+            stat = os.stat(layer_path)
+            with open(self.entry_path(layer_path, options), 'r') as fp:
+                entry = json.load(fp)
+        except (OSError, IOError, ValueError):
+            self._count(False)
+            return None
+        
+        if entry.get('mtime') != stat.st_mtime or entry.get('size') != stat.st_size:
+            self._count(False)
+            return None
+        
+        self._count(True)
+        harvest = entry['harvest']
+        
+        # json hands everything back as lists
+        harvest['nodes'] = [(path, info) for path, info in harvest['nodes']]
+        harvest['edges'] = [tuple(x) for x in harvest['edges']]
+        
+        return harvest
+    
+    
+    def put(self, layer_path, options, harvest):
+        """
+        Store a harvest. Harvests with errors aren't kept, as the error may well be transient
+        :param layer_path: resolved layer path
+        :param options: dict of walker options that change what gets harvested
+        :param harvest: harvest dict from the walker
+        """
+        if harvest.get('error'):
+            return
+        
+        try:
+            stat = os.stat(layer_path)
+        except OSError:
+            # not a file on disk (resolver uri or somesuch). nothing to key the entry on
+            return
+        
+        entry = {
+            'path': layer_path,
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'harvest': harvest,
+        }
+        
+        entry_path = self.entry_path(layer_path, options)
+        entry_dir = os.path.dirname(entry_path)
+        try:
+            if not os.path.isdir(entry_dir):
+                os.makedirs(entry_dir)
+        except OSError:
+            # someone else got there first
+            if not os.path.isdir(entry_dir):
+                return
+        
+        # write to a temp file and move it into place, so a reader never sees half an entry
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=entry_dir, suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(entry, fp)
+            if os.name == 'nt' and os.path.exists(entry_path):
+                os.remove(entry_path)
+            os.rename(temp_path, entry_path)
+        except (OSError, IOError, TypeError, ValueError):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    
+    
+    def clear(self):
+        """
+        Throw away every cache entry
+        """
+        if os.path.isdir(self.cache_dir):
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
@@ -0,0 +1,380 @@
+from __future__ import print_function
+
+import sys
+import json
+import struct
+from array import array
+
+from .dependency_graph import DependencyGraph
+from .records import NodeRecord
+from . import report
+
+
+# binary walk files start with this, then a version number
+BINARY_MAGIC = b'NOODLEW\x00'
+# 2: the final chunk refers to nodes by string id, and the nodes' final info comes in node chunks before it
+BINARY_VERSION = 1
+BINARY_EXTENSION = '.noodle'
+
+# binary chunks are a one byte tag and a uint32 length, then the payload
+CHUNK_HEADER = struct.Struct('<cI')
+CHUNK_ROOT = b'R'  # json: root path, options
+CHUNK_STRINGS = b'S'  # uint32 count, then uint32 length + utf-8 bytes for each. ids follow on from the last chunk
+CHUNK_NODES = b'N'  # json: [[path string id, info], ...]. later records for a node add to the earlier ones
+CHUNK_EDGES = b'E'  # uint32 (start, end, type) string id triples
+CHUNK_FINAL = b'F'  # json: errors and cycles (string ids) and stats, once the walk is done
+
+# how many edges to hold before writing a chunk
+EDGE_CHUNK_SIZE = 65536
+# how many nodes' final info to write in a chunk
+NODE_CHUNK_SIZE = 16384
+
+# node info that only gets filled in once the walk is done (file status, usage counts, cycles, the depth
+# limit), after the nodes have been written. it's all that gets written again at the end
+FINAL_KEYS = ('online', 'size', 'mtime', 'count', 'cycle', 'unexpanded', 'missingCount', 'missingFrames',
+              'tileCount', 'missingTiles')
+
+
+def uint32_array(values=()):
+    # 'I' is 32 bits pretty much everywhere, but it's only promised to be at least 16
+    typecode = 'I' if array('I').itemsize == 4 else 'L'
+    return array(typecode, values)
+
+
+def open_output(path, binary=False):
+    """
+    Open a report or walk file for writing. '-' is stdout
+    :return: (file, True if it's ours to close)
+    """
+    if path == '-':
+        if binary:
+            return getattr(sys.stdout, 'buffer', sys.stdout), False
+        return sys.stdout, False
+    return open(path, 'wb' if binary else 'w'), True
+
+
+def final_info(walker):
+    """
+    :return: iterator of (path, dict of the FINAL_KEYS the node has) for every node
+    """
+    for path, info in walker.nodes.items():
+        yield path, dict((key, info[key]) for key in FINAL_KEYS if key in info)
+
+
+class JsonlWalkWriter(object):
+    """
+    Streams a walk out as json lines while it's happening. Each node and edge is written as soon
+    as the walker finds it, so other tools can start on it straight away.
+    Records have a 'kind': root first, then node and edge records as they're found. A layer's node is
+    written again once the layer's been harvested, with what it says about itself. Once the walk is
+    done, every node gets another record with just the info that's filled in at the end (online state,
+    size, usage count... see FINAL_KEYS), followed by offline, error, cycle and stats records.
+    Readers should merge repeated node records.
+    """
+    
+    
+    def __init__(self, path):
+        """
+        :param path: file path, or '-' for stdout
+        """
+        self.path = path
+        self.fp = None
+        self._close = False
+    
+    
+    def _write(self, record):
+        self.fp.write(json.dumps(record, sort_keys=True, default=str))
+        self.fp.write('\n')
+    
+    
+    def begin(self, walker):
+        self.fp, self._close = open_output(self.path)
+        self._write({'kind': 'root', 'version': report.REPORT_VERSION, 'path': walker.usdfile,
+                     'options': walker.cache_options()})
+    
+    
+    def write(self, nodes, edges):
+        for path, info in nodes:
+            self._write({'kind': 'node', 'path': path, 'info': dict(info)})
+        for start, end, edge_type in edges:
+            self._write({'kind': 'edge', 'start': start, 'end': end, 'type': edge_type})
+    
+    
+    def finish(self, walker):
+        for path, info in final_info(walker):
+            self._write({'kind': 'node', 'path': path, 'info': info})
+        for path in report.offline_nodes(walker):
+            self._write({'kind': 'offline', 'path': path})
+        for path in walker.errored_nodes:
+            self._write({'kind': 'error', 'path': path})
+        for cycle in walker.cycles:
+            self._write({'kind': 'cycle', 'nodes': cycle})
+        self._write(dict(report.walk_stats(walker), kind='stats'))
+        if self._close:
+            self.fp.close()
+        else:
+            self.fp.flush()
+        self.fp = None
+
+
+class BinaryWalkWriter(object):
+    """
+    Streams a walk out in a compact binary format: every string (node paths, edge types) goes in
+    a string table once, and edges are written as arrays of integer ids into it. Node info is json,
+    keyed by string id. Once the walk is done, only the info that's filled in at the end gets written
+    again (see FINAL_KEYS), a chunk at a time.
+    Layout is the magic and version, then chunks - see the CHUNK_ constants.
+    """
+    
+    
+    def __init__(self, path):
+        """
+        :param path: file path, or '-' for stdout
+        """
+        self.path = path
+        self.fp = None
+        self._close = False
+        self._ids = {}
+        self._new_strings = []
+        self._edges = uint32_array()
+    
+    
+    def _chunk(self, tag, payload):
+        self.fp.write(CHUNK_HEADER.pack(tag, len(payload)))
+        self.fp.write(payload)
+    
+    
+    def _json_chunk(self, tag, data):
+        self._chunk(tag, json.dumps(data, sort_keys=True, default=str).encode('utf-8'))
+    
+    
+    def _string_id(self, text):
+        string_id = self._ids.get(text)
+        if string_id is None:
+            string_id = len(self._ids)
+            self._ids[text] = string_id
+            self._new_strings.append(text)
+        return string_id
+    
+    
+    def _flush_strings(self):
+        if not self._new_strings:
+            return
+        parts = [struct.pack('<I', len(self._new_strings))]
+        for text in self._new_strings:
+            data = text.encode('utf-8')
+            parts.append(struct.pack('<I', len(data)))
+            parts.append(data)
+        self._chunk(CHUNK_STRINGS, b''.join(parts))
+        self._new_strings = []
+    
+    
+    def _flush_edges(self):
+        if not self._edges:
+            return
+        self._flush_strings()
+        if sys.byteorder == 'big':
+            self._edges.byteswap()
+        self._chunk(CHUNK_EDGES, self._edges.tostring() if sys.version_info[0] < 3 else self._edges.tobytes())
+        self._edges = uint32_array()
+    
+    
+    def begin(self, walker):
+        self.fp, self._close = open_output(self.path, binary=True)
+        self._ids = {}
+        self._new_strings = []
+        self._edges = uint32_array()
+        self.fp.write(BINARY_MAGIC)
+        self.fp.write(struct.pack('<I', BINARY_VERSION))
+        self._json_chunk(CHUNK_ROOT, {'path': walker.usdfile, 'options': walker.cache_options()})
+    
+    
+    def write(self, nodes, edges):
+        if nodes:
+            records = [[self._string_id(path), dict(info)] for path, info in nodes]
+            # edges that are already waiting came before these nodes, so they go first
+            self._flush_edges()
+            self._flush_strings()
+            self._json_chunk(CHUNK_NODES, records)
+        for start, end, edge_type in edges:
+            self._edges.extend([self._string_id(start), self._string_id(end), self._string_id(edge_type)])
+        if len(self._edges) >= EDGE_CHUNK_SIZE * 3:
+            self._flush_edges()
+    
+    
+    def finish(self, walker):
+        self._flush_edges()
+        records = []
+        for path, info in final_info(walker):
+            records.append([self._string_id(path), info])
+            if len(records) >= NODE_CHUNK_SIZE:
+                self._flush_strings()
+                self._json_chunk(CHUNK_NODES, records)
+                records = []
+        if records:
+            self._flush_strings()
+            self._json_chunk(CHUNK_NODES, records)
+        final = {
+            'errors': [self._string_id(x) for x in walker.errored_nodes],
+            'cycles': [[self._string_id(x) for x in cycle] for cycle in walker.cycles],
+            'stats': report.walk_stats(walker),
+        }
+        self._flush_strings()
+        self._json_chunk(CHUNK_FINAL, final)
+        if self._close:
+            self.fp.close()
+        else:
+            self.fp.flush()
+        self.fp = None
+
+
+class SavedWalk(object):
+    """
+    A walk read back from disk. Has the same nodes / graph / errored_nodes as the DependencyWalker
+    that made it, so it can be shown without walking again
+    """
+    
+    
+    def __init__(self, path):
+        self.path = path
+        self.usdfile = None
+        self.options = {}
+        self.nodes = {}
+        self.graph = DependencyGraph()
+        self.errored_nodes = []
+        self.cycles = []
+        self.stats = {}
+    
+    
+    def add_node(self, path, info):
+        # later records for the same node bring it up to date
+        if path in self.nodes:
+            self.nodes[path].update(info)
+        else:
+            self.nodes[path] = NodeRecord(self.graph.strings.intern(path), info)
+    
+    
+    def finish(self):
+        for node_path, info in self.nodes.items():
+            info.setdefault('count', self.graph.usage_count(node_path))
+
+
+def is_binary_walk(path):
+    try:
+        with open(path, 'rb') as fp:
+            return fp.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+    except (OSError, IOError):
+        return False
+
+
+def is_saved_walk(path):
+    """
+    :return: True if the path looks like something read_walk can read
+    """
+    return path.endswith(('.json', '.jsonl', BINARY_EXTENSION)) or is_binary_walk(path)
+
+
+def read_walk(path):
+    """
+    Read a saved walk - binary, json lines, or a --json report
+    :return: SavedWalk
+    """
+    if is_binary_walk(path):
+        return read_binary(path)
+    if path.endswith('.json'):
+        return read_json(path)
+    return read_jsonl(path)
+
+
+def read_json(path):
+    walk = SavedWalk(path)
+    with open(path, 'r') as fp:
+        data = json.load(fp)
+    walk.usdfile = data.get('root')
+    walk.options = data.get('options', {})
+    for node_path, info in data.get('nodes', {}).items():
+        walk.add_node(node_path, info)
+    for start, end, edge_type in data.get('edges', []):
+        walk.graph.add_edge(start, end, edge_type)
+    walk.errored_nodes = data.get('errors', [])
+    walk.cycles = data.get('cycles', [])
+    walk.stats = data.get('stats', {})
+    walk.finish()
+    return walk
+
+
+def read_jsonl(path):
+    walk = SavedWalk(path)
+    with open(path, 'r') as fp:
+        for line in fp:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            kind = record.get('kind')
+            if kind == 'node':
+                walk.add_node(record['path'], record['info'])
+            elif kind == 'edge':
+                walk.graph.add_edge(record['start'], record['end'], record['type'])
+            elif kind == 'root':
+                walk.usdfile = record.get('path')
+                walk.options = record.get('options', {})
+            elif kind == 'error':
+                walk.errored_nodes.append(record['path'])
+            elif kind == 'cycle':
+                walk.cycles.append(record['nodes'])
+            elif kind == 'stats':
+                walk.stats = dict((key, value) for key, value in record.items() if key != 'kind')
+    walk.finish()
+    return walk
+
+
+def read_binary(path):
+    walk = SavedWalk(path)
+    strings = []
+    with open(path, 'rb') as fp:
+        fp.read(len(BINARY_MAGIC))
+        version = struct.unpack('<I', fp.read(4))[0]
+        if version > BINARY_VERSION:
+            raise ValueError('{} was written by a newer version of noodle (v{})'.format(path, version))
+        
+        while True:
+            header = fp.read(CHUNK_HEADER.size)
+            if len(header) < CHUNK_HEADER.size:
+                break
+            tag, length = CHUNK_HEADER.unpack(header)
+            payload = fp.read(length)
+            
+            if tag == CHUNK_STRINGS:
+                count = struct.unpack_from('<I', payload, 0)[0]
+                offset = 4
+                for i in range(count):
+                    size = struct.unpack_from('<I', payload, offset)[0]
+                    offset += 4
+                    strings.append(payload[offset:offset + size].decode('utf-8'))
+                    offset += size
+            elif tag == CHUNK_EDGES:
+                ids = uint32_array()
+                if sys.version_info[0] < 3:
+                    ids.fromstring(payload)
+                else:
+                    ids.frombytes(payload)
+                if sys.byteorder == 'big':
+                    ids.byteswap()
+                for i in range(0, len(ids), 3):
+                    walk.graph.add_edge(strings[ids[i]], strings[ids[i + 1]], strings[ids[i + 2]])
+            elif tag == CHUNK_NODES:
+                for string_id, info in json.loads(payload.decode('utf-8')):
+                    walk.add_node(strings[string_id], info)
+            elif tag == CHUNK_ROOT:
+                root = json.loads(payload.decode('utf-8'))
+                walk.usdfile = root.get('path')
+                walk.options = root.get('options', {})
+            elif tag == CHUNK_FINAL:
+                final = json.loads(payload.decode('utf-8'))
+                walk.stats = final.get('stats', {})
+                walk.errored_nodes = [strings[x] for x in final.get('errors', [])]
+                walk.cycles = [[strings[x] for x in cycle] for cycle in final.get('cycles', [])]
+            # anything else is from a newer version. skip it
+    
+    walk.finish()
+    return walk
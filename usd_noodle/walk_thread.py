@@ -0,0 +1,82 @@
+from __future__ import print_function
+
+import time
+import traceback
+
+from Qt import QtCore
+
+from .walker import logger
+
+
+# seconds between batches of nodes sent to the gui. the first batch (the root) goes straight away
+BATCH_INTERVAL = 0.25
+
+
+class WalkThread(QtCore.QThread):
+    """
+    Runs a DependencyWalker on a worker thread, and streams what it finds back to the gui
+    in batches, along with how far it's got. The gui thread only ever gets plain lists.
+    In refresh mode it runs DependencyWalker.refresh instead, and only sends progress - the gui
+    patches the scene with the difference once it's finished.
+    """
+    # list of (path, info) nodes, list of (start, end, type) edges
+    batch_ready = QtCore.Signal(object, object)
+    # dict from DependencyWalker.progress
+    progress = QtCore.Signal(object)
+    # error message
+    walk_failed = QtCore.Signal(object)
+    
+    
+    def __init__(self, walker, refresh=False, parent=None):
+        super(WalkThread, self).__init__(parent)
+        self.walker = walker
+        self.refresh = refresh
+        # the layers a refresh found had changed. None until it's done, and if it failed
+        self.changed = None
+        self._nodes = []
+        self._edges = []
+        self._last_sent = None
+    
+    
+    def run(self):
+        self._nodes = []
+        self._edges = []
+        self._last_sent = None
+        self.changed = None
+        self.walker.progress_callback = self.collect
+        try:
+            if self.refresh:
+                self.changed = self.walker.refresh()
+            else:
+                self.walker.start()
+        except Exception as e:
+            logger.error(traceback.format_exc())
+            self.walk_failed.emit(str(e))
+        finally:
+            self.walker.progress_callback = None
+            self.send()
+    
+    
+    def cancel(self):
+        self.walker.cancel()
+    
+    
+    def collect(self, nodes, edges):
+        """
+        Walker progress callback. Runs on the walking thread
+        """
+        if not self.refresh:
+            self._nodes.extend(nodes)
+            self._edges.extend(edges)
+        if self._last_sent is None or time.time() - self._last_sent > BATCH_INTERVAL:
+            self.send()
+    
+    
+    def send(self):
+        nodes, edges = self._nodes, self._edges
+        self._nodes = []
+        self._edges = []
+        self._last_sent = time.time()
+        if nodes or edges:
+            self.batch_ready.emit(nodes, edges)
+        self.progress.emit(self.walker.progress())
@@ -0,0 +1,1142 @@
+from __future__ import print_function
+import logging
+import os.path
+import re
+import time
+
+try:
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+except ImportError:
+    # python 2 without the futures backport. walk single threaded
+    ThreadPoolExecutor = None
+    ProcessPoolExecutor = None
+
+from pxr import Sdf, Tf
+
+from . import utils
+from .dependency_graph import DependencyGraph
+from .records import NodeRecord
+from .walk_cache import WalkCache
+from .resolution import AssetResolver
+from .file_status import FileStatusChecker
+from . import usda_scan
+from . import clips
+from . import textures
+from .memory import MemoryMonitor, LayerRetainer, format_size, peak_rss
+
+
+digitSearch = re.compile(r'\b\d+\b')
+
+logger = logging.getLogger('usd-noodle')
+logger.setLevel(logging.INFO)
+if not len(logger.handlers):
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.DEBUG)
+    logger.addHandler(ch)
+logger.propagate = False
+
+# states for the walker's visited layer registry
+WALK_IN_PROGRESS = 'in_progress'
+WALK_DONE = 'done'
+
+# default number of layers to open at once when walking
+DEFAULT_WALK_WORKERS = 4
+
+# how the walker spreads layer harvesting across workers
+ENGINE_THREAD = 'thread'
+ENGINE_PROCESS = 'process'
+WALK_ENGINES = [ENGINE_THREAD, ENGINE_PROCESS]
+
+# under a memory ceiling, the frontier is harvested in batches of this many layers per worker,
+# with a look at the resident size in between
+MEMORY_CHECK_BATCH = 4
+
+# shards handed to each worker process per frontier. more than one so that
+# a shard full of heavy layers doesn't leave the other workers sitting idle
+SHARDS_PER_PROCESS = 4
+
+# what gets harvested from each layer
+# full: arcs, variants, clips, root prim info and (optionally) asset attributes
+# arcs: just the sublayers / references / payloads, as cheaply as we can get them
+SCAN_FULL = 'full'
+SCAN_ARCS = 'arcs'
+SCAN_MODES = [SCAN_FULL, SCAN_ARCS]
+
+# the walker that does the harvesting inside a worker process. made on first use
+_shard_walker = None
+
+
+def harvest_shard(layer_paths, options):
+    """
+    Process pool entry point - harvest a shard of layers inside a worker process.
+    Each worker keeps its own walker (and so its own resolver) for the life of the pool.
+    :param layer_paths: resolved layer paths
+    :param options: dict from DependencyWalker.shard_options
+    :return: list of harvest dicts, in the same order as layer_paths
+    """
+    global _shard_walker
+    if _shard_walker is None:
+        _shard_walker = DependencyWalker(None, workers=1)
+    _shard_walker.walk_attributes = options['walk_attributes']
+    _shard_walker.scan_mode = options['scan_mode']
+    _shard_walker.lexical_scan = options['lexical_scan']
+    cache_dir = options['cache_dir']
+    if cache_dir is None:
+        _shard_walker.cache = None
+    elif _shard_walker.cache is None or _shard_walker.cache.cache_dir != cache_dir:
+        _shard_walker.cache = WalkCache(cache_dir)
+    if _shard_walker.asset_resolver.batch_resolve is not options['batch_resolve']:
+        _shard_walker.asset_resolver.batch_resolve = options['batch_resolve']
+        _shard_walker.asset_resolver.clear()
+    if options['root_path']:
+        _shard_walker.asset_resolver.bind_root(options['root_path'])
+    return [_shard_walker.harvest_layer(x) for x in layer_paths]
+
+
+class DependencyWalker(object):
+    def __init__(self, usdfile, workers=DEFAULT_WALK_WORKERS, engine=ENGINE_THREAD, cache=None, keep_layers=0,
+                 memory_limit=None, batch_resolve=None):
+        """
+        :param batch_resolve: resolves a whole list of anchored asset paths in one go, see AssetResolver.
+                              has to be picklable (ie, a module level function) for the process engine
+        """
+        self.usdfile = usdfile
+        self.walk_attributes = True
+        # SCAN_FULL or SCAN_ARCS
+        self.scan_mode = SCAN_FULL
+        # lex .usda files for their dependencies rather than opening them with Sdf
+        self.lexical_scan = False
+        # how many levels of layers to walk, the root being level 1. None walks to the leaves.
+        # layers past the limit get a node marked 'unexpanded', which expand() can walk later
+        self.max_depth = None
+        # (layer path, depth) of the layers expand() has walked. refresh() expands them again
+        self.expanded = []
+        # number of layers to open and harvest at the same time
+        self.workers = workers
+        # ENGINE_THREAD or ENGINE_PROCESS
+        if engine not in WALK_ENGINES:
+            raise ValueError('Unknown walk engine: {}'.format(engine))
+        self.engine = engine
+        # WalkCache of per-layer harvests, or None to always read the layers
+        self.cache = cache
+        # layers are let go as soon as they've been harvested. this keeps the last few open for inspection
+        self.layers = LayerRetainer(keep_layers)
+        # peak resident size of each walk, and the ceiling (bytes) we try to stay under
+        self.memory = MemoryMonitor(memory_limit)
+        # set when we've gone over the ceiling - the rest of the walk harvests one layer at a time
+        self._throttled = False
+        
+        # called from the walking thread as each layer is merged, with the (path, info) nodes it added
+        # or brought up to date, and the (start, end, type) edges it added. lets a gui show the graph as it's found
+        self.progress_callback = None
+        # streamed everything start() finds, as it finds it. see walk_io.JsonlWalkWriter / BinaryWalkWriter
+        self.writers = []
+        # the writers the current start() has begun. expand() happens after they're finished, so isn't streamed
+        self._writing = []
+        # set by cancel(). the walk stops at the next layer, and leaves the rest unexpanded
+        self._cancelled = False
+        self.start_time = None
+        # layers found but not harvested yet
+        self.queue_depth = 0
+        
+        if self.usdfile:
+            logger.info('DependencyWalker'.center(40, '-'))
+            logger.info('Loading usd file: {}'.format(self.usdfile))
+        self.nodes = {}
+        self.graph = DependencyGraph()
+        
+        # anchors, resolves and remembers asset paths. shared by all the walker threads
+        self.asset_resolver = AssetResolver(batch_resolve=batch_resolve)
+        # batched, remembered file stats. file nodes get their online state / size / mtime
+        # from this in one go at the end of the walk, rather than stat'ing as they're found
+        self.file_status = FileStatusChecker()
+        
+        # resolved layer path -> WALK_IN_PROGRESS / WALK_DONE
+        self.visited_nodes = {}
+        
+        self.errored_nodes = []
+        # dependency loops the last walk found - lists of node paths, see find_cycles
+        self.cycles = []
+        
+        # what each walked layer gave us, and the (mtime, size) it had at the time.
+        # lets refresh() work out what's changed since the last walk
+        self.harvests = {}
+        self.layer_stats = {}
+        # harvests refresh() has decided are still good, by layer path
+        self._reusable = {}
+    
+    
+    def start(self):
+        self.visited_nodes = {}
+        self.nodes = {}
+        self.graph = DependencyGraph()
+        self.errored_nodes = []
+        self.cycles = []
+        self.harvests = {}
+        self.layer_stats = {}
+        self.file_status.clear()
+        self.memory.start()
+        self._throttled = False
+        self.start_time = time.time()
+        self.queue_depth = 0
+        
+        layer = Sdf.Layer.FindOrOpen(self.usdfile)
+        if not layer:
+            return
+        
+        # resolve everything in the context a stage opened on the root layer would get
+        self.asset_resolver.bind_root(self.usdfile)
+        
+        # scrub the initial file path
+        # to get around upper/lowercase drive letters
+        # and junk like that
+        layer_path = Sdf.ComputeAssetPathRelativeToLayer(layer, os.path.basename(self.usdfile))
+        
+        self.usdfile = layer_path
+        
+        # everything else we need from it comes out of its harvest. let go of our handle,
+        # so the layer isn't held open for the whole walk unless it's one we're keeping
+        self.layers.keep(layer_path, layer)
+        layer = None
+        
+        for writer in self.writers:
+            writer.begin(self)
+        self._writing = list(self.writers)
+        try:
+            self.walk_root(layer_path)
+        finally:
+            writers, self._writing = self._writing, []
+            for writer in writers:
+                writer.finish(self)
+    
+    
+    def walk_root(self, layer_path):
+        info = self.add_node(layer_path, {'path': layer_path, 'type': 'sublayer'})
+        self.found([(layer_path, info)], [])
+        
+        self.walkStageLayers(layer_path, max_level=self.max_depth)
+        for expanded_path, depth in self.expanded:
+            if self.nodes.get(expanded_path, {}).get('unexpanded'):
+                self.walkStageLayers(expanded_path, max_level=depth)
+        
+        # one batched pass over the filesystem for everything we found
+        self.file_status.apply(self.nodes)
+        self.layer_stats = self.file_status.check(list(self.harvests))
+        logger.info('file status: {} files checked, {} directories listed'.format(
+            self.file_status.stat_count, self.file_status.directories.list_count))
+        
+        if self.engine != ENGINE_PROCESS:
+            if self.cache:
+                logger.info('walk cache: {} hits, {} misses'.format(self.cache.hits, self.cache.misses))
+            logger.info('resolver cache: {} hits, {} misses'.format(self.asset_resolver.hits,
+                                                                    self.asset_resolver.misses))
+        
+        self.memory.sample()
+        logger.info('memory: peak resident {} this walk, {} at the start, process peak {}'.format(
+            format_size(self.memory.peak), format_size(self.memory.start_rss), format_size(peak_rss())))
+        
+        self.find_cycles()
+        
+        # usage counts are kept up to date by the graph as edges go in
+        for node_path, info in self.nodes.items():
+            info['count'] = self.graph.usage_count(node_path)
+    
+    
+    def changed_layers(self):
+        """
+        :return: the layers from the last walk that have changed on disk since (including
+                 ones that have appeared or gone away)
+        """
+        checker = FileStatusChecker()
+        current = checker.check(list(self.layer_stats))
+        return [path for path, stat in self.layer_stats.items() if current[path] != stat]
+    
+    
+    def refresh(self):
+        """
+        Walk again, only re-reading the layers that have changed on disk since the last walk.
+        Changed layers are reloaded in the Sdf registry first, so we don't get handed back
+        the stale copy that FindOrOpen would give us.
+        :return: list of the layers that changed. nothing gets re-walked if it's empty
+        """
+        changed = self.changed_layers()
+        if not changed:
+            return changed
+        
+        for layer_path in changed:
+            layer = Sdf.Layer.Find(layer_path)
+            if layer:
+                try:
+                    layer.Reload()
+                except Tf.ErrorException:
+                    # we'll pick up the error when it gets harvested again
+                    pass
+        
+        self._cancelled = False
+        changed_set = set(changed)
+        self._reusable = dict((path, harvest) for path, harvest in self.harvests.items()
+                              if path not in changed_set)
+        try:
+            self.start()
+        finally:
+            self._reusable = {}
+        
+        return changed
+    
+    
+    def expand(self, layer_path, depth=1):
+        """
+        Walk a layer the depth limit left unexpanded, and add what it uses to the nodes and graph
+        :param layer_path: an unexpanded layer's node path
+        :param depth: how many levels to walk, starting with the layer itself. None walks to the leaves
+        :return: (list of the new node paths, list of the new (start, end, type) edges)
+        """
+        if not self.nodes.get(layer_path, {}).get('unexpanded'):
+            return [], []
+        
+        old_nodes = set(self.nodes)
+        edge_count = len(self.graph)
+        self.expanded.append((layer_path, depth))
+        self._cancelled = False
+        
+        self.walkStageLayers(layer_path, max_level=depth)
+        
+        new_nodes = [x for x in self.nodes if x not in old_nodes]
+        new_edges = self.graph.edges(edge_count)
+        
+        self.file_status.apply(dict((x, self.nodes[x]) for x in [layer_path] + new_nodes))
+        self.layer_stats.update(self.file_status.check([x for x in self.harvests if x not in self.layer_stats]))
+        for start, end, edge_type in new_edges:
+            if end in self.nodes:
+                self.nodes[end]['count'] = self.graph.usage_count(end)
+        for node_path in new_nodes:
+            self.nodes[node_path]['count'] = self.graph.usage_count(node_path)
+        if new_edges:
+            self.find_cycles()
+        
+        return new_nodes, new_edges
+    
+    
+    def find_cycles(self):
+        """
+        Look for dependency loops - layers that end up using themselves, usually from a broken publish.
+        The walk itself copes with them (nothing gets walked twice), so this just reports them:
+        each one goes in self.cycles, and the nodes in it get a 'cycle' number indexing that
+        """
+        for info in self.nodes.values():
+            info.pop('cycle', None)
+        self.cycles = self.graph.strongly_connected()
+        for i, component in enumerate(self.cycles):
+            for node_path in component:
+                if node_path in self.nodes:
+                    self.nodes[node_path]['cycle'] = i
+            logger.warning('dependency cycle: {}'.format(' -> '.join(component + component[:1])))
+    
+    
+    def cancel(self):
+        """
+        Stop the walk (from another thread). Layers that haven't been harvested yet are left unexpanded
+        """
+        self._cancelled = True
+    
+    
+    @property
+    def cancelled(self):
+        return self._cancelled
+    
+    
+    def progress(self):
+        """
+        :return: dict of layers harvested, layers queued and seconds elapsed so far
+        """
+        return {
+            'layers': len(self.harvests),
+            'queued': self.queue_depth,
+            'elapsed': time.time() - self.start_time if self.start_time else 0.0,
+        }
+    
+    
+    @property
+    def edges(self):
+        """
+        :return: list of (start, end, type) edges, in the order they were found
+        """
+        return self.graph.edges()
+    
+    
+    def collect_specs(self, layer):
+        """
+        One pass over every spec path in the layer, keeping only the paths that could give us something.
+        Nothing but the paths themselves gets looked at here - the specs are only fetched for the
+        paths that make it through.
+        :return: (prim paths, variant set paths, paths of the prims inside variants, attribute paths).
+                 Attribute paths only if we're walking attributes
+        """
+        prims = []
+        variant_sets = []
+        variant_prims = []
+        attributes = []
+        walk_attributes = self.walk_attributes
+        
+        def visit(path):
+            if path.IsPrimPropertyPath():
+                # attributes (and relationships) on prims outside of variants
+                if walk_attributes and not path.ContainsPrimVariantSelection():
+                    attributes.append(path)
+                return
+            if not path.ContainsPrimVariantSelection():
+                if path.IsPrimPath():
+                    prims.append(path)
+                return
+            selections = [x for x in path.GetPrefixes() if x.IsPrimVariantSelectionPath()]
+            if len(selections) != 1:
+                # variants inside variants. not something we go looking in
+                return
+            if path.IsPrimVariantSelectionPath() and not path.GetVariantSelection()[1]:
+                # /prim{set=} is the variant set itself
+                variant_sets.append(path)
+            elif path.IsPrimPath() or path.IsPrimVariantSelectionPath():
+                variant_prims.append(path)
+        
+        layer.Traverse(Sdf.Path.absoluteRootPath, visit)
+        return prims, variant_sets, variant_prims, attributes
+    
+    
+    def flatten_ref_list(self, ref_or_payload):
+        ret = []
+        for itemlist in [ref_or_payload.appendedItems, ref_or_payload.explicitItems, ref_or_payload.addedItems,
+                         ref_or_payload.prependedItems, ref_or_payload.orderedItems]:
+            for payload in itemlist:
+                ret.append(payload)
+        return list(set(ret))
+    
+    
+    def add_node(self, path, info):
+        """
+        Register a node record. A layer reached through several arcs keeps the first
+        record it was given, so anything already harvested from it isn't thrown away.
+        :param path: node key
+        :param info: node info dict, or a NodeRecord from an earlier walk's harvest
+        :return: the registered NodeRecord
+        """
+        if path in self.nodes:
+            return self.nodes[path]
+        node_id = self.graph.strings.intern(path)
+        if isinstance(info, NodeRecord):
+            # reused harvests keep their records, but the ids were from the last walk's graph
+            info.id = node_id
+        else:
+            info = NodeRecord(node_id, info)
+        self.nodes[path] = info
+        return info
+    
+    
+    def resolve(self, layer, path):
+        """
+        Resolve an asset path authored in the given layer. Relative paths are anchored to the layer.
+        Unresolvable paths come back as-is (anchored), as we still want the path regardless
+        """
+        return self.asset_resolver.resolve(layer, path)
+    
+    
+    def walkStageLayers(self, layer_path, level=1, max_level=None):
+        """
+        Breadth first walk of everything the layer depends on.
+        Each frontier of layers is opened and harvested on the thread pool (or in
+        shards on a process pool), then the results are merged back in frontier order,
+        so the nodes and edges come out the same no matter which worker finishes first.
+        :param layer_path: resolved path of the layer to start from
+        :param level: depth of the starting layer
+        :param max_level: deepest level to harvest. layers past it are marked unexpanded. None for no limit
+        """
+        pool = None
+        if self.workers > 1 and ThreadPoolExecutor is not None:
+            if self.engine == ENGINE_PROCESS:
+                pool = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                pool = ThreadPoolExecutor(max_workers=self.workers)
+        
+        try:
+            self._walk_frontier([layer_path], level, pool, max_level)
+        finally:
+            if pool:
+                if self._cancelled:
+                    try:
+                        # python 3.9+. don't sit waiting for layers nobody wants any more
+                        pool.shutdown(cancel_futures=True)
+                    except TypeError:
+                        pool.shutdown()
+                else:
+                    pool.shutdown()
+    
+    
+    def _walk_frontier(self, frontier, level, pool, max_level=None):
+        while frontier:
+            id = '-' * (level)
+            
+            if self._cancelled or (max_level is not None and level > max_level):
+                # leave the rest for expand()
+                for path in frontier:
+                    if path not in self.visited_nodes and path in self.nodes:
+                        self.nodes[path]['unexpanded'] = True
+                break
+            
+            # each layer only gets harvested once per walk, no matter how many arcs point at it.
+            # the edges from every visitor have already been recorded by the time we get here
+            to_harvest = []
+            for path in utils.unique_list(frontier):
+                if path in self.visited_nodes:
+                    continue
+                self.visited_nodes[path] = WALK_IN_PROGRESS
+                to_harvest.append(path)
+            
+            if to_harvest:
+                logger.debug((id, 'harvesting {} layers'.format(len(to_harvest))))
+            
+            if self.memory.limit is None:
+                batches = [to_harvest]
+            else:
+                batch_size = max(1, self.workers) * MEMORY_CHECK_BATCH
+                batches = [to_harvest[i:i + batch_size] for i in range(0, len(to_harvest), batch_size)]
+            
+            frontier = []
+            merged = 0
+            for batch in batches:
+                for harvest in self._harvest_batch(batch, pool):
+                    frontier.extend(self.merge_harvest(harvest))
+                    self.memory.sample()
+                    merged += 1
+                    self.queue_depth = len(to_harvest) - merged + len(frontier)
+                    if self._cancelled:
+                        break
+                if self._cancelled:
+                    break
+                self.check_memory()
+            
+            if self._cancelled:
+                # anything we didn't get to goes back to being unwalked, so it can be expanded later
+                for path in to_harvest:
+                    if self.visited_nodes.get(path) == WALK_IN_PROGRESS:
+                        del self.visited_nodes[path]
+                frontier.extend(to_harvest)
+            level += 1
+    
+    
+    def _harvest_batch(self, layer_paths, pool):
+        """
+        :return: the harvests of the layers, in the same order as layer_paths
+        """
+        if pool is None or self._throttled or len(layer_paths) <= 1:
+            return [self.harvest_layer(x) for x in layer_paths]
+        if self.engine == ENGINE_PROCESS:
+            return self._harvest_shards(pool, layer_paths)
+        # pool.map hands the results back in submission order
+        return pool.map(self.harvest_layer, layer_paths)
+    
+    
+    def check_memory(self):
+        """
+        Keep track of the peak resident size, and if we've gone over the ceiling, drop the layers
+        we're keeping and stop opening more than one layer at a time
+        """
+        if not self.memory.over_limit():
+            return
+        if len(self.layers):
+            logger.warning('memory: over the {} ceiling, letting go of {} kept layers'.format(
+                format_size(self.memory.limit), len(self.layers)))
+            self.layers.clear()
+        if not self._throttled:
+            self._throttled = True
+            logger.warning('memory: over the {} ceiling, harvesting one layer at a time'.format(
+                format_size(self.memory.limit)))
+    
+    
+    def _harvest_shards(self, pool, layer_paths):
+        """
+        Split the layers into shards and harvest them in the worker processes.
+        Yields the harvests back in the order of layer_paths, as the shards finish.
+        """
+        # the harvests refresh() is reusing only live in this process, so the workers just get the rest
+        to_read = [x for x in layer_paths if x not in self._reusable]
+        shard_count = self.workers * SHARDS_PER_PROCESS
+        shard_size = max(1, -(-len(to_read) // shard_count))
+        options = self.shard_options()
+        futures = []
+        for i in range(0, len(to_read), shard_size):
+            futures.append(pool.submit(harvest_shard, to_read[i:i + shard_size], options))
+        
+        read = (harvest for future in futures for harvest in future.result())
+        for layer_path in layer_paths:
+            if layer_path in self._reusable:
+                yield self._reusable[layer_path]
+            else:
+                yield next(read)
+    
+    
+    def merge_harvest(self, harvest):
+        """
+        Fold a single layer's harvest into the walker's nodes and graph.
+        Only ever called from the thread that's running the walk.
+        :param harvest: dict from harvest_layer
+        :return: list of layer paths to walk next
+        """
+        layer_path = harvest['path']
+        # the layer's own node was found before it was harvested. it gets handed on again if this changes it
+        updated = False
+        
+        if harvest['error']:
+            self.nodes.pop(layer_path, None)
+            self.add_node(layer_path, {'online': True, 'error': True, 'path': layer_path})
+            self.errored_nodes.append(layer_path)
+            logger.info('usd file: {} had load errors'.format(layer_path))
+            updated = True
+        
+        elif harvest['layer_info'] and layer_path in self.nodes:
+            self.nodes[layer_path].update(harvest['layer_info'])
+            updated = True
+        
+        new_nodes = []
+        if layer_path in self.nodes:
+            if self.nodes[layer_path].pop('unexpanded', None) is not None:
+                updated = True
+            if updated:
+                new_nodes.append((layer_path, self.nodes[layer_path]))
+        
+        records = []
+        for path, info in harvest['nodes']:
+            is_new = path not in self.nodes
+            info = self.add_node(path, info)
+            if is_new:
+                new_nodes.append((path, info))
+            records.append((path, info))
+        # the harvest holds on to the records from here, so refresh() shares them the same way
+        # the nodes did before. it's already been cached by now
+        harvest['nodes'] = records
+        
+        new_edges = []
+        for start, end, edge_type in harvest['edges']:
+            if self.graph.add_edge(start, end, edge_type):
+                new_edges.append((start, end, edge_type))
+        
+        self.harvests[layer_path] = harvest
+        self.visited_nodes[layer_path] = WALK_DONE
+        
+        self.found(new_nodes, new_edges)
+        
+        return harvest['sublayers'] + harvest['references'] + harvest['payloads']
+    
+    
+    def found(self, new_nodes, new_edges):
+        """
+        Hand what's just been merged to the progress callback and any writers
+        :param new_nodes: list of (path, info) of the new nodes, and of ones whose info the merge has changed
+        :param new_edges: list of (start, end, type)
+        """
+        if self.progress_callback is not None:
+            self.progress_callback(new_nodes, new_edges)
+        for writer in self._writing:
+            writer.write(new_nodes, new_edges)
+    
+    
+    def cache_options(self):
+        """
+        The walker settings that change what a harvest contains. Part of the walk cache key
+        """
+        return {'walk_attributes': self.walk_attributes, 'scan_mode': self.scan_mode,
+                'lexical_scan': self.lexical_scan}
+    
+    
+    def shard_options(self):
+        """
+        Everything a worker process's walker needs to harvest the same way we would
+        """
+        return {
+            'walk_attributes': self.walk_attributes,
+            'scan_mode': self.scan_mode,
+            'lexical_scan': self.lexical_scan,
+            'cache_dir': self.cache.cache_dir if self.cache else None,
+            'root_path': self.usdfile,
+            'batch_resolve': self.asset_resolver.batch_resolve,
+        }
+    
+    
+    def harvest_layer(self, layer_path):
+        """
+        Harvest a layer, from the walk cache if there's an up to date entry for it.
+        Safe to call from worker threads.
+        :param layer_path: resolved layer path
+        :return: dict of plain data
+        """
+        if layer_path in self._reusable:
+            return self._reusable[layer_path]
+        
+        if self.cache is None:
+            return self.read_layer(layer_path)
+        
+        options = self.cache_options()
+        # the harvest holds resolved paths, so a layer walked under a different resolver context
+        # gets an entry of its own
+        options['resolver_context'] = self.asset_resolver.context_key
+        harvest = self.cache.get(layer_path, options)
+        if harvest is None:
+            harvest = self.read_layer(layer_path)
+            self.cache.put(layer_path, options, harvest)
+        return harvest
+    
+    
+    def new_harvest(self, layer_path):
+        return {
+            'path': layer_path,
+            'error': False,
+            'layer_info': {},
+            'nodes': [],
+            'edges': [],
+            'sublayers': [],
+            'references': [],
+            'payloads': [],
+        }
+    
+    
+    def read_layer_arcs(self, layer_path):
+        """
+        Fast version of read_layer for SCAN_ARCS. Only the composition arcs, pulled out with
+        UsdUtils.ExtractExternalReferences so the prim specs get walked in C++ rather than python.
+        No textures, materials, clips, variants or root prim info - the layers these arcs come
+        from (variants included) are connected straight to the layer.
+        :param layer_path: resolved layer path
+        :return: dict of plain data, same as read_layer
+        """
+        # UsdUtils drags in all of Usd, so only load it when it's wanted
+        from pxr import UsdUtils
+        
+        harvest = self.new_harvest(layer_path)
+        
+        try:
+            layer = Sdf.Layer.FindOrOpen(layer_path)
+            if not layer:
+                return harvest
+            sublayers, references, payloads = UsdUtils.ExtractExternalReferences(layer_path)
+        except Tf.ErrorException:
+            harvest['error'] = True
+            return harvest
+        self.layers.keep(layer_path, layer)
+        
+        # the references list also picks up asset attributes and clip files, which aren't arcs
+        if hasattr(layer, 'GetCompositionAssetDependencies'):
+            arc_paths = set(layer.GetCompositionAssetDependencies())
+            references = [x for x in references if x in arc_paths]
+        else:
+            # older usd. best we can do is drop anything that isn't a layer
+            references = [x for x in references
+                          if Sdf.FileFormat.FindByExtension(os.path.splitext(x)[1].lstrip('.'))]
+        
+        for arc_type, key, arc_paths in [('sublayer', 'sublayers', sublayers),
+                                         ('reference', 'references', references),
+                                         ('payload', 'payloads', payloads)]:
+            resolved = []
+            for pathToResolve in arc_paths:
+                if not pathToResolve:
+                    continue
+                refpath = self.resolve(layer, pathToResolve)
+                resolved.append(refpath)
+                
+                info = {}
+                info['path'] = refpath
+                info['type'] = arc_type
+                harvest['nodes'].append((refpath, info))
+                harvest['edges'].append((layer_path, refpath, arc_type))
+            harvest[key] = utils.unique_list(resolved)
+        
+        self.memory.sample()
+        return harvest
+    
+    
+    def finish_harvest(self, harvest):
+        # the same layer can be hit by plenty of arcs. walk each one once, in the order they were found
+        for key in ['sublayers', 'references', 'payloads']:
+            harvest[key] = utils.unique_list(harvest[key])
+        # the layer's still open, so this is about as big as reading it gets
+        self.memory.sample()
+        return harvest
+    
+    
+    def harvest_arc(self, harvest, layer, start, arc_type, asset_path, port=None):
+        """
+        Add a sublayer / reference / payload arc to a harvest. The layer it points at gets walked next
+        :param harvest: harvest dict to add to
+        :param layer: the layer the arc was authored in (for anchoring)
+        :param start: node the arc hangs off - the layer, or a variant set
+        :param arc_type: 'sublayer', 'reference' or 'payload'
+        :param asset_path: asset path as authored
+        :param port: port name on the start node. defaults to the arc type
+        """
+        if not asset_path:
+            return
+        refpath = self.resolve(layer, asset_path)
+        harvest[arc_type + 's'].append(refpath)
+        
+        info = {}
+        info['path'] = refpath
+        info['type'] = arc_type
+        harvest['nodes'].append((refpath, info))
+        
+        harvest['edges'].append((start, refpath, port or arc_type))
+    
+    
+    def harvest_asset_attribute(self, harvest, layer, asset_path, colorspace, owner_type, owner_name,
+                                parent_type, parent_name):
+        """
+        Add an asset valued attribute (texture, etc) to a harvest
+        :param asset_path: the attribute's value, as authored
+        :param colorspace: the attribute's colorSpace metadata
+        :param owner_type: type name of the prim the attribute is on
+        :param owner_name: name of the prim the attribute is on
+        :param parent_type: type name of the owner prim's parent, if there is one
+        :param parent_name: name of the owner prim's parent, if there is one
+        """
+        layer_path = harvest['path']
+        resolved_path = self.resolve(layer, asset_path)
+        info = {}
+        info['path'] = resolved_path
+        filebase, ext = os.path.splitext(resolved_path)
+        info['type'] = 'ext'
+        if ext in ['.jpg', '.tex', '.tx', '.png', '.exr', '.hdr', '.tga', '.tif', '.tiff',
+                   '.pic', '.gif', '.psd', '.ptex', '.cin', '.dpx', '.bmp', '.iff',
+                   '.mov', '.m4v', '.mp4', '.webp']:
+            info['type'] = 'tex'
+            info['colorspace'] = colorspace
+        # udim / frame tokens. the node stands for the whole set, and its tiles get checked against
+        # a listing of their directory at the end of the walk, see FileStatusChecker.check_tiles
+        tile_files = textures.texture_set(resolved_path)
+        if tile_files is not None:
+            info['tileFiles'] = tile_files
+        
+        harvest['nodes'].append((resolved_path, info))
+        
+        # so, we want to find out if this attribute is inside a shader
+        # it's conceivable that asset attrs could exist outside of shaders
+        # i just havent seen that in the wild yet
+        # crawl through the ancestors - ie Material -> Shader -> Attribute
+        if owner_type == 'Shader' and parent_type == 'Material':
+            material_path = '{}:{}'.format(os.path.splitext(layer.realPath)[0], parent_name)
+            info = {}
+            info['online'] = True
+            info['path'] = material_path
+            info['type'] = 'material'
+            
+            harvest['nodes'].append((material_path, info))
+            
+            # connect the material to the layer
+            harvest['edges'].append((layer_path, material_path, 'materials'))
+            
+            # then connect the file to the material
+            harvest['edges'].append((material_path, resolved_path, owner_name))
+            return
+        
+        # finally, if it doesn't smell like a material
+        # then just set up a regular connectio to the layer
+        harvest['edges'].append((layer_path, resolved_path, info['type']))
+    
+    
+    def harvest_clip_set(self, harvest, layer, clip_set_name, clip_set):
+        """
+        Add a value clip set to a harvest
+        :param clip_set_name: name of the clip set
+        :param clip_set: the clip set's dict, as it comes out of the prim's clips metadata
+        """
+        layer_path = harvest['path']
+        # print(clip_set_name, clip_set.get("assetPaths"), clip_set.get("manifestAssetPath"), clip_set.get()
+        #     "primPath")
+        
+        """
+        @todo: subframe handling
+        integer frames: path/basename.###.usd
+        subinteger frames: path/basename.##.##.usd.
+        
+        @todo: non-1 increments
+        """
+        # UsdClipsAPI authors a string, but it can just as well be an Sdf.AssetPath like the assetPaths.
+        # an empty one is as good as none
+        templatePath = clip_set.get("templateAssetPath") or ''
+        templatePath = getattr(templatePath, 'path', templatePath)
+        if templatePath:
+            # template clips can run to tens of thousands of frames, so the sequence comes straight from
+            # the template and its times rather than a path per frame
+            start = clip_set.get("templateStartTime")
+            end = clip_set.get("templateEndTime")
+            stride = clip_set.get("templateStride")
+            resolved_template = self.resolve(layer, templatePath)
+            # the files get checked against a listing of their directory along with everything else at the
+            # end of the walk, see FileStatusChecker.check_clip
+            clip_files = clips.template_sequence(resolved_template, start, end, stride)
+            if clip_files is None:
+                # sub-integer times. there's nothing for it but to list them
+                clip_files = {'paths': clips.template_paths(resolved_template, start, end, stride)}
+                if not clip_files['paths']:
+                    # no start or end time, or they don't make a range. usd can't use it either, so it's left
+                    # with no files, and the check marks it offline
+                    logger.warning('template clip set {} in {} has no times to make files for'.format(
+                        clip_set_name, layer_path))
+            
+            if start is not None and end is not None:
+                nodeName = clips.template_label(templatePath, start, end)
+                refpath = clips.template_file(resolved_template, start)
+            else:
+                nodeName = templatePath
+                refpath = resolved_template
+        
+        else:
+            clip_asset_paths = clip_set.get("assetPaths")
+            # don't use resolved path in case either the first or last file is missing from disk
+            firstFile = str(clip_asset_paths[0].path)
+            lastFile = str(clip_asset_paths[-1].path)
+            if digitSearch.findall(firstFile):
+                firstFileNum = digitSearch.findall(firstFile)[-1]
+            else:
+                firstFileNum = '???'
+            
+            if digitSearch.findall(lastFile):
+                lastFileNum = digitSearch.findall(lastFile)[-1]
+            else:
+                lastFileNum = '???'
+            digitRange = str(firstFileNum + '-' + lastFileNum)
+            nodeName = ''
+            
+            firstFileParts = firstFile.split(firstFileNum)
+            for i in range(len(firstFileParts) - 1):
+                nodeName += str(firstFileParts[i])
+            
+            nodeName += digitRange
+            nodeName += firstFileParts[-1]
+            
+            clip_paths = self.asset_resolver.resolve_many(layer, [x.path for x in clip_asset_paths])
+            # the files get checked against a listing of their directory along with everything else at the
+            # end of the walk, see FileStatusChecker.check_clip. a numbered sequence only needs its frame ranges
+            clip_files = clips.clip_sequence(clip_paths)
+            if clip_files is None:
+                clip_files = {'paths': utils.unique_list(clip_paths)}
+            
+            refpath = self.resolve(layer, clip_asset_paths[0].path)
+        
+        info = {}
+        info['path'] = refpath
+        info['type'] = 'clip'
+        info['clipFiles'] = clip_files
+        info['primPath'] = clip_set.get("primPath")
+        info['clipSet'] = clip_set_name
+        if templatePath:
+            info['templateAssetPath'] = templatePath
+        
+        harvest['nodes'].append((nodeName, info))
+        
+        harvest['edges'].append((layer_path, nodeName, 'clip'))
+        
+        manifestPath = clip_set.get("manifestAssetPath")
+        if manifestPath:
+            clipmanifest_path = self.resolve(layer, manifestPath.path)
+            harvest['edges'].append((nodeName, clipmanifest_path, 'manifest'))
+    
+    
+    def variant_set_path(self, layer, variant_set):
+        return '{}:{}'.format(os.path.splitext(layer.realPath)[0], variant_set)
+    
+    
+    def harvest_variant_set(self, harvest, layer, variant_set, variants, current_variant):
+        """
+        Add a variant set node to a harvest
+        :param variant_set: name of the variant set
+        :param variants: list of variant names
+        :param current_variant: the selected variant, if there is one
+        :return: the variant set's node path, for hanging the variants' arcs off
+        """
+        variant_path = self.variant_set_path(layer, variant_set)
+        
+        info = {}
+        info['online'] = True
+        info['path'] = variant_path
+        info['type'] = 'variant'
+        info['variant_set'] = variant_set
+        info['variants'] = variants
+        info['current_variant'] = current_variant
+        
+        harvest['nodes'].append((variant_path, info))
+        
+        harvest['edges'].append((harvest['path'], variant_path, 'variant'))
+        return variant_path
+    
+    
+    def read_layer_scanned(self, layer_path):
+        """
+        Version of read_layer for usda files that lexes the text (see usda_scan) instead of building an
+        Sdf layer, which for big ascii layers is far quicker and a fraction of the memory.
+        Follows scan_mode and walk_attributes the same as the Sdf readers.
+        :param layer_path: resolved layer path
+        :return: dict of plain data, same as read_layer, or None if the scanner wasn't sure of the file
+        """
+        try:
+            scan = usda_scan.scan_layer(layer_path, walk_attributes=self.walk_attributes,
+                                        arcs_only=self.scan_mode == SCAN_ARCS)
+        except usda_scan.ScanError as e:
+            logger.debug('Lexical scan of {} failed, opening it with Sdf: {}'.format(layer_path, e))
+            return None
+        
+        harvest = self.new_harvest(layer_path)
+        layer = usda_scan.ScannedLayer(layer_path)
+        
+        if self.scan_mode == SCAN_ARCS:
+            # like read_layer_arcs, the arcs in variants are connected straight to the layer
+            for arc_type, asset_path, variant in scan.arcs:
+                self.harvest_arc(harvest, layer, layer_path, arc_type, asset_path)
+        else:
+            info = harvest['layer_info']
+            info['info'] = utils.plain_value(scan.layer_metadata)
+            info['specifier'] = Sdf.SpecifierOver.displayName
+            info['muted'] = layer.IsMuted()
+            info['defaultPrim'] = scan.default_prim or ''
+            info['PseudoRoot'] = Sdf.Path.absoluteRootPath.name
+            info['RootPrims'] = scan.root_prims
+            
+            for attribute in scan.asset_attributes:
+                self.harvest_asset_attribute(harvest, layer, *attribute)
+            
+            for clip_set_name, clip_set in scan.clips:
+                self.harvest_clip_set(harvest, layer, clip_set_name, clip_set)
+            
+            variant_paths = {}
+            for variant_set, variants, current_variant in scan.variant_sets:
+                variant_paths[variant_set] = self.harvest_variant_set(harvest, layer, variant_set, variants,
+                                                                      current_variant)
+            
+            for arc_type, asset_path, variant in scan.arcs:
+                if variant is None:
+                    self.harvest_arc(harvest, layer, layer_path, arc_type, asset_path)
+                else:
+                    variant_set, variant_name = variant
+                    self.harvest_arc(harvest, layer, variant_paths[variant_set], arc_type, asset_path,
+                                     port=variant_name)
+        
+        for rel_sublayer in scan.sublayers:
+            self.harvest_arc(harvest, layer, layer_path, 'sublayer', rel_sublayer)
+        
+        return self.finish_harvest(harvest)
+    
+    
+    def read_layer(self, layer_path):
+        """
+        Open a layer and pull out everything the walker needs from it: the root prim info
+        and all the nodes / edges it contributes, plus the layers it points at.
+        This doesn't touch the walker's nodes or graph, so it's safe to call from worker threads.
+        Only plain data comes out, so the layer is freed once we're done with it (unless the
+        walker is keeping it around - see LayerRetainer).
+        :param layer_path: resolved layer path
+        :return: dict of plain data
+        """
+        if self.lexical_scan and usda_scan.is_usda(layer_path):
+            harvest = self.read_layer_scanned(layer_path)
+            if harvest is not None:
+                return harvest
+        
+        if self.scan_mode == SCAN_ARCS:
+            return self.read_layer_arcs(layer_path)
+        
+        harvest = self.new_harvest(layer_path)
+        
+        try:
+            layer = Sdf.Layer.FindOrOpen(layer_path)
+        except Tf.ErrorException:
+            harvest['error'] = True
+            return harvest
+        
+        if not layer:
+            return harvest
+        self.layers.keep(layer_path, layer)
+        # print(id, layer.realPath)
+        root = layer.pseudoRoot
+        # print(id, 'root', root)
+        
+        # print(id, 'children'.center(40, '-'))
+        
+        # info packet from the root prim
+        info_dict = dict()
+        for key in root.ListInfoKeys():
+            if key in ['subLayers', 'subLayerOffsets']:
+                continue
+            # plain python values only, so the harvest can be pickled back from a worker process
+            info_dict[key] = utils.plain_value(root.GetInfo(key))
+        
+        info = harvest['layer_info']
+        info['info'] = info_dict
+        info['specifier'] = root.specifier.displayName
+        info['muted'] = layer.IsMuted()
+        info['defaultPrim'] = layer.defaultPrim
+        info['PseudoRoot'] = layer.pseudoRoot.name
+        info['RootPrims'] = [x.path.GetPrimPath().pathString for x in layer.rootPrims]
+        
+        prims, variant_sets, variant_prims, attributes = self.collect_specs(layer)
+        
+        for path in attributes:
+            attr = layer.GetAttributeAtPath(path)
+            # we are looking for "asset" type attributes
+            # references to external things. relationships don't come back as attributes
+            if not attr or attr.typeName != Sdf.ValueTypeNames.Asset:
+                continue
+            value = attr.default
+            # sometimes you get empty paths
+            if not value:
+                continue
+            if not value.path:
+                continue
+            
+            owner = attr.owner
+            owner_parent = owner.nameParent
+            self.harvest_asset_attribute(harvest, layer, value.path, attr.colorSpace,
+                                         owner.typeName, owner.name,
+                                         owner_parent.typeName if owner_parent else None,
+                                         owner_parent.name if owner_parent else None)
+        
+        for path in prims:
+            child = layer.GetPrimAtPath(path)
+            # one look at what's authored on the prim, rather than asking after each thing in turn.
+            # most prims in a big layer have none of these
+            keys = child.ListInfoKeys()
+            
+            if 'clips' in keys:
+                clip_info = child.GetInfo("clips")
+                for clip_set_name in clip_info:
+                    self.harvest_clip_set(harvest, layer, clip_set_name, clip_info[clip_set_name])
+            
+            if 'payload' in keys:
+                for payload in self.flatten_ref_list(child.payloadList):
+                    self.harvest_arc(harvest, layer, layer_path, 'payload', payload.assetPath)
+            
+            if 'references' in keys:
+                for reference in self.flatten_ref_list(child.referenceList):
+                    self.harvest_arc(harvest, layer, layer_path, 'reference', reference.assetPath)
+        
+        for path in variant_sets:
+            varset = layer.GetObjectAtPath(path)
+            varprim = varset.owner
+            self.harvest_variant_set(harvest, layer, varset.name, [str(x) for x in varset.variants.keys()],
+                                     varprim.variantSelections.get(varset.name))
+        
+        for path in variant_prims:
+            # so variants can host payloads and references. they hang off the variant set's node,
+            # on a port named after the variant
+            primspec_child = layer.GetPrimAtPath(path)
+            keys = primspec_child.ListInfoKeys()
+            if 'payload' not in keys and 'references' not in keys:
+                continue
+            selection = [x for x in path.GetPrefixes() if x.IsPrimVariantSelectionPath()][0]
+            variant_set, variant_name = selection.GetVariantSelection()
+            variant_path = self.variant_set_path(layer, variant_set)
+            
+            for payload in self.flatten_ref_list(primspec_child.payloadList):
+                self.harvest_arc(harvest, layer, variant_path, 'payload', payload.assetPath, port=variant_name)
+            
+            for reference in self.flatten_ref_list(primspec_child.referenceList):
+                self.harvest_arc(harvest, layer, variant_path, 'reference', reference.assetPath, port=variant_name)
+        
+        for rel_sublayer in layer.subLayerPaths:
+            self.harvest_arc(harvest, layer, layer_path, 'sublayer', rel_sublayer)
+        
+        return self.finish_harvest(harvest)